@@ -0,0 +1,243 @@
+"""
+End-to-end benchmarks of the CLI against a local stub API
+
+Each scenario runs the real CLI in a subprocess, pointed at a StubServer
+(see benchmarks/stub_server.py) through SIMPLELOGIN_API_URL, and reports the
+median wall time, the requests it made, the request rate and the peak RSS of
+the CLI process. Every scenario gets a fresh configuration directory, so
+caches start cold for the first run.
+
+    python -m benchmarks.run --aliases=2000 --latency=30
+    python -m benchmarks.run --scenario=list --scenario=export --repeat=5
+
+Results can be saved with --json and compared against a saved baseline with
+--baseline: the run fails if a scenario got slower than the threshold allows.
+POSIX only, since peak RSS comes from wait4().
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.stub_server import StubAccount, StubServer
+
+ROOT = Path(__file__).resolve().parent.parent
+API_KEY = "stub"
+
+# Scenario: (setup commands, timed command). "{dir}" is the scenario's
+# working directory, "{ids}" a file listing the first BULK_SIZE alias ids.
+SCENARIOS = {
+    "list": ([], ["aliases", "list", "--all", "--format=jsonl", "--workers=8"]),
+    "list-table": ([], ["aliases", "list", "--all"]),
+    "contacts": (
+        [],
+        ["contacts", "list", "--all-aliases", "--format=jsonl", "--workers=8"],
+    ),
+    "sync": ([], ["sync", "--full", "--workers=8"]),
+    "search": (
+        [["sync", "--workers=8"]],
+        ["aliases", "search", "shop1", "--fuzzy", "--limit=20"],
+    ),
+    # Incremental run: the setup leaves a mark on every alias
+    "activity": (
+        [["aliases", "activity", "--format=jsonl", "--workers=8"]],
+        ["aliases", "activity", "--format=jsonl", "--workers=8"],
+    ),
+    "bulk-toggle": ([], ["aliases", "toggle", "--from-file={ids}", "--workers=8"]),
+    "export": ([], ["export", "{dir}/export-{run}.jsonl.gz", "--workers=8"]),
+}
+
+BULK_SIZE = 200
+
+
+def run_cli(args, env, cwd):
+    """
+    Run one CLI command and measure it
+
+    Returns (wall seconds, peak RSS in bytes, exit code, stderr).
+    """
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "simplelogin.cli", *args],
+            cwd=cwd,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+        )
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+        stderr.seek(0)
+        errors = stderr.read().decode(errors="replace")
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return wall, peak, process.returncode, errors
+
+
+def run_scenario(name, server, repeat):
+    """Run a scenario `repeat` times and summarize the measurements"""
+    setup, command = SCENARIOS[name]
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            SIMPLELOGIN_API_KEY=API_KEY,
+            SIMPLELOGIN_API_URL=server.url,
+            XDG_CONFIG_HOME=directory,
+        )
+        env.pop("SIMPLELOGIN_RATE_LIMIT", None)
+
+        # Without a config file the CLI only creates one and exits
+        config_dir = Path(directory) / "simplelogin"
+        config_dir.mkdir()
+        (config_dir / "config.yaml").write_text(f"api_key: {API_KEY}\n")
+
+        ids = Path(directory) / "ids.txt"
+        ids.write_text(
+            "".join(f"{alias['id']}\n" for alias in server.account.aliases[:BULK_SIZE])
+        )
+
+        for args in setup:
+            _, _, code, errors = run_cli(args, env, ROOT)
+            if code:
+                raise RuntimeError(f"{name} setup failed: {errors}")
+
+        walls, requests, peaks = [], [], []
+        for run in range(repeat):
+            args = [arg.format(dir=directory, ids=ids, run=run) for arg in command]
+            before = server.requests
+            wall, peak, code, errors = run_cli(args, env, ROOT)
+            if code:
+                raise RuntimeError(f"{name} failed: {errors}")
+
+            walls.append(wall)
+            requests.append(server.requests - before)
+            peaks.append(peak)
+
+    wall = statistics.median(walls)
+    count = statistics.median(requests)
+    return {
+        "scenario": name,
+        "wall": wall,
+        "requests": count,
+        "requests_per_second": count / wall if wall else 0.0,
+        "peak_rss": max(peaks),
+    }
+
+
+def compare(results, baseline, threshold):
+    """List the scenarios slower than their baseline by more than threshold"""
+    previous = {result["scenario"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result["scenario"])
+        if before and result["wall"] > before["wall"] * (1 + threshold):
+            regressions.append((result["scenario"], before["wall"], result["wall"]))
+    return regressions
+
+
+def print_results(results):
+    from tabulate import tabulate
+
+    rows = [
+        [
+            result["scenario"],
+            f"{result['wall']:.2f}",
+            int(result["requests"]),
+            f"{result['requests_per_second']:.0f}",
+            f"{result['peak_rss'] / 2**20:.1f}",
+        ]
+        for result in results
+    ]
+    print(
+        tabulate(
+            rows,
+            headers=["Scenario", "Wall (s)", "Requests", "Req/s", "Peak RSS (MiB)"],
+            tablefmt="simple",
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="scenario to run (repeatable, all by default)",
+    )
+    parser.add_argument("--aliases", type=int, default=1000)
+    parser.add_argument("--contacts", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=20, help="milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", metavar="FILE", help="save the results")
+    parser.add_argument("--baseline", metavar="FILE", help="results to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed slowdown against the baseline (default 0.2, i.e. 20%%)",
+    )
+    args = parser.parse_args()
+
+    settings = {
+        "aliases": args.aliases,
+        "contacts": args.contacts,
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "repeat": args.repeat,
+    }
+    print(
+        f"{args.aliases} aliases, {args.contacts} contacts each,"
+        f" {args.latency:g}ms latency, {args.error_rate:.0%} errors,"
+        f" median of {args.repeat} runs\n"
+    )
+
+    results = []
+    for name in args.scenario or SCENARIOS:
+        # A fresh account per scenario, since some of them change it
+        account = StubAccount(aliases=args.aliases, contacts=args.contacts)
+        server = StubServer(
+            account,
+            latency=args.latency / 1000,
+            error_rate=args.error_rate,
+            api_key=API_KEY,
+        ).start()
+        try:
+            results.append(run_scenario(name, server, args.repeat))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != settings:
+            print("\nWarning: the baseline was recorded with different settings")
+
+        regressions = compare(results, baseline, args.threshold)
+        for scenario, before, after in regressions:
+            print(f"\nRegression: {scenario} took {after:.2f}s (was {before:.2f}s)")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+"""
+Local stand-in for the SimpleLogin API, for benchmarks
+
+Serves the endpoints the CLI uses from a generated in-memory account, with
+configurable size, per-request latency and error rate. Requests are counted
+so the benchmark runner can report request rates.
+
+Run it on its own to try the CLI against it:
+
+    python -m benchmarks.stub_server --aliases=5000 --latency=50
+    SIMPLELOGIN_API_URL=http://127.0.0.1:8080 SIMPLELOGIN_API_KEY=stub \\
+        simplelogin aliases list --all
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PAGE_SIZE = 20
+
+WORDS = ["shop", "news", "bank", "travel", "social", "games", "work", "forum"]
+
+
+class StubAccount:
+    """A generated account, held in memory and shared by the handler threads"""
+
+    def __init__(self, aliases=1000, contacts=2, domains=2, mailboxes=2, seed=0):
+        """
+        Args:
+            aliases: Number of aliases
+            contacts: Contacts per alias
+            domains: Number of custom domains
+            mailboxes: Number of mailboxes
+            seed: Seed for the generated data
+        """
+        rng = random.Random(seed)
+        now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.lock = threading.Lock()
+
+        self.mailboxes = [
+            {
+                "id": i + 1,
+                "email": f"mailbox{i}@example.net",
+                "default": i == 0,
+                "verified": True,
+                "nb_alias": 0,
+                "creation_date": now.isoformat(),
+            }
+            for i in range(mailboxes)
+        ]
+
+        self.domains = [
+            {
+                "id": i + 1,
+                "domain_name": f"domain{i}.example.com",
+                "name": None,
+                "is_verified": True,
+                "catch_all": False,
+                "random_prefix_generation": False,
+                "nb_alias": 0,
+                "mailboxes": [self.mailbox_ref(self.mailboxes[0])],
+                "creation_date": now.isoformat(),
+            }
+            for i in range(domains)
+        ]
+
+        # Newest activity first, as the API lists them
+        self.aliases = []
+        for i in range(aliases):
+            word = WORDS[i % len(WORDS)]
+            domain = self.domains[i % len(self.domains)]["domain_name"]
+            mailbox = self.mailboxes[i % len(self.mailboxes)]
+            self.aliases.append(
+                {
+                    "id": i + 1,
+                    "email": f"{word}{i}@{domain}",
+                    "name": f"{word.title()} {i}",
+                    "note": f"{word} account number {i}" if i % 3 == 0 else None,
+                    "enabled": i % 10 != 0,
+                    "pinned": i % 50 == 0,
+                    "mailboxes": [self.mailbox_ref(mailbox)],
+                    "creation_date": (now - timedelta(days=i)).isoformat(),
+                    "latest_activity": {
+                        "action": "forward",
+                        "timestamp": (now - timedelta(minutes=i)).isoformat(),
+                        "contact": {"email": f"sender{i}@vendor.com"},
+                    },
+                    "nb_forward": rng.randint(0, 500),
+                    "nb_reply": rng.randint(0, 50),
+                    "nb_block": rng.randint(0, 20),
+                }
+            )
+        self.by_id = {alias["id"]: alias for alias in self.aliases}
+
+        self.contacts = {
+            alias["id"]: [
+                self.make_contact(alias["id"] * 1000 + j, f"c{j}@vendor{j}.com")
+                for j in range(contacts)
+            ]
+            for alias in self.aliases
+        }
+        self.next_id = aliases + 1
+
+    def mailbox_ref(self, mailbox):
+        return {"id": mailbox["id"], "email": mailbox["email"]}
+
+    def make_contact(self, contact_id, email):
+        return {
+            "id": contact_id,
+            "contact": email,
+            "reverse_alias": f"{email.replace('@', '_at_')}@sl.example.com",
+            "last_email_sent_date": None,
+            "block_forward": False,
+            "existed": False,
+        }
+
+    def activities(self, alias, count=3):
+        """Recent activities of an alias, newest first, one hour apart"""
+        latest = alias["latest_activity"]
+        if latest is None:
+            return []
+        timestamp = int(datetime.fromisoformat(latest["timestamp"]).timestamp())
+        return [
+            {
+                "action": "forward",
+                "from": latest["contact"]["email"],
+                "to": alias["email"],
+                "timestamp": timestamp - k * 3600,
+                "reverse_alias": None,
+                "reverse_alias_address": None,
+            }
+            for k in range(count)
+        ]
+
+    def add_alias(self, email, note=None, name=None, mailbox_ids=None):
+        with self.lock:
+            alias_id = self.next_id
+            self.next_id += 1
+            mailboxes = [
+                self.mailbox_ref(m)
+                for m in self.mailboxes
+                if m["id"] in (mailbox_ids or [self.mailboxes[0]["id"]])
+            ]
+            alias = {
+                "id": alias_id,
+                "email": email,
+                "name": name,
+                "note": note,
+                "enabled": True,
+                "pinned": False,
+                "mailboxes": mailboxes,
+                "creation_date": datetime.now(timezone.utc).isoformat(),
+                "latest_activity": None,
+                "nb_forward": 0,
+                "nb_reply": 0,
+                "nb_block": 0,
+            }
+            self.aliases.insert(0, alias)
+            self.by_id[alias_id] = alias
+            self.contacts[alias_id] = []
+            return alias
+
+    def delete_alias(self, alias_id):
+        with self.lock:
+            alias = self.by_id.pop(alias_id)
+            self.aliases.remove(alias)
+            self.contacts.pop(alias_id, None)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Route API requests to the server's account"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle's algorithm the
+    # body would wait for the client's delayed ACK of the headers
+    disable_nagle_algorithm = True
+
+    ROUTES = [
+        ("GET", r"/api/v2/aliases", "list_aliases"),
+        ("GET", r"/api/aliases/(\d+)", "get_alias"),
+        ("PATCH", r"/api/aliases/(\d+)", "update_alias"),
+        ("DELETE", r"/api/aliases/(\d+)", "delete_alias"),
+        ("POST", r"/api/aliases/(\d+)/toggle", "toggle_alias"),
+        ("GET", r"/api/aliases/(\d+)/contacts", "list_contacts"),
+        ("GET", r"/api/aliases/(\d+)/activities", "list_activities"),
+        ("POST", r"/api/aliases/(\d+)/contacts", "create_contact"),
+        ("POST", r"/api/contacts/(\d+)/toggle", "toggle_contact"),
+        ("GET", r"/api/v2/mailboxes", "list_mailboxes"),
+        ("GET", r"/api/custom_domains", "list_domains"),
+        ("PATCH", r"/api/custom_domains/(\d+)", "update_domain"),
+        ("GET", r"/api/custom_domains/(\d+)/trash", "domain_trash"),
+        ("GET", r"/api/v5/alias/options", "alias_options"),
+        ("POST", r"/api/v3/alias/custom/new", "create_custom_alias"),
+        ("POST", r"/api/alias/random/new", "create_random_alias"),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PATCH(self):
+        self.dispatch("PATCH")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        server = self.server
+        url = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+        server.count_request()
+        if server.latency:
+            time.sleep(server.latency)
+
+        if server.error_rate and server.rng.random() < server.error_rate:
+            return self.reply(503, {"error": "Service unavailable"})
+
+        if self.headers.get("Authentication") != server.api_key:
+            return self.reply(401, {"error": "Wrong api key"})
+
+        for route_method, pattern, name in self.ROUTES:
+            match = re.fullmatch(pattern, url.path)
+            if match and route_method == method:
+                args = [int(group) for group in match.groups()]
+                try:
+                    status, payload = getattr(self, name)(*args, params, body)
+                except KeyError:
+                    status, payload = 404, {"error": "Not found"}
+                return self.reply(status, payload)
+
+        self.reply(404, {"error": "Unknown endpoint"})
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    @property
+    def account(self):
+        return self.server.account
+
+    def page(self, items, params):
+        start = int(params.get("page_id", 0)) * PAGE_SIZE
+        return items[start : start + PAGE_SIZE]
+
+    def list_aliases(self, params, body):
+        aliases = self.account.aliases
+        if "pinned" in params:
+            aliases = [alias for alias in aliases if alias["pinned"]]
+        if "disabled" in params:
+            aliases = [alias for alias in aliases if not alias["enabled"]]
+        if "enabled" in params:
+            aliases = [alias for alias in aliases if alias["enabled"]]
+
+        query = (body.get("query") or params.get("query") or "").lower()
+        if query:
+            aliases = [
+                alias
+                for alias in aliases
+                if query in alias["email"] or query in (alias["note"] or "").lower()
+            ]
+        return 200, {"aliases": self.page(aliases, params)}
+
+    def get_alias(self, alias_id, params, body):
+        return 200, self.account.by_id[alias_id]
+
+    def update_alias(self, alias_id, params, body):
+        alias = self.account.by_id[alias_id]
+        for field in ("note", "name", "pinned"):
+            if field in body:
+                alias[field] = body[field]
+        if "mailbox_ids" in body:
+            alias["mailboxes"] = [
+                self.account.mailbox_ref(m)
+                for m in self.account.mailboxes
+                if m["id"] in body["mailbox_ids"]
+            ]
+        return 200, {"ok": True}
+
+    def delete_alias(self, alias_id, params, body):
+        self.account.delete_alias(alias_id)
+        return 200, {"deleted": True}
+
+    def toggle_alias(self, alias_id, params, body):
+        alias = self.account.by_id[alias_id]
+        alias["enabled"] = not alias["enabled"]
+        return 200, {"enabled": alias["enabled"]}
+
+    def list_contacts(self, alias_id, params, body):
+        return 200, {"contacts": self.page(self.account.contacts[alias_id], params)}
+
+    def list_activities(self, alias_id, params, body):
+        activities = self.account.activities(self.account.by_id[alias_id])
+        return 200, {"activities": self.page(activities, params)}
+
+    def create_contact(self, alias_id, params, body):
+        contacts = self.account.contacts[alias_id]
+        for contact in contacts:
+            if contact["contact"] == body["contact"]:
+                return 200, dict(contact, existed=True)
+        contact = self.account.make_contact(
+            alias_id * 1000 + len(contacts), body["contact"]
+        )
+        contacts.append(contact)
+        return 201, contact
+
+    def toggle_contact(self, contact_id, params, body):
+        contact = next(
+            c
+            for c in self.account.contacts[contact_id // 1000]
+            if c["id"] == contact_id
+        )
+        contact["block_forward"] = not contact["block_forward"]
+        return 200, {"block_forward": contact["block_forward"]}
+
+    def list_mailboxes(self, params, body):
+        return 200, {"mailboxes": self.account.mailboxes}
+
+    def list_domains(self, params, body):
+        return 200, {"custom_domains": self.account.domains}
+
+    def update_domain(self, domain_id, params, body):
+        domain = next(d for d in self.account.domains if d["id"] == domain_id)
+        for field in ("catch_all", "random_prefix_generation", "name"):
+            if field in body:
+                domain[field] = body[field]
+        return 200, {"custom_domain": domain}
+
+    def domain_trash(self, domain_id, params, body):
+        return 200, {"aliases": []}
+
+    def alias_options(self, params, body):
+        suffixes = [
+            {"suffix": f"@{domain['domain_name']}", "signed_suffix": domain["id"]}
+            for domain in self.account.domains
+        ]
+        return 200, {"can_create": True, "prefix_suggestion": "", "suffixes": suffixes}
+
+    def create_custom_alias(self, params, body):
+        domain = next(
+            d for d in self.account.domains if d["id"] == body["signed_suffix"]
+        )
+        email = f"{body['alias_prefix']}@{domain['domain_name']}"
+        if any(alias["email"] == email for alias in self.account.aliases):
+            return 409, {"error": f"{email} already exists"}
+        alias = self.account.add_alias(
+            email, body.get("note"), body.get("name"), body.get("mailbox_ids")
+        )
+        return 201, alias
+
+    def create_random_alias(self, params, body):
+        domain = self.account.domains[0]["domain_name"]
+        email = f"random{self.account.next_id}@{domain}"
+        return 201, self.account.add_alias(email, body.get("note"))
+
+
+class StubServer(ThreadingHTTPServer):
+    """HTTP server for a StubAccount, counting the requests it receives"""
+
+    daemon_threads = True
+
+    def __init__(
+        self, account, port=0, latency=0.0, error_rate=0.0, api_key="stub", seed=0
+    ):
+        """
+        Args:
+            account: StubAccount to serve
+            port: Port to listen on (any free port if 0)
+            latency: Seconds each request takes
+            error_rate: Fraction of requests answered with a 503
+            api_key: API key clients must send
+            seed: Seed for the injected errors
+        """
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.account = account
+        self.latency = latency
+        self.error_rate = error_rate
+        self.api_key = api_key
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.counter_lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count_request(self):
+        with self.counter_lock:
+            self.requests += 1
+
+    def start(self):
+        """Serve from a background thread"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--aliases", type=int, default=1000)
+    parser.add_argument("--contacts", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0, help="milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--api-key", default="stub")
+    args = parser.parse_args()
+
+    account = StubAccount(aliases=args.aliases, contacts=args.contacts)
+    server = StubServer(
+        account,
+        port=args.port,
+        latency=args.latency / 1000,
+        error_rate=args.error_rate,
+        api_key=args.api_key,
+    )
+    print(f"Serving {args.aliases} aliases on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
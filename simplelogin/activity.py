@@ -0,0 +1,100 @@
+"""
+Incremental activity feed for `simplelogin aliases activity`
+
+The activities of an alias come from /api/aliases/{id}/activities, newest
+first. Reading them for every alias on every run would cost at least one
+request per alias, so each run leaves a mark per alias in the local store:
+
+- the alias's latest_activity as listed by /api/v2/aliases, so aliases
+  without anything new are skipped without a request at all, and
+- a high-water mark, the timestamp of the newest activity read together
+  with the activities read at that timestamp, so the next run stops paging
+  as soon as it reaches activities it has already seen.
+
+The new activities of every alias are then merged into one chronological
+stream with a k-way merge, each alias's list being already sorted.
+"""
+
+import heapq
+import json
+
+
+def activity_id(activity):
+    """Identify an activity, which the API gives no id of its own"""
+    return json.dumps(
+        [
+            activity.get("timestamp"),
+            activity.get("action"),
+            activity.get("from"),
+            activity.get("to"),
+        ]
+    )
+
+
+def is_seen(activity, mark):
+    """Whether an activity was already read by the run that left `mark`"""
+    if mark is None or mark.get("timestamp") is None:
+        return False
+    if activity["timestamp"] != mark["timestamp"]:
+        return activity["timestamp"] < mark["timestamp"]
+    return activity_id(activity) in mark["seen"]
+
+
+def collect_new(fetch_page, mark, page_size):
+    """
+    Read the activities of one alias that are newer than its mark
+
+    Pages are read in order until one ends the listing or reaches activities
+    older than the mark. Activities sharing the mark's timestamp are checked
+    one by one, as the API does not order them.
+
+    Args:
+        fetch_page: Callable taking a page number and returning activities,
+            newest first
+        mark: High-water mark left by the previous run, or None
+        page_size: Number of activities in a full page
+
+    Returns the new activities, newest first.
+    """
+    new = []
+    page = 0
+    while True:
+        activities = fetch_page(page)
+        for activity in activities:
+            if not is_seen(activity, mark):
+                new.append(activity)
+            elif activity["timestamp"] != mark["timestamp"]:
+                return new
+        if len(activities) < page_size:
+            return new
+        page += 1
+
+
+def advance_mark(mark, new):
+    """
+    The high-water mark once the `new` activities (newest first) are read
+
+    Returns a {"timestamp", "seen"} dict, `mark` itself if nothing is new.
+    """
+    if not new:
+        return mark
+    latest = new[0]["timestamp"]
+    seen = {activity_id(a) for a in new if a["timestamp"] == latest}
+    if mark is not None and mark.get("timestamp") == latest:
+        seen.update(mark["seen"])
+    return {"timestamp": latest, "seen": sorted(seen)}
+
+
+def merge_feeds(feeds):
+    """
+    Merge per-alias activities into one stream, oldest first
+
+    Args:
+        feeds: Lists of activities, each newest first as read from the API
+
+    Activities at the same time come out in alias order.
+    """
+    return heapq.merge(
+        *(reversed(feed) for feed in feeds),
+        key=lambda activity: (activity["timestamp"], activity.get("alias_id", 0)),
+    )
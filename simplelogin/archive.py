@@ -0,0 +1,208 @@
+"""
+Account archives written by `simplelogin export`
+
+An archive is gzip-compressed JSON Lines, one record per line:
+
+    {"type": "header", "version": 1, "created": "..."}
+    {"type": "mailbox", "data": {...}}
+    {"type": "custom_domain", "data": {...}}
+    {"type": "domain_trash", "domain_id": 1, "data": {...}}
+    {"type": "alias", "data": {...}}
+    {"type": "contact", "alias_id": 1, "alias": "a@b.c", "data": {...}}
+
+Records are written in batches, each batch as a complete gzip member, since
+concatenated members form a valid gzip file. After every batch the archive is
+synced and a checkpoint file next to it records the archive size and export
+progress. An interrupted export truncates the archive back to the last
+checkpoint, dropping any partially written batch, and carries on from there.
+
+The ids of the aliases in each batch go into a small SQLite file next to the
+archive, tagged with the batch number, so a resumed export can skip them
+without the checkpoint or memory growing with the account. Ids of a batch the
+checkpoint does not cover are dropped on resume, along with the batch.
+
+`simplelogin import` reads an archive back and keeps an ImportJournal of the
+aliases it has restored, so an interrupted import skips them when re-run.
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+
+ARCHIVE_VERSION = 1
+
+
+def checkpoint_path(path):
+    """Path of the checkpoint file kept next to an archive during export"""
+    return path.with_name(path.name + ".checkpoint")
+
+
+def exported_ids_path(path):
+    """Path of the file of exported alias ids kept next to an archive"""
+    return path.with_name(path.name + ".ids")
+
+
+def read_archive(path):
+    """Yield every record of an archive"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_aliases(records):
+    """
+    Group the alias and contact records of an archive
+
+    Yields (alias, contacts) for every alias record, with the data of the
+    contact records that belong to it. Export writes each page of aliases
+    followed by their contacts, so only about a page is held at a time.
+    """
+    pending = {}
+    previous = None
+
+    for record in records:
+        kind = record["type"]
+        if kind == "alias":
+            if previous == "contact":
+                yield from pending.values()
+                pending = {}
+            pending[record["data"]["id"]] = (record["data"], [])
+        elif kind == "contact" and record["alias_id"] in pending:
+            pending[record["alias_id"]][1].append(record["data"])
+        previous = kind
+
+    yield from pending.values()
+
+
+class ArchiveWriter:
+    """Append record batches to an archive, checkpointing after each one"""
+
+    def __init__(self, path, state):
+        """
+        Args:
+            path: Archive path
+            state: Export progress; a resumed export passes the checkpointed
+                state, whose "offset" is the archive size to truncate back to
+        """
+        self.path = path
+        self.state = state
+        self.file = open(path, "r+b" if "offset" in state else "wb")
+        self.file.truncate(state.get("offset", 0))
+        self.file.seek(0, os.SEEK_END)
+
+        ids_path = exported_ids_path(path)
+        if "offset" not in state and ids_path.exists():
+            os.unlink(ids_path)
+        self.ids = sqlite3.connect(str(ids_path))
+        with self.ids:
+            self.ids.execute(
+                "CREATE TABLE IF NOT EXISTS exported"
+                " (alias_id INTEGER PRIMARY KEY, batch INTEGER NOT NULL)"
+            )
+            # Batches after the checkpoint were dropped from the archive
+            self.ids.execute(
+                "DELETE FROM exported WHERE batch >= ?", (state.get("batches", 0),)
+            )
+
+    @classmethod
+    def resume(cls, path):
+        """Load the checkpointed state of an unfinished export, or None"""
+        try:
+            with open(checkpoint_path(path), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_exported(self, alias_id):
+        """Whether an alias was written by an earlier batch"""
+        row = self.ids.execute(
+            "SELECT 1 FROM exported WHERE alias_id = ?", (alias_id,)
+        ).fetchone()
+        return row is not None
+
+    def write_batch(self, records, alias_ids=(), **progress):
+        """
+        Append records as one gzip member and checkpoint `progress`
+
+        progress is merged into the saved state, so it should describe where
+        to resume once these records are safely written. alias_ids are the
+        ids of the aliases among the records.
+        """
+        with gzip.GzipFile(fileobj=self.file, mode="wb") as member:
+            for record in records:
+                member.write((json.dumps(record) + "\n").encode("utf-8"))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+        batch = self.state.get("batches", 0)
+        with self.ids:
+            self.ids.executemany(
+                "INSERT OR REPLACE INTO exported (alias_id, batch) VALUES (?, ?)",
+                [(alias_id, batch) for alias_id in alias_ids],
+            )
+
+        self.state.update(progress, offset=self.file.tell(), batches=batch + 1)
+        path = checkpoint_path(self.path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, path)
+
+    def finish(self):
+        """Close the archive and drop the checkpoint of a complete export"""
+        self.close()
+        os.unlink(checkpoint_path(self.path))
+        os.unlink(exported_ids_path(self.path))
+
+    def close(self):
+        """Close the archive, keeping the checkpoint to resume from"""
+        self.file.close()
+        self.ids.close()
+
+
+class ImportJournal:
+    """Append-only log of the aliases an import has finished restoring"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Journal file, created if needed. Aliases recorded by an
+                earlier, interrupted import are loaded into `done`.
+        """
+        self.path = path
+        self.done = set()
+
+        try:
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        self.done.add(json.loads(line)["email"])
+                    except (ValueError, KeyError):
+                        pass  # Cut short when the import was killed
+        except OSError:
+            pass
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(path, "a")
+        if self.file.tell():
+            # Never append to a line cut short
+            self.file.write("\n")
+
+    def record(self, email, **details):
+        """Mark the alias with this email as restored"""
+        # Flushed rather than synced: losing the last entries to a power cut
+        # only means restoring those aliases again, which is harmless
+        self.file.write(json.dumps(dict(details, email=email)) + "\n")
+        self.file.flush()
+        self.done.add(email)
+
+    def finish(self):
+        """Close and delete the journal of a complete import"""
+        self.file.close()
+        os.unlink(self.path)
+
+    def close(self):
+        """Close the journal, keeping it for the next run"""
+        self.file.close()
@@ -0,0 +1,121 @@
+"""
+Small on-disk cache for API data that rarely changes
+
+Values are JSON documents stored one file per key under the cache directory,
+together with their expiry time. Keys are namespaced per account so switching
+API keys never serves another account's data.
+
+Expired files are deleted when read. Keys that are never read again, such as
+single aliases touched by a bulk command, are dropped once the directory holds
+more than MAX_ENTRIES files: expired ones first, then the least recently
+written.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+CACHE_DIRNAME = "cache"
+
+# Files kept in the cache directory, and how many are left after pruning it
+MAX_ENTRIES = 1000
+PRUNE_TO = MAX_ENTRIES // 2
+
+
+class DiskCache:
+    """JSON values with a time-to-live, stored as files in one directory"""
+
+    def __init__(self, directory, namespace=""):
+        """
+        Args:
+            directory: Directory holding the cache files (created if needed)
+            namespace: Prefix isolating these keys, e.g. an account hash
+        """
+        self.directory = directory
+        self.namespace = namespace
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Upper bound on the number of files, counted on the first write
+        self.entries = None
+
+    def _path(self, key):
+        digest = hashlib.sha256(f"{self.namespace}:{key}".encode()).hexdigest()
+        return self.directory / f"{digest[:32]}.json"
+
+    def get(self, key):
+        """The cached value for key, or None if it is missing or expired"""
+        try:
+            with open(self._path(key), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("expires", 0) < time.time():
+            self.delete(key)
+            return None
+        return entry.get("value")
+
+    def set(self, key, value, ttl):
+        """Store value for `ttl` seconds"""
+        entry = {"expires": time.time() + ttl, "value": value}
+
+        # Write then rename so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        if self.entries is None:
+            self.entries = len(list(self.directory.glob("*.json")))
+        else:
+            # Overwriting a key is counted too, which only prunes earlier
+            self.entries += 1
+
+        if self.entries > MAX_ENTRIES:
+            self.prune()
+
+    def prune(self):
+        """
+        Shrink the cache directory to PRUNE_TO files
+
+        Expired files go first, then the least recently written ones. Files of
+        every namespace are pruned, since they share the directory.
+        """
+        now = time.time()
+        live = []
+
+        for path in self.directory.glob("*.json"):
+            try:
+                with open(path, "r") as f:
+                    expires = json.load(f).get("expires", 0)
+                mtime = path.stat().st_mtime
+            except (OSError, ValueError):
+                expires = mtime = 0
+
+            if expires < now:
+                self._unlink(path)
+            else:
+                live.append((mtime, path))
+
+        live.sort()
+        for _, path in live[: max(0, len(live) - PRUNE_TO)]:
+            self._unlink(path)
+
+        self.entries = min(len(live), PRUNE_TO)
+
+    def delete(self, key):
+        self._unlink(self._path(key))
+
+    def _unlink(self, path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
@@ -3,31 +3,54 @@
 SimpleLogin CLI - A command line tool for managing SimpleLogin email aliases
 
 Usage:
-    simplelogin aliases list [--page=<page>] [--pinned] [--disabled]
-        [--enabled] [--query=<query>]
+    simplelogin aliases list [--page=<page> | --all] [--pinned] [--disabled]
+        [--enabled] [--query=<query>] [--workers=<n>] [--cached]
+        [--format=<format>]
     simplelogin aliases create custom <prefix> <suffix_id> [--mailboxes=<ids>]
         [--note=<note>] [--name=<name>]
     simplelogin aliases create random [--mode=<mode>] [--note=<note>]
-    simplelogin aliases toggle <alias_id>
-    simplelogin aliases delete <alias_id>
-    simplelogin aliases info <alias_id>
-    simplelogin contacts list <alias_id>
+        [--count=<n>] [--notes-file=<file>] [--workers=<n>] [--rate=<n>]
+    simplelogin aliases toggle (<alias_id> | --from-file=<file>) [--workers=<n>]
+        [--rate=<n>]
+    simplelogin aliases delete (<alias_id> | --from-file=<file> [--yes])
+        [--workers=<n>] [--rate=<n>]
+    simplelogin aliases (enable | disable) (<alias_id> | --from-file=<file>)
+        [--cached] [--workers=<n>] [--rate=<n>]
+    simplelogin aliases info <alias_id> [--cached]
+    simplelogin aliases search <pattern> [--prefix | --regex | --fuzzy]
+        [--limit=<n>]
+    simplelogin aliases stats [--top=<n>] [--by=<group>] [--workers=<n>]
+        [--cached] [--format=<format>]
+    simplelogin aliases activity [--peek] [--workers=<n>] [--format=<format>]
+    simplelogin aliases watch [--interval=<s>] [--max-interval=<s>]
+        [--workers=<n>] [--format=<format>]
+    simplelogin contacts list (<alias_id> [--page=<page> | --all] | --all-aliases)
+        [--workers=<n>] [--format=<format>]
     simplelogin contacts create <alias_id> <contact>
     simplelogin contacts delete <contact_id>
     simplelogin contacts toggle <contact_id>
-    simplelogin domains list
-    simplelogin domains info <domain_id>
+    simplelogin domains list [--cached] [--format=<format>]
+    simplelogin domains info <domain>
     simplelogin domains update <domain_id> [--catch-all=<bool>]
         [--random-prefix=<bool>] [--name=<name>] [--mailboxes=<ids>]
-    simplelogin domains trash <domain_id>
-    simplelogin mailboxes list
+    simplelogin domains trash <domain_id> [--format=<format>]
+    simplelogin mailboxes list [--cached] [--format=<format>]
+    simplelogin sync [--full] [--workers=<n>]
+    simplelogin export <archive> [--workers=<n>]
+    simplelogin import <archive> [--workers=<n>] [--rate=<n>]
+    simplelogin plan <state> [--workers=<n>]
+    simplelogin apply <state> [--yes] [--workers=<n>] [--rate=<n>]
     simplelogin config set-key <api_key>
     simplelogin config view
+    simplelogin daemon [stop | status]
 
 Options:
     -h --help                    Show this help
     --version                    Show version
     --page=<page>                Page number (starts at 0) [default: 0]
+    --all                        Fetch every page instead of a single one
+    --all-aliases                List the contacts of every alias
+    --workers=<n>                Number of concurrent API requests [default: 4]
     --pinned                     Show only pinned aliases
     --disabled                   Show only disabled aliases
     --enabled                    Show only enabled aliases
@@ -35,26 +58,119 @@ Options:
     --name=<name>                Set a name for the alias or domain
     --mode=<mode>                Random alias mode (uuid or word)
     --note=<note>                Add a note to the alias
+    --count=<n>                  Number of random aliases to create
+    --notes-file=<file>          File with one note per alias ("-" for stdin)
+    --rate=<n>                   Maximum number of API requests per second
+    --from-file=<file>           File with one alias ID or email per line ("-" for stdin)
+    --yes                        Do not ask for confirmation
     --catch-all=<bool>           Enable/disable catch-all for domain (true/false)
     --random-prefix=<bool>       Enable/disable random prefix generation (true/false)
     --mailboxes=<ids>            Comma-separated list of mailbox IDs
+    --cached                     Answer from the local copy made by sync
+    --full                       Re-download every alias and drop deleted ones
+    --prefix                     Match the start of the email, name, note or mailbox
+    --regex                      Treat the search pattern as a regular expression
+    --fuzzy                      Rank approximate matches of the search pattern
+    --limit=<n>                  Maximum number of results
+    --top=<n>                    Number of aliases in each top list [default: 10]
+    --by=<group>                 Also break statistics down by mailbox or domain
+    --peek                       Show new activity without marking it as seen
+    --interval=<s>               Shortest time between two polls [default: 30]
+    --max-interval=<s>           Longest time between two full walks [default: 300]
+    --format=<format>            Output format: table, json, jsonl, csv or tsv
+                                 [default: table]
+    --timings                    Print where the command spent its time (any command)
 """
 
+import time
+
+# Taken before the other imports, for the import phase of --timings
+IMPORT_START = time.perf_counter()
+
+import contextlib
+import hashlib
+import importlib
+import json
 import os
+import re
 import sys
+import threading
 
-import requests
-import yaml
-from docopt import docopt
-from tabulate import tabulate
 from pathlib import Path
 from datetime import datetime
-import questionary as q
+
+from simplelogin.activity import advance_mark, collect_new, merge_feeds
+from simplelogin.archive import (
+    ARCHIVE_VERSION,
+    ArchiveWriter,
+    ImportJournal,
+    read_aliases,
+    read_archive,
+)
+from simplelogin.cache import CACHE_DIRNAME, DiskCache
+from simplelogin.client import BASE_URL, SimpleLoginClient
+from simplelogin.daemon import SOCKET_NAME, Daemon, control
+from simplelogin.httpcache import ResponseCache
+from simplelogin.output import OUTPUT_FORMATS, write_records
+from simplelogin.plan import (
+    count_calls,
+    format_change,
+    load_state,
+    plan_changes,
+    split_alias_email,
+)
+from simplelogin.ratelimit import SharedTokenBucket, parse_rate
+from simplelogin.stats import BUCKETS, DEFAULT_TOP, AliasStats
+from simplelogin.store import (
+    STORE_FILENAME,
+    AccountStore,
+    account_key,
+    activity_key,
+)
+from simplelogin.trace import Tracer, phase
+from simplelogin.watch import AliasWatcher, PollInterval
+from simplelogin.workers import (
+    DEFAULT_WORKERS,
+    PAGE_SIZE,
+    fetch_pages,
+    map_pages,
+    run_concurrently,
+)
+
+IMPORT_END = time.perf_counter()
 
 __version__ = "0.2.4"
 
-# API Configuration
-BASE_URL = "https://app.simplelogin.io"
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access
+
+    The CLI runs once per command, often from scripts, so startup time matters.
+    requests alone takes over 100ms to import and isn't needed for --help,
+    config commands or --cached reads.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        # import_module is thread-safe and returns the cached module after the
+        # first call, so worker threads may race here harmlessly
+        return getattr(importlib.import_module(self.name), attr)
+
+
+requests = LazyModule("requests")
+
+# Shared API client, created on first use by get_client()
+_client = None
+
+# Rate limit setting the client's rate limiter was made for
+_rate_limit_setting = None
+
+# Tracer recording where the command spends its time, set by main() when
+# --timings or SIMPLELOGIN_TRACE asks for it
+_tracer = None
 
 
 def get_config_dir():
@@ -80,6 +196,8 @@ def get_config_file():
 
 def load_config():
     """Load configuration from file"""
+    import yaml
+
     config_file = get_config_file()
 
     if not config_file.exists():
@@ -100,6 +218,8 @@ def load_config():
 
 def save_config(config):
     """Save configuration to file"""
+    import yaml
+
     config_file = get_config_file()
     with open(config_file, "w") as f:
         yaml.dump(config, f)
@@ -120,6 +240,139 @@ def get_headers(config):
     return {"Authentication": f"{api_key}", "Content-Type": "application/json"}
 
 
+def get_client(config, workers=None):
+    """
+    Get the shared API client, creating it on first use
+
+    Args:
+        config: Configuration dictionary
+        workers: Number of concurrent requests the caller will make, so the
+            connection pool can keep a connection alive for each
+    """
+    global _client, _rate_limit_setting
+    api_key = get_headers(config)["Authentication"]
+
+    base_url = (os.environ.get("SIMPLELOGIN_API_URL") or BASE_URL).rstrip("/")
+
+    created = (
+        _client is None
+        or _client.session.headers["Authentication"] != api_key
+        or _client.base_url != base_url
+    )
+    if created:
+        _client = SimpleLoginClient(api_key, base_url=base_url, tracer=_tracer)
+        _client.response_cache = ResponseCache(get_cache(config), base_url)
+
+    # Checked on every call: a daemon keeps the client across commands run
+    # with different environments and configuration
+    setting = get_rate_limit_setting(config)
+    if created or setting != _rate_limit_setting:
+        _rate_limit_setting = setting
+        _client.rate_limiter = None
+
+        rate_limit = get_rate_limit(config)
+        if rate_limit:
+            # Shared by every process using this API key
+            state_file = get_config_dir() / f"ratelimit-{account_key(api_key)[:16]}"
+            _client.rate_limiter = SharedTokenBucket(state_file, rate_limit)
+
+    if workers:
+        _client.ensure_pool_size(workers)
+
+    return _client
+
+
+def get_rate_limit_setting(config):
+    """The API rate limit as configured, before parsing, or None"""
+    return os.environ.get("SIMPLELOGIN_RATE_LIMIT") or config.get("rate_limit")
+
+
+def get_rate_limit(config):
+    """
+    Get the configured API rate limit in requests per second, or None
+
+    The limit comes from SIMPLELOGIN_RATE_LIMIT or the rate_limit config key,
+    e.g. "5" or "300/min".
+    """
+    value = get_rate_limit_setting(config)
+    if not value:
+        return None
+
+    try:
+        return parse_rate(value)
+    except ValueError:
+        print(f"Ignoring invalid rate limit: {value}", file=sys.stderr)
+        return None
+
+
+def adaptive_limit(client, workers):
+    """
+    Let the API's responses steer concurrency for a run of up to `workers`
+
+    The client reports throttled and healthy responses to the returned limit,
+    which the concurrent helpers follow.
+    """
+    from simplelogin.engine import AdaptiveLimit
+
+    client.congestion = AdaptiveLimit(workers)
+    return client.congestion
+
+
+def open_store(config):
+    """Open the local account mirror, bound to the configured API key"""
+    store = AccountStore(get_config_dir() / STORE_FILENAME)
+    store.bind_account(get_headers(config)["Authentication"])
+    return store
+
+
+def open_synced_store(config):
+    """Open the local mirror for a --cached read, or None if it was never synced"""
+    store = open_store(config)
+    if not store.synced:
+        store.close()
+        print("No local data found. Run 'simplelogin sync' first.")
+        return None
+    return store
+
+
+def get_cache(config):
+    """Get the on-disk cache for the configured account"""
+    namespace = account_key(get_headers(config)["Authentication"])
+    return DiskCache(get_config_dir() / CACHE_DIRNAME, namespace)
+
+
+def error_stream(output_format):
+    """Keep errors out of stdout when it carries machine-readable output"""
+    return sys.stdout if output_format == "table" else sys.stderr
+
+
+def print_api_error(message, e, file=None):
+    """Print a request error along with the status code and API error message"""
+    print(f"{message}: {e}", file=file)
+    if hasattr(e, "response") and e.response is not None:
+        print(f"Status code: {e.response.status_code}", file=file)
+        try:
+            error_data = e.response.json()
+            print(f"Error message: {error_data.get('error')}", file=file)
+        except:
+            print(f"Error message: {e.response.text}", file=file)
+
+
+def open_input(path):
+    """Open a file for reading, or stdin when path is "-" """
+    if path == "-":
+        return contextlib.nullcontext(sys.stdin)
+    return open(path, "r")
+
+
+def render_table(rows, headers):
+    """Format rows as a grid table"""
+    with phase(_tracer, "render"):
+        from tabulate import tabulate
+
+        return tabulate(rows, headers=headers, tablefmt="grid")
+
+
 def format_datetime(timestamp_str):
     """Format datetime string to a more readable format"""
     if not timestamp_str:
@@ -138,9 +391,137 @@ def format_datetime(timestamp_str):
         return timestamp_str
 
 
+ALIAS_TABLE_HEADERS = [
+    "ID",
+    "Email",
+    "Name",
+    "Enabled",
+    "Pinned",
+    "Mailbox",
+    "Latest Activity",
+    "Stats",
+    "Note",
+]
+
+
+def alias_row(alias):
+    """Build the table row shown for an alias in listings"""
+    enabled_status = "✓" if alias["enabled"] else "❌"
+    pinned_status = "📌" if alias.get("pinned", False) else ""
+
+    latest = alias.get("latest_activity", {})
+    activity = (
+        f"{latest.get('action', 'N/A')} ({format_datetime(latest.get('timestamp', ''))})"
+        if latest
+        else "N/A"
+    )
+
+    mailbox = alias["mailboxes"][0]["email"] if alias.get("mailboxes") else "N/A"
+
+    return [
+        alias["id"],
+        alias["email"],
+        alias.get("name", ""),
+        enabled_status,
+        pinned_status,
+        mailbox,
+        activity,
+        f"F:{alias.get('nb_forward', 0)} R:{alias.get('nb_reply', 0)} B:{alias.get('nb_block', 0)}",
+        alias.get("note", ""),
+    ]
+
+
+ALIAS_FIELDS = [
+    "id",
+    "email",
+    "name",
+    "enabled",
+    "pinned",
+    "mailboxes",
+    "latest_activity_action",
+    "latest_activity_timestamp",
+    "nb_forward",
+    "nb_reply",
+    "nb_block",
+    "note",
+]
+
+
+def alias_fields(alias):
+    """Build the CSV/TSV row written for an alias, matching ALIAS_FIELDS"""
+    latest = alias.get("latest_activity") or {}
+    return [
+        alias["id"],
+        alias["email"],
+        alias.get("name"),
+        alias["enabled"],
+        alias.get("pinned", False),
+        " ".join(mailbox["email"] for mailbox in alias.get("mailboxes", [])),
+        latest.get("action"),
+        latest.get("timestamp"),
+        alias.get("nb_forward", 0),
+        alias.get("nb_reply", 0),
+        alias.get("nb_block", 0),
+        alias.get("note"),
+    ]
+
+
+def alias_filter_params(pinned=False, disabled=False, enabled=False):
+    """Build the /api/v2/aliases filter parameters (only one filter applies)"""
+    if pinned:
+        return {"pinned": True}
+    elif disabled:
+        return {"disabled": True}
+    elif enabled:
+        return {"enabled": True}
+    return {}
+
+
+def fetch_alias_page(client, page, filters=None, query=None):
+    """Fetch a single page of aliases, raising on request errors"""
+    params = {"page_id": page}
+    params.update(filters or {})
+    data = {"query": query} if query else None
+
+    response = client.get("/api/v2/aliases", params=params, json=data)
+    response.raise_for_status()
+    return response.json()["aliases"]
+
+
+def print_alias_table(aliases, page=0, all_pages=False):
+    """Print aliases as a table, with a hint when more pages may follow"""
+    table_data = [alias_row(alias) for alias in aliases]
+
+    if not table_data:
+        print("No aliases found.")
+        return
+
+    print(render_table(table_data, ALIAS_TABLE_HEADERS))
+
+    if not all_pages and len(table_data) == PAGE_SIZE:
+        print(f"\nShowing page {page}. Use --page or --all to see more results.")
+
+
+def print_aliases(aliases, output_format="table", page=0, all_pages=False):
+    """Print aliases as a table, or stream them in a machine-readable format"""
+    if output_format == "table":
+        print_alias_table(aliases, page, all_pages)
+    else:
+        write_records(aliases, output_format, ALIAS_FIELDS, alias_fields)
+
+
 # API Functions
 def list_aliases(
-    config, page=0, pinned=False, disabled=False, enabled=False, query=None
+    config,
+    page=0,
+    pinned=False,
+    disabled=False,
+    enabled=False,
+    query=None,
+    all_pages=False,
+    workers=DEFAULT_WORKERS,
+    cached=False,
+    output_format="table",
 ):
     """
     List aliases with pagination and filtering support
@@ -152,126 +533,85 @@ def list_aliases(
         disabled: Show only disabled aliases
         enabled: Show only enabled aliases
         query: Search query
+        all_pages: Walk every page instead of only `page`
+        workers: Number of pages fetched concurrently with all_pages
+        cached: Read from the local store instead of the API
+        output_format: "table", or a format supported by write_records
     """
-    headers = get_headers(config)
-    params = {"page_id": page}
-
-    if pinned:
-        params["pinned"] = True
-    elif disabled:
-        params["disabled"] = True
-    elif enabled:
-        params["enabled"] = True
-
-    data = {"query": query} if query else None
+    if cached:
+        store = open_synced_store(config)
+        if store is None:
+            return
 
-    try:
-        response = requests.get(
-            f"{BASE_URL}/api/v2/aliases",
-            headers=headers,
-            params=params,
-            json=data,
-            timeout=10,
+        aliases = store.list_aliases(
+            pinned,
+            disabled,
+            enabled,
+            query,
+            limit=None if all_pages else PAGE_SIZE,
+            offset=page * PAGE_SIZE,
         )
+        store.close()
+        print_aliases(aliases, output_format, page, all_pages)
+        return
 
-        response.raise_for_status()
-
-        aliases = response.json()["aliases"]
-
-        if not aliases:
-            print("No aliases found.")
-            return
+    client = get_client(config, workers)
+    filters = alias_filter_params(pinned, disabled, enabled)
 
-        table_data = []
-        for alias in aliases:
-            enabled_status = "✓" if alias["enabled"] else "❌"
-            pinned_status = "📌" if alias.get("pinned", False) else ""
-
-            latest = alias.get("latest_activity", {})
-            activity = (
-                f"{latest.get('action', 'N/A')} ({format_datetime(latest.get('timestamp', ''))})"
-                if latest
-                else "N/A"
-            )
+    def fetch(page_id):
+        return fetch_alias_page(client, page_id, filters, query)
 
-            mailbox = (
-                alias["mailboxes"][0]["email"] if alias.get("mailboxes") else "N/A"
+    try:
+        if all_pages:
+            pages = fetch_pages(
+                fetch, workers=workers, adaptive=adaptive_limit(client, workers)
             )
+        else:
+            pages = [fetch(page)]
 
-            table_data.append(
-                [
-                    alias["id"],
-                    alias["email"],
-                    alias.get("name", ""),
-                    enabled_status,
-                    pinned_status,
-                    mailbox,
-                    activity,
-                    f"F:{alias.get('nb_forward', 0)} R:{alias.get('nb_reply', 0)} B:{alias.get('nb_block', 0)}",
-                    alias.get("note", ""),
-                ]
-            )
+        print_aliases(
+            (alias for aliases in pages for alias in aliases),
+            output_format,
+            page,
+            all_pages,
+        )
 
-        print(
-            tabulate(
-                table_data,
-                headers=[
-                    "ID",
-                    "Email",
-                    "Name",
-                    "Enabled",
-                    "Pinned",
-                    "Mailbox",
-                    "Latest Activity",
-                    "Stats",
-                    "Note",
-                ],
-                tablefmt="grid",
-            )
+    except requests.exceptions.RequestException as e:
+        print_api_error(
+            "Error connecting to SimpleLogin API", e, file=error_stream(output_format)
         )
 
-        if len(aliases) == 20:
-            print(f"\nShowing page {page}. Use --page to see more results.")
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error connecting to SimpleLogin API: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
+def get_alias_options(config, refresh=False):
+    """
+    Get available options for creating new aliases
 
+    The response cache keeps the options for a shorter time than their signed
+    suffixes stay valid, so consecutive alias creations share a single request.
 
-def get_alias_options(config):
-    """Get available options for creating new aliases"""
-    headers = get_headers(config)
+    Args:
+        config: Configuration dictionary
+        refresh: Ignore the cached options and fetch them again
+    """
+    client = get_client(config)
     params = {}
 
     try:
-        response = requests.get(
-            f"{BASE_URL}/api/v5/alias/options",
-            headers=headers,
-            params=params,
-            timeout=10,
-        )
+        response = client.get("/api/v5/alias/options", params=params, refresh=refresh)
 
         response.raise_for_status()
         return response.json()
 
     except requests.exceptions.RequestException as e:
-        print(f"Error getting alias options: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
+        print_api_error("Error getting alias options", e)
         return None
 
 
+def signed_suffixes(options):
+    """Map each available suffix to its signed suffix"""
+    return {suffix["suffix"]: suffix["signed_suffix"] for suffix in options["suffixes"]}
+
+
 def create_custom_alias(
     config, prefix, suffix_id=None, mailbox_ids=None, note=None, name=None
 ):
@@ -294,25 +634,24 @@ def create_custom_alias(
         return
 
     suffixes = options["suffixes"]
-    suffix_ids = {}
-
-    for suffix in suffixes:
-        suffix_ids[suffix["suffix"]] = suffix["signed_suffix"]
+    suffix_ids = signed_suffixes(options)
 
     if not suffix_ids:
         print("No available suffixes found.")
         return
 
     if suffix_id is not None:
-        signed_suffix = suffixes[suffix_id]["signed_suffix"]
+        suffix = suffixes[suffix_id]["suffix"]
     else:
-        suffix_key = q.select(
+        import questionary as q
+
+        suffix = q.select(
             "Select your email suffix",
             choices=[key for key in suffix_ids.keys()],
         ).ask()
-        signed_suffix = suffix_ids.get(suffix_key)
+    signed_suffix = suffix_ids.get(suffix)
 
-    headers = get_headers(config)
+    client = get_client(config)
     data = {"alias_prefix": prefix, "signed_suffix": signed_suffix}
 
     if mailbox_ids:
@@ -324,12 +663,15 @@ def create_custom_alias(
         data["name"] = name
 
     try:
-        response = requests.post(
-            f"{BASE_URL}/api/v3/alias/custom/new",
-            headers=headers,
-            json=data,
-            timeout=10,
-        )
+        response = client.post("/api/v3/alias/custom/new", json=data)
+
+        if response.status_code == 412:
+            # The signed suffix expired, so sign the same suffix again
+            options = get_alias_options(config, refresh=True)
+            if not options:
+                return
+            data["signed_suffix"] = signed_suffixes(options).get(suffix)
+            response = client.post("/api/v3/alias/custom/new", json=data)
 
         response.raise_for_status()
 
@@ -342,14 +684,17 @@ def create_custom_alias(
             print(f"  Name: {name}")
 
     except requests.exceptions.RequestException as e:
-        print(f"Error creating alias: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
+        print_api_error("Error creating alias", e)
+
+
+def post_random_alias(client, mode=None, note=None):
+    """Create one random alias and return it, raising on request errors"""
+    params = {"mode": mode} if mode else {}
+    data = {"note": note} if note else {}
+
+    response = client.post("/api/alias/random/new", json=data, params=params)
+    response.raise_for_status()
+    return response.json()
 
 
 def create_random_alias(config, mode=None, note=None):
@@ -361,87 +706,112 @@ def create_random_alias(config, mode=None, note=None):
         mode: Either 'uuid' or 'word' (optional)
         note: Optional note
     """
-    headers = get_headers(config)
-    params = {}
-    if mode:
-        if mode not in ("uuid", "word"):
-            print("Mode must be either 'uuid' or 'word'")
-            return
-        params["mode"] = mode
-
-    data = {}
-    if note:
-        data["note"] = note
+    client = get_client(config)
+    if mode and mode not in ("uuid", "word"):
+        print("Mode must be either 'uuid' or 'word'")
+        return
 
     try:
-        response = requests.post(
-            f"{BASE_URL}/api/alias/random/new",
-            headers=headers,
-            json=data,
-            params=params,
-            timeout=10,
-        )
-
-        response.raise_for_status()
-
-        alias = response.json()
+        alias = post_random_alias(client, mode, note)
         print(f"✓ Random alias created: {alias['email']}")
         print(f"  ID: {alias['id']}")
         if note:
             print(f"  Note: {note}")
 
     except requests.exceptions.RequestException as e:
-        print(f"Error creating random alias: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
+        print_api_error("Error creating random alias", e)
+
+
+def create_random_aliases(
+    config,
+    count=None,
+    mode=None,
+    note=None,
+    notes_file=None,
+    workers=DEFAULT_WORKERS,
+    rate=None,
+):
+    """
+    Create random aliases in bulk
+
+    Each created alias is printed to stdout as a JSON line as soon as it is
+    created; errors and the final summary go to stderr.
+
+    Args:
+        config: Configuration dictionary
+        count: Number of aliases (defaults to the number of notes, or 1)
+        mode: Either 'uuid' or 'word' (optional)
+        note: Note for aliases without one in notes_file
+        notes_file: File with one note per line, "-" for stdin. Line i holds
+            the note of the i-th alias
+        workers: Number of aliases created concurrently
+        rate: Maximum number of aliases created per second
+    """
+    if mode and mode not in ("uuid", "word"):
+        print("Mode must be either 'uuid' or 'word'")
+        return
+
+    notes = []
+    if notes_file:
+        with open_input(notes_file) as f:
+            notes = [line.rstrip("\n") for line in f]
+
+    if count is None:
+        count = len(notes) or 1
+
+    alias_notes = [
+        notes[i] if i < len(notes) and notes[i] else note for i in range(count)
+    ]
+
+    client = get_client(config, workers)
+    created = 0
+
+    for _, alias, error in run_concurrently(
+        lambda alias_note: post_random_alias(client, mode, alias_note),
+        alias_notes,
+        workers=workers,
+        rate=rate,
+        adaptive=adaptive_limit(client, workers),
+    ):
+        if error is None:
+            print(json.dumps(alias), flush=True)
+            created += 1
+        elif isinstance(error, requests.exceptions.RequestException):
+            print_api_error("Error creating random alias", error, file=sys.stderr)
+        else:
+            raise error
+
+    print(f"Created {created} of {count} aliases", file=sys.stderr)
 
 
 def toggle_alias(config, alias_id):
     """Toggle an alias on/off"""
-    headers = get_headers(config)
+    client = get_client(config)
 
     try:
-        # First, get current status
-        response = requests.get(
-            f"{BASE_URL}/api/aliases/{alias_id}", headers=headers, timeout=10
-        )
+        # First, get the alias email, bypassing the response cache so a
+        # missing alias is reported before toggling
+        response = client.get(f"/api/aliases/{alias_id}", refresh=True)
         response.raise_for_status()
-
         alias = response.json()
-        current_status = alias["enabled"]
 
-        toggle_response = requests.post(
-            f"{BASE_URL}/api/aliases/{alias_id}/toggle", headers=headers, timeout=10
-        )
+        toggle_response = client.post(f"/api/aliases/{alias_id}/toggle")
         toggle_response.raise_for_status()
 
-        new_status = "enabled" if not current_status else "disabled"
+        # The toggle response holds the new state, whatever the alias was before
+        new_status = "enabled" if toggle_response.json()["enabled"] else "disabled"
         print(f"✓ Alias {alias['email']} is now {new_status}")
 
     except requests.exceptions.RequestException as e:
-        print(f"Error toggling alias: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
+        print_api_error("Error toggling alias", e)
 
 
 def delete_alias(config, alias_id):
     """Delete an alias"""
-    headers = get_headers(config)
+    client = get_client(config)
 
     try:
-        response = requests.get(
-            f"{BASE_URL}/api/aliases/{alias_id}", headers=headers, timeout=10
-        )
+        response = client.get(f"/api/aliases/{alias_id}")
         response.raise_for_status()
 
         alias_email = response.json()["email"]
@@ -451,498 +821,1945 @@ def delete_alias(config, alias_id):
             print("Deletion cancelled.")
             return
 
-        delete_response = requests.delete(
-            f"{BASE_URL}/api/aliases/{alias_id}", headers=headers, timeout=10
-        )
+        delete_response = client.delete(f"/api/aliases/{alias_id}")
         delete_response.raise_for_status()
 
         print(f"✓ Alias {alias_email} deleted successfully")
 
     except requests.exceptions.RequestException as e:
-        print(f"Error deleting alias: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
+        print_api_error("Error deleting alias", e)
 
 
-def alias_info(config, alias_id):
-    """Show detailed information about an alias"""
-    headers = get_headers(config)
+def read_identifiers(path):
+    """Yield the non-empty lines of a file ("-" for stdin), skipping # comments"""
+    with open_input(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
 
-    try:
-        response = requests.get(
-            f"{BASE_URL}/api/aliases/{alias_id}", headers=headers, timeout=10
-        )
-        response.raise_for_status()
 
-        alias = response.json()
+def lookup_alias_id(client, email):
+    """Find the id of the alias with this exact email through the API"""
+    for alias in fetch_alias_page(client, 0, query=email):
+        if alias["email"].lower() == email.lower():
+            return alias["id"]
+    return None
 
-        print(f"Alias: {alias['email']}")
-        print(f"ID: {alias['id']}")
-        print(f"Creation date: {format_datetime(alias.get('creation_date', 'N/A'))}")
-        print(f"Enabled: {'Yes' if alias['enabled'] else 'No'}")
 
-        if "note" in alias and alias["note"]:
-            print(f"Note: {alias['note']}")
+def set_alias_enabled(client, alias_id, enabled, current=None):
+    """
+    Enable or disable an alias, toggling it only when needed
 
-        if "mailboxes" in alias and alias["mailboxes"]:
-            print("\nMailboxes:")
-            for mailbox in alias["mailboxes"]:
-                print(f"  - {mailbox['email']} (ID: {mailbox['id']})")
-        elif "mailbox" in alias:
-            print(f"Mailbox: {alias['mailbox']['email']}")
+    Args:
+        client: API client
+        alias_id: Alias ID
+        enabled: Requested state
+        current: Known current state, e.g. from the local store. When None,
+            the state is read from the API first: toggling blindly and
+            toggling back would briefly flip aliases already in the
+            requested state.
+
+    Returns True if the alias was toggled. Raises on request errors.
+    """
+    if current is None:
+        response = client.get(f"/api/aliases/{alias_id}", refresh=True)
+        response.raise_for_status()
+        current = response.json()["enabled"]
 
-        if "nb_forward" in alias:
-            print(f"Forwarded emails: {alias['nb_forward']}")
+    if current == enabled:
+        return False
 
-        if "nb_reply" in alias:
-            print(f"Reply emails: {alias['nb_reply']}")
+    response = client.post(f"/api/aliases/{alias_id}/toggle")
+    response.raise_for_status()
 
-        if "nb_block" in alias:
-            print(f"Blocked emails: {alias['nb_block']}")
+    if response.json()["enabled"] != enabled:
+        # The known state was stale: the alias already was as requested
+        response = client.post(f"/api/aliases/{alias_id}/toggle")
+        response.raise_for_status()
+        return False
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error getting alias info: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
+    return True
 
 
-def list_contacts(config, alias_id, page=0):
-    """List contacts for an alias"""
-    headers = get_headers(config)
-    params = {"page_id": page, "alias_id": alias_id}
+def bulk_alias_action(
+    config, from_file, action, workers=DEFAULT_WORKERS, rate=None, cached=False
+):
+    """
+    Toggle, enable, disable or delete every alias listed in a file
 
-    try:
-        response = requests.get(
-            f"{BASE_URL}/api/aliases/{alias_id}/contacts",
-            headers=headers,
-            params=params,
-            timeout=10,
-        )
+    Each line holds an alias id or email. Emails are resolved from the local
+    store when it has been synced, otherwise through an API search. A result
+    per alias (ok / not found / error) is printed once all are done, and the
+    local store is updated with the changes.
 
+    Args:
+        config: Configuration dictionary
+        from_file: File with one alias id or email per line ("-" for stdin)
+        action: One of "toggle", "enable", "disable" or "delete"
+        workers: Number of aliases processed concurrently
+        rate: Maximum number of aliases processed per second
+        cached: Trust the enabled state stored by sync for enable/disable
+    """
+    client = get_client(config, workers)
+    store = open_store(config)
+    if not store.synced:
+        store.close()
+        store = None
+
+    def resolve(identifiers):
+        # The store is only used from this thread; API lookups run in workers
+        for index, identifier in enumerate(identifiers):
+            alias_id = int(identifier) if identifier.isdigit() else None
+            current = None
+            if store is not None:
+                if alias_id is None:
+                    alias = store.find_alias_by_email(identifier)
+                else:
+                    alias = store.get_alias(alias_id)
+                if alias:
+                    alias_id = alias["id"]
+                    current = alias["enabled"] if cached else None
+            yield index, identifier, alias_id, current
+
+    def apply(item):
+        _, identifier, alias_id, current = item
+        if alias_id is None:
+            alias_id = lookup_alias_id(client, identifier)
+            if alias_id is None:
+                return alias_id, "not found", "", None
+
+        if action == "toggle":
+            response = client.post(f"/api/aliases/{alias_id}/toggle")
+            response.raise_for_status()
+            enabled = response.json()["enabled"]
+            return alias_id, "ok", "enabled" if enabled else "disabled", enabled
+
+        if action in ("enable", "disable"):
+            enabled = action == "enable"
+            changed = set_alias_enabled(client, alias_id, enabled, current)
+            detail = f"{action}d" if changed else f"already {action}d"
+            return alias_id, "ok", detail, enabled
+
+        response = client.delete(f"/api/aliases/{alias_id}")
         response.raise_for_status()
+        return alias_id, "ok", "deleted", None
 
-        contacts = response.json()["contacts"]
-
-        if not contacts:
-            print("No contacts found.")
-            return
-
-        table_data = []
-        for contact in contacts:
+    results = []
+    try:
+        for item, outcome, error in run_concurrently(
+            apply,
+            resolve(read_identifiers(from_file)),
+            workers=workers,
+            rate=rate,
+            adaptive=adaptive_limit(client, workers),
+        ):
+            index, identifier = item[:2]
+            if error is None:
+                alias_id, status, detail, enabled = outcome
+                if store is not None and status == "ok":
+                    if action == "delete":
+                        store.delete_alias(alias_id)
+                    else:
+                        store.update_alias(alias_id, enabled=enabled)
+            elif (
+                isinstance(error, requests.exceptions.HTTPError)
+                and error.response is not None
+                and error.response.status_code == 404
+            ):
+                status, detail = "not found", ""
+            elif isinstance(error, requests.exceptions.RequestException):
+                status, detail = "error", str(error)
+            else:
+                raise error
+            results.append((index, identifier, status, detail))
+    finally:
+        if store is not None:
+            store.close()
+
+    if not results:
+        print("No aliases given.")
+        return
 
-            block_forward = "✓" if contact.get("block_forward", True) else "✗"
+    results.sort()
+    print(
+        render_table(
+            [row[1:] for row in results],
+            ["Alias", "Result", "Detail"],
+        )
+    )
 
-            table_data.append(
-                [
-                    contact["id"],
-                    contact["contact"],
-                    contact["reverse_alias"],
-                    format_datetime(contact["last_email_sent_date"]),
-                    block_forward,
-                ]
-            )
+    counts = {status: 0 for status in ("ok", "not found", "error")}
+    for row in results:
+        counts[row[2]] += 1
+    print(
+        f"\n{counts['ok']} ok, {counts['not found']} not found, {counts['error']} errors"
+    )
 
-        print(
-            tabulate(
-                table_data,
-                headers=[
-                    "ID",
-                    "Contact",
-                    "Reverse Alias",
-                    "Last Email Sent",
-                    "Block Forward",
-                ],
-                tablefmt="grid",
-            )
-        )
 
-        if len(contacts) == 20:
-            print(f"\nShowing page {page}. Use --page to see more results.")
+def toggle_aliases(config, from_file, workers=DEFAULT_WORKERS, rate=None):
+    """Toggle every alias listed in a file ("-" for stdin)"""
+    bulk_alias_action(config, from_file, "toggle", workers=workers, rate=rate)
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error connecting to SimpleLogin API: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
 
+def enable_alias(config, alias_id, enabled, cached=False):
+    """
+    Enable or disable an alias, doing nothing if it already is
 
-def create_contact(config, alias_id, contact):
-    """Create a new contact for an alias"""
-    headers = get_headers(config)
-    data = {"contact": contact}
+    Args:
+        config: Configuration dictionary
+        alias_id: Alias ID
+        enabled: True to enable the alias, False to disable it
+        cached: Trust the enabled state stored by sync instead of reading it
+    """
+    client = get_client(config)
+    state = "enabled" if enabled else "disabled"
+    store = open_store(config)
 
     try:
-        response = requests.post(
-            f"{BASE_URL}/api/aliases/{alias_id}/contacts",
-            headers=headers,
-            timeout=10,
-            json=data,
-        )
-        response.raise_for_status()
-
-        contact = response.json()
+        alias = None
+        if store.synced and alias_id.isdigit():
+            alias = store.get_alias(alias_id)
+        current = alias["enabled"] if alias and cached else None
 
-        if contact["existed"]:
-            print("  Contact already exists.")
+        if set_alias_enabled(client, alias_id, enabled, current):
+            print(f"✓ Alias {alias['email'] if alias else alias_id} is now {state}")
         else:
-            print(f"  ✓ Contact created")
-        print(f"  ID: {contact['id']}")
-        print(f"  Reverse alias: {contact['reverse_alias']}")
+            print(f"Alias {alias['email'] if alias else alias_id} is already {state}")
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error creating contact: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
+        if alias:
+            store.update_alias(alias_id, enabled=enabled)
 
+    except requests.exceptions.RequestException as e:
+        print_api_error("Error updating alias", e)
 
-def delete_contact(config, contact_id):
-    """Delete a contact for an alias"""
-    headers = get_headers(config)
+    finally:
+        store.close()
 
-    try:
-        response = requests.delete(
-            f"{BASE_URL}/api/contacts/{contact_id}",
-            headers=headers,
-            timeout=10,
-        )
-        response.raise_for_status()
 
-        delete_response = response.json()
+def enable_aliases(
+    config, from_file, enabled, workers=DEFAULT_WORKERS, rate=None, cached=False
+):
+    """Enable or disable every alias listed in a file ("-" for stdin)"""
+    action = "enable" if enabled else "disable"
+    bulk_alias_action(
+        config, from_file, action, workers=workers, rate=rate, cached=cached
+    )
 
-        if delete_response["deleted"]:
-            print("✓ Contact deleted successfully")
-        else:
-            print(" Contact not found")
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error deleting contact: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
+def delete_aliases(config, from_file, yes=False, workers=DEFAULT_WORKERS, rate=None):
+    """
+    Delete every alias listed in a file ("-" for stdin)
 
+    Without `yes`, the aliases are counted and a single confirmation is asked
+    for. Aliases read from stdin always require `yes`, since stdin cannot also
+    answer the prompt.
+    """
+    if not yes:
+        if from_file == "-":
+            print("Use --yes to delete aliases read from stdin.")
+            return
 
-def toggle_contact(config, contact_id):
+        count = sum(1 for _ in read_identifiers(from_file))
+        confirm = input(f"Are you sure you want to delete {count} aliases? (y/n): ")
+        if confirm.lower() != "y":
+            print("Deletion cancelled.")
+            return
+
+    bulk_alias_action(config, from_file, "delete", workers=workers, rate=rate)
+
+
+def alias_info(config, alias_id, cached=False):
+    """Show detailed information about an alias"""
+    if cached:
+        store = open_synced_store(config)
+        if store is None:
+            return
+
+        if alias_id.isdigit():
+            alias = store.get_alias(alias_id)
+        else:
+            alias = store.find_alias_by_email(alias_id)
+        store.close()
+
+        if not alias:
+            print(f"Alias {alias_id} not found in local data.")
+            return
+
+        print_alias_info(alias)
+        return
+
+    client = get_client(config)
+
+    try:
+        response = client.get(f"/api/aliases/{alias_id}")
+        response.raise_for_status()
+
+        print_alias_info(response.json())
+
+    except requests.exceptions.RequestException as e:
+        print_api_error("Error getting alias info", e)
+
+
+def print_alias_info(alias):
+    """Print the details of an alias"""
+    print(f"Alias: {alias['email']}")
+    print(f"ID: {alias['id']}")
+    print(f"Creation date: {format_datetime(alias.get('creation_date', 'N/A'))}")
+    print(f"Enabled: {'Yes' if alias['enabled'] else 'No'}")
+
+    if "note" in alias and alias["note"]:
+        print(f"Note: {alias['note']}")
+
+    if "mailboxes" in alias and alias["mailboxes"]:
+        print("\nMailboxes:")
+        for mailbox in alias["mailboxes"]:
+            print(f"  - {mailbox['email']} (ID: {mailbox['id']})")
+    elif "mailbox" in alias:
+        print(f"Mailbox: {alias['mailbox']['email']}")
+
+    if "nb_forward" in alias:
+        print(f"Forwarded emails: {alias['nb_forward']}")
+
+    if "nb_reply" in alias:
+        print(f"Reply emails: {alias['nb_reply']}")
+
+    if "nb_block" in alias:
+        print(f"Blocked emails: {alias['nb_block']}")
+
+
+def search_aliases(config, pattern, mode="substring", limit=None):
+    """
+    Search the local copy of the aliases
+
+    Args:
+        config: Configuration dictionary
+        pattern: Text matched against alias email, name, note and mailbox email
+        mode: One of "substring", "prefix", "regex" or "fuzzy"
+        limit: Maximum number of aliases shown
+    """
+    store = open_synced_store(config)
+    if store is None:
+        return
+
+    try:
+        aliases = store.search_aliases(pattern, mode=mode, limit=limit)
+    except re.error as e:
+        print(f"Invalid regular expression: {e}")
+        return
+    finally:
+        store.close()
+
+    print_alias_table(aliases, all_pages=True)
+
+
+def alias_stats(
+    config,
+    top=DEFAULT_TOP,
+    by=None,
+    workers=DEFAULT_WORKERS,
+    cached=False,
+    output_format="table",
+):
+    """
+    Show totals, distributions and the top aliases of the whole account
+
+    Aliases are aggregated as the pages arrive and are not kept, so this runs
+    in the same memory whatever the size of the account.
+
+    Args:
+        config: Configuration dictionary
+        top: Number of aliases listed by forwards and by blocks
+        by: Also break the totals down per "mailbox" or "domain"
+        workers: Number of pages fetched concurrently
+        cached: Read from the local store instead of the API
+        output_format: "table" or "json"
+    """
+    if output_format not in ("table", "json"):
+        print("Error: aliases stats can only be shown as a table or as json.")
+        return
+
+    try:
+        stats = AliasStats(top, by)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    if cached:
+        store = open_synced_store(config)
+        if store is None:
+            return
+        try:
+            stats.update(store.iter_aliases())
+        finally:
+            store.close()
+    else:
+        client = get_client(config, workers)
+
+        def fetch(page_id):
+            return fetch_alias_page(client, page_id)
+
+        try:
+            for aliases in fetch_pages(
+                fetch, workers=workers, adaptive=adaptive_limit(client, workers)
+            ):
+                stats.update(aliases)
+        except requests.exceptions.RequestException as e:
+            print_api_error(
+                "Error connecting to SimpleLogin API",
+                e,
+                file=error_stream(output_format),
+            )
+            return
+
+    if output_format == "json":
+        print(json.dumps(stats.to_dict(), indent=2))
+    else:
+        print_alias_stats(stats)
+
+
+def print_alias_stats(stats):
+    """Print AliasStats as tables"""
+    if not stats.aliases:
+        print("No aliases found.")
+        return
+
+    print(
+        render_table(
+            [
+                [
+                    stats.aliases,
+                    stats.enabled,
+                    stats.aliases - stats.enabled,
+                    stats.pinned,
+                    stats.totals["nb_forward"],
+                    stats.totals["nb_reply"],
+                    stats.totals["nb_block"],
+                ]
+            ],
+            [
+                "Aliases",
+                "Enabled",
+                "Disabled",
+                "Pinned",
+                "Forwards",
+                "Replies",
+                "Blocks",
+            ],
+        )
+    )
+
+    print("\nAliases by number of emails")
+    print(
+        render_table(
+            [
+                [label, forwards, blocks]
+                for (label, _), forwards, blocks in zip(
+                    BUCKETS,
+                    stats.distribution["nb_forward"],
+                    stats.distribution["nb_block"],
+                )
+            ],
+            ["Emails", "Forwarded", "Blocked"],
+        )
+    )
+
+    for title, column, entries in (
+        ("Most forwarded", "Forwards", stats.top_forwards),
+        ("Most blocked", "Blocks", stats.top_blocks),
+    ):
+        rows = [
+            [alias_id, email, "Yes" if enabled else "No", count]
+            for count, alias_id, email, enabled in entries.items()
+        ]
+        if rows:
+            print(f"\n{title}")
+            print(render_table(rows, ["ID", "Email", "Enabled", column]))
+
+    if stats.by:
+        print(f"\nBy {stats.by}")
+        print(
+            render_table(
+                [
+                    [
+                        group["name"],
+                        group["aliases"],
+                        group["enabled"],
+                        group["nb_forward"],
+                        group["nb_reply"],
+                        group["nb_block"],
+                    ]
+                    for group in stats.sorted_groups()
+                ],
+                [
+                    stats.by.title(),
+                    "Aliases",
+                    "Enabled",
+                    "Forwards",
+                    "Replies",
+                    "Blocks",
+                ],
+            )
+        )
+
+
+ACTIVITY_FIELDS = [
+    "timestamp",
+    "alias_id",
+    "alias",
+    "action",
+    "from",
+    "to",
+    "reverse_alias_address",
+]
+
+
+def fetch_activity_page(client, alias_id, page):
+    """Fetch one page of an alias's activities, raising on request errors"""
+    response = client.get(
+        f"/api/aliases/{alias_id}/activities", params={"page_id": page}
+    )
+    response.raise_for_status()
+    return response.json()["activities"]
+
+
+def alias_activity(config, workers=DEFAULT_WORKERS, peek=False, output_format="table"):
+    """
+    Show the activity of every alias since the previous run, oldest first
+
+    Aliases whose latest activity has not changed since the previous run are
+    skipped without a request. The others are read concurrently, only up to
+    the activities already shown, and their new activities are merged into a
+    single feed. The first run shows the whole history.
+
+    Args:
+        config: Configuration dictionary
+        workers: Number of concurrent API requests
+        peek: Show new activity without marking it as seen
+        output_format: "table", or a format supported by write_records
+    """
+    client = get_client(config, workers)
+    store = open_store(config)
+    marks = store.activity_marks()
+    listed = []
+    failed = []
+    feeds = []
+    updates = []
+
+    def read(alias):
+        """New activities of an alias, newest first, or None if unchanged"""
+        key = activity_key(alias)
+        activity, mark = marks.get(alias["id"], (None, None))
+        if key is None or activity == key:
+            return None
+        return collect_new(
+            lambda page: fetch_activity_page(client, alias["id"], page),
+            mark,
+            PAGE_SIZE,
+        )
+
+    try:
+        for alias, new, error in map_pages(
+            read,
+            lambda page: fetch_alias_page(client, page),
+            workers=workers,
+            adaptive=adaptive_limit(client, workers),
+        ):
+            listed.append(alias["id"])
+            if error is not None:
+                failed.append((alias, error))
+            elif new is not None:
+                feeds.append(
+                    [dict(a, alias_id=alias["id"], alias=alias["email"]) for a in new]
+                )
+                mark = marks.get(alias["id"], (None, None))[1]
+                updates.append(
+                    (alias["id"], activity_key(alias), advance_mark(mark, new))
+                )
+    except requests.exceptions.RequestException as e:
+        store.close()
+        print_api_error(
+            "Error connecting to SimpleLogin API", e, file=error_stream(output_format)
+        )
+        return
+
+    print_activities(merge_feeds(feeds), output_format)
+
+    for alias, error in failed:
+        print_api_error(
+            f"Error reading the activity of {alias['email']}", error, file=sys.stderr
+        )
+
+    if not peek:
+        store.save_activity_marks(updates)
+        store.prune_activity_marks(listed)
+    store.close()
+
+
+def print_activities(activities, output_format="table"):
+    """Print activities as a table, or stream them in a machine-readable format"""
+    if output_format != "table":
+        write_records(
+            activities,
+            output_format,
+            ACTIVITY_FIELDS,
+            lambda activity: [activity.get(field) for field in ACTIVITY_FIELDS],
+        )
+        return
+
+    table_data = [
+        [
+            format_datetime(activity["timestamp"]),
+            activity["alias"],
+            activity.get("action"),
+            activity.get("from"),
+            activity.get("to"),
+        ]
+        for activity in activities
+    ]
+    if not table_data:
+        print("No new activity.")
+        return
+
+    print(render_table(table_data, ["Time", "Alias", "Action", "From", "To"]))
+
+
+def fetch_all_alias_pages(client, first_page=None, workers=DEFAULT_WORKERS):
+    """Every page of aliases, reusing the first one if it was already fetched"""
+    if first_page is None:
+        pages = []
+    elif len(first_page) < PAGE_SIZE:
+        return [first_page]
+    else:
+        pages = [first_page]
+
+    pages.extend(
+        fetch_pages(
+            lambda page: fetch_alias_page(client, page),
+            workers=workers,
+            start=len(pages),
+            adaptive=adaptive_limit(client, workers),
+        )
+    )
+    return pages
+
+
+def watch_aliases(
+    config,
+    interval=30,
+    max_interval=300,
+    workers=DEFAULT_WORKERS,
+    output_format="table",
+):
+    """
+    Report alias changes as they happen, until interrupted
+
+    The first page holding unpinned aliases, where new activity shows up, is
+    polled every `interval` seconds, or less often while nothing changes, and
+    all pages are walked when it changed or at least every `max_interval`
+    seconds. A walk that misses aliases is followed by another at the next
+    poll, which confirms their deletion. Events are written one per line.
+
+    Args:
+        config: Configuration dictionary
+        interval: Shortest time between two polls, in seconds
+        max_interval: Longest time between two walks of all pages, in seconds
+        workers: Number of pages fetched concurrently during a walk
+        output_format: "table" for readable lines or "jsonl"
+    """
+    if output_format not in ("table", "jsonl"):
+        print("Error: aliases watch writes events as a table or as jsonl.")
+        return
+
+    client = get_client(config, workers)
+    watcher = AliasWatcher()
+    schedule = PollInterval(interval, max_interval)
+    last_walk = None
+
+    try:
+        while True:
+            try:
+                poll_page = watcher.poll_page
+                polled = fetch_alias_page(client, poll_page)
+                due = (
+                    last_walk is None
+                    or time.monotonic() - last_walk >= max_interval
+                    or watcher.poll_page_changed(polled)
+                    or watcher.missing
+                )
+                if due:
+                    pages = fetch_all_alias_pages(
+                        client, polled if poll_page == 0 else None, workers
+                    )
+                    last_walk = time.monotonic()
+                    initial = not watcher.walked
+                    events = watcher.update(pages)
+
+                    if initial:
+                        print(
+                            f"Watching {len(watcher.aliases)} aliases...",
+                            file=sys.stderr,
+                        )
+                    for event in events:
+                        print_watch_event(event, output_format)
+                    if events:
+                        schedule.changed()
+                    else:
+                        schedule.unchanged()
+                else:
+                    schedule.unchanged()
+
+            except requests.exceptions.RequestException as e:
+                # Keep watching through outages, the next poll may succeed
+                print_api_error("Error polling SimpleLogin API", e, file=sys.stderr)
+
+            time.sleep(schedule.value)
+
+    except KeyboardInterrupt:
+        pass
+
+
+def print_watch_event(event, output_format="table"):
+    """Write one watch event to stdout, right away"""
+    event = dict(event, time=datetime.now().astimezone().isoformat(timespec="seconds"))
+
+    if output_format == "jsonl":
+        print(json.dumps(event), flush=True)
+        return
+
+    line = (
+        f"{format_datetime(event['time'])}  {event['event']:<9} "
+        f"{event['alias']} ({event['alias_id']})"
+    )
+    latest = event.get("latest_activity") or {}
+    if latest.get("action"):
+        contact = (latest.get("contact") or {}).get("email")
+        line += f": {latest['action']}" + (f" from {contact}" if contact else "")
+    print(line, flush=True)
+
+
+CONTACT_FIELDS = [
+    "id",
+    "contact",
+    "reverse_alias",
+    "last_email_sent_date",
+    "block_forward",
+]
+
+# Contacts listed across aliases also say which alias they belong to
+ALL_CONTACT_FIELDS = ["alias_id", "alias"] + CONTACT_FIELDS
+
+
+def fetch_contact_page(client, alias_id, page):
+    """Fetch one page of an alias's contacts, raising on request errors"""
+    params = {"page_id": page, "alias_id": alias_id}
+    response = client.get(f"/api/aliases/{alias_id}/contacts", params=params)
+    response.raise_for_status()
+    return response.json()["contacts"]
+
+
+def fetch_all_contacts(client, alias_id):
+    """Fetch every contact of an alias, one page after the other"""
+    contacts = []
+    page = 0
+    while True:
+        batch = fetch_contact_page(client, alias_id, page)
+        contacts.extend(batch)
+        if len(batch) < PAGE_SIZE:
+            return contacts
+        page += 1
+
+
+def print_contacts(contacts, output_format="table", with_alias=False):
+    """
+    Print contacts as a table, or stream them in a machine-readable format
+
+    Args:
+        contacts: Iterable of contacts
+        output_format: "table", or a format supported by write_records
+        with_alias: Include the alias each contact belongs to
+
+    Returns the number of contacts printed.
+    """
+    fields = ALL_CONTACT_FIELDS if with_alias else CONTACT_FIELDS
+    if output_format != "table":
+        return write_records(
+            contacts,
+            output_format,
+            fields,
+            lambda contact: [contact.get(field) for field in fields],
+        )
+
+    table_data = []
+    for contact in contacts:
+        block_forward = "✓" if contact.get("block_forward", True) else "✗"
+
+        table_data.append(
+            ([contact["alias"]] if with_alias else [])
+            + [
+                contact["id"],
+                contact["contact"],
+                contact["reverse_alias"],
+                format_datetime(contact["last_email_sent_date"]),
+                block_forward,
+            ]
+        )
+
+    if not table_data:
+        print("No contacts found.")
+        return 0
+
+    print(
+        render_table(
+            table_data,
+            (["Alias"] if with_alias else [])
+            + [
+                "ID",
+                "Contact",
+                "Reverse Alias",
+                "Last Email Sent",
+                "Block Forward",
+            ],
+        )
+    )
+    return len(table_data)
+
+
+def list_contacts(
+    config,
+    alias_id,
+    page=0,
+    all_pages=False,
+    workers=DEFAULT_WORKERS,
+    output_format="table",
+):
+    """
+    List contacts for an alias
+
+    Args:
+        config: Configuration dictionary
+        alias_id: Alias ID
+        page: Page number (starts at 0)
+        all_pages: Walk every page instead of only `page`
+        workers: Number of pages fetched concurrently with all_pages
+        output_format: "table", or a format supported by write_records
+    """
+    client = get_client(config, workers)
+
+    def fetch(page_id):
+        return fetch_contact_page(client, alias_id, page_id)
+
+    try:
+        if all_pages:
+            pages = fetch_pages(
+                fetch, workers=workers, adaptive=adaptive_limit(client, workers)
+            )
+        else:
+            pages = [fetch(page)]
+
+        count = print_contacts(
+            (contact for contacts in pages for contact in contacts), output_format
+        )
+
+        if output_format == "table" and not all_pages and count == PAGE_SIZE:
+            print(f"\nShowing page {page}. Use --page or --all to see more results.")
+
+    except requests.exceptions.RequestException as e:
+        print_api_error(
+            "Error connecting to SimpleLogin API", e, file=error_stream(output_format)
+        )
+
+
+def list_all_contacts(config, workers=DEFAULT_WORKERS, output_format="table"):
+    """
+    List the contacts of every alias as one inventory
+
+    Alias pages are walked while the contacts of aliases already seen are
+    fetched, all within `workers` concurrent requests. Contacts come out in
+    completion order, each tagged with its alias.
+
+    Args:
+        config: Configuration dictionary
+        workers: Number of concurrent API requests
+        output_format: "table", or a format supported by write_records
+    """
+    client = get_client(config, workers)
+    failed = []
+
+    def contacts():
+        for alias, alias_contacts, error in map_pages(
+            lambda alias: fetch_all_contacts(client, alias["id"]),
+            lambda page: fetch_alias_page(client, page),
+            workers=workers,
+            adaptive=adaptive_limit(client, workers),
+        ):
+            if error is not None:
+                failed.append((alias, error))
+                continue
+            for contact in alias_contacts:
+                yield dict(contact, alias_id=alias["id"], alias=alias["email"])
+
+    try:
+        print_contacts(contacts(), output_format, with_alias=True)
+
+    except requests.exceptions.RequestException as e:
+        print_api_error(
+            "Error connecting to SimpleLogin API", e, file=error_stream(output_format)
+        )
+
+    for alias, error in failed:
+        print_api_error(
+            f"Error listing contacts of {alias['email']}", error, file=sys.stderr
+        )
+
+
+def create_contact(config, alias_id, contact):
+    """Create a new contact for an alias"""
+    client = get_client(config)
+    data = {"contact": contact}
+
+    try:
+        response = client.post(
+            f"/api/aliases/{alias_id}/contacts",
+            timeout=10,
+            json=data,
+        )
+        response.raise_for_status()
+
+        contact = response.json()
+
+        if contact["existed"]:
+            print("  Contact already exists.")
+        else:
+            print(f"  ✓ Contact created")
+        print(f"  ID: {contact['id']}")
+        print(f"  Reverse alias: {contact['reverse_alias']}")
+
+    except requests.exceptions.RequestException as e:
+        print_api_error("Error creating contact", e)
+
+
+def delete_contact(config, contact_id):
     """Delete a contact for an alias"""
-    headers = get_headers(config)
+    client = get_client(config)
+
+    try:
+        response = client.delete(f"/api/contacts/{contact_id}")
+        response.raise_for_status()
+
+        delete_response = response.json()
+
+        if delete_response["deleted"]:
+            print("✓ Contact deleted successfully")
+        else:
+            print(" Contact not found")
+
+    except requests.exceptions.RequestException as e:
+        print_api_error("Error deleting contact", e)
+
+
+def toggle_contact(config, contact_id):
+    """Delete a contact for an alias"""
+    client = get_client(config)
+
+    try:
+        response = client.post(f"/api/contacts/{contact_id}/toggle")
+        response.raise_for_status()
+
+        toggle_response = response.json()
+
+        new_status = "unblocked" if not toggle_response["block_forward"] else "blocked"
+        print(f"  Contact has been {new_status}")
+
+    except requests.exceptions.RequestException as e:
+        print_api_error("Error toggling contact", e)
+
+
+DOMAIN_FIELDS = [
+    "id",
+    "domain_name",
+    "name",
+    "is_verified",
+    "catch_all",
+    "random_prefix_generation",
+    "nb_alias",
+    "creation_date",
+]
+
+
+def list_domains(config, cached=False, output_format="table"):
+    """List all custom domains"""
+    if cached:
+        store = open_synced_store(config)
+        if store is None:
+            return
+
+        print_domains(store.custom_domains(), output_format)
+        store.close()
+        return
+
+    client = get_client(config)
+
+    try:
+        response = client.get("/api/custom_domains", refresh=True)
+        response.raise_for_status()
+
+        print_domains(response.json()["custom_domains"], output_format)
+
+    except requests.exceptions.RequestException as e:
+        print_api_error("Error listing domains", e, file=error_stream(output_format))
+
 
+def print_domains(domains, output_format="table"):
+    """Print custom domains as a table, or in a machine-readable format"""
+    if output_format == "table":
+        print_domain_table(domains)
+    else:
+        write_records(
+            domains,
+            output_format,
+            DOMAIN_FIELDS,
+            lambda domain: [domain.get(field) for field in DOMAIN_FIELDS],
+        )
+
+
+def print_domain_table(domains):
+    """Print custom domains as a table"""
+    if not domains:
+        print("No custom domains found.")
+        return
+
+    table_data = []
+    for domain in domains:
+        verified_status = "✓" if domain.get("is_verified", False) else "✗"
+        catch_all_status = "✓" if domain.get("catch_all", False) else "✗"
+
+        table_data.append(
+            [
+                domain["id"],
+                domain["domain_name"],
+                verified_status,
+                catch_all_status,
+                domain.get("nb_alias", 0),
+            ]
+        )
+
+    print(
+        render_table(
+            table_data,
+            ["ID", "Domain", "Verified", "Catch-All", "# Aliases"],
+        )
+    )
+
+
+def index_domains(domains):
+    """Index custom domains by id and by domain name"""
+    return {
+        "by_id": {str(d["id"]): d for d in domains},
+        "by_name": {d["domain_name"].lower(): str(d["id"]) for d in domains},
+    }
+
+
+def get_domain_index(config):
+    """
+    Get the custom domain index, built from the (usually cached) domain list
+
+    Raises requests.exceptions.RequestException if the list has to be fetched
+    and the request fails.
+    """
+    client = get_client(config)
+    response = client.get("/api/custom_domains")
+    response.raise_for_status()
+    return index_domains(response.json()["custom_domains"])
+
+
+def find_domain(index, domain):
+    """Look up a custom domain in an index by id or by domain name"""
+    domain_id = index["by_name"].get(domain.lower(), domain)
+    return index["by_id"].get(domain_id)
+
+
+def domain_info(config, domain):
+    """
+    Show detailed information about a custom domain
+
+    Args:
+        domain: Custom domain id or domain name
+    """
     try:
-        response = requests.post(
-            f"{BASE_URL}/api/contacts/{contact_id}/toggle",
-            headers=headers,
-            timeout=10,
+        found = find_domain(get_domain_index(config), domain)
+    except requests.exceptions.RequestException as e:
+        print_api_error("Error getting domain info", e)
+        return
+
+    if not found:
+        print(f"Domain {domain} not found.")
+        return
+
+    print_domain_info(found)
+
+
+def print_domain_info(domain):
+    """Print the details of a custom domain"""
+    print(f"Domain: {domain['domain_name']}")
+    print(f"ID: {domain['id']}")
+    print(f"Name: {domain.get('name', 'N/A')}")
+    print(f"Creation date: {format_datetime(domain.get('creation_date', 'N/A'))}")
+    print(f"Verified: {'Yes' if domain.get('is_verified', False) else 'No'}")
+    print(f"Catch-all: {'Enabled' if domain.get('catch_all', False) else 'Disabled'}")
+    print(
+        f"Random prefix generation: {'Enabled' if domain.get('random_prefix_generation', False) else 'Disabled'}"
+    )
+    print(f"Number of aliases: {domain.get('nb_alias', 0)}")
+
+    if "mailboxes" in domain and domain["mailboxes"]:
+        print("\nLinked mailboxes:")
+        for mailbox in domain["mailboxes"]:
+            print(f"  - {mailbox['email']} (ID: {mailbox['id']})")
+    else:
+        print("\nNo mailboxes linked to this domain.")
+
+
+def update_domain(
+    config, domain_id, catch_all=None, random_prefix=None, name=None, mailboxes=None
+):
+    """Update a custom domain's settings"""
+    client = get_client(config)
+
+    data = {}
+    if catch_all is not None:
+        data["catch_all"] = catch_all.lower() == "true"
+    if random_prefix is not None:
+        data["random_prefix_generation"] = random_prefix.lower() == "true"
+    if name is not None:
+        data["name"] = name
+    if mailboxes is not None:
+        try:
+            data["mailbox_ids"] = [int(id.strip()) for id in mailboxes.split(",")]
+        except ValueError:
+            print("Error: Mailbox IDs must be comma-separated integers.")
+            return
+
+    if not data:
+        print(
+            "No changes specified. Use --catch-all, --random-prefix, --name, or --mailboxes."
         )
+        return
+
+    # The PATCH invalidates the cached domain list, which is updated in place
+    # below instead
+    cache = client.response_cache
+    cached = cache.lookup("/api/custom_domains") if cache is not None else None
+
+    try:
+        response = client.patch(f"/api/custom_domains/{domain_id}", json=data)
         response.raise_for_status()
 
-        toggle_response = response.json()
+        print(f"✓ Domain updated successfully")
 
-        new_status = "unblocked" if not toggle_response["block_forward"] else "blocked"
-        print(f"  Contact has been {new_status}")
+        # The PATCH response usually holds the updated domain, which saves
+        # fetching the domain list again
+        domain = response.json().get("custom_domain")
+        if not isinstance(domain, dict) or "domain_name" not in domain:
+            domain_info(config, domain_id)
+            return
+
+        if cached is not None:
+            cache.replace_item("/api/custom_domains", cached, "custom_domains", domain)
+        print_domain_info(domain)
 
     except requests.exceptions.RequestException as e:
-        print(f"Error toggling contact: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
+        print_api_error("Error updating domain", e)
 
 
-def list_domains(config):
-    """List all custom domains"""
-    headers = get_headers(config)
+def domain_trash(config, domain_id, output_format="table"):
+    """Show deleted aliases for a custom domain"""
+    client = get_client(config)
 
     try:
-        response = requests.get(
-            f"{BASE_URL}/api/custom_domains", headers=headers, timeout=10
-        )
+        response = client.get(f"/api/custom_domains/{domain_id}/trash")
         response.raise_for_status()
 
-        domains = response.json()["custom_domains"]
+        trash_data = response.json()
+        aliases = trash_data.get("aliases", [])
+
+        if output_format != "table":
+            write_records(
+                aliases,
+                output_format,
+                ["alias", "deletion_timestamp"],
+                lambda alias: [alias["alias"], alias.get("deletion_timestamp")],
+            )
+            return
 
-        if not domains:
-            print("No custom domains found.")
+        if not aliases:
+            print("No deleted aliases found for this domain.")
             return
 
         table_data = []
-        for domain in domains:
-            verified_status = "✓" if domain.get("is_verified", False) else "✗"
-            catch_all_status = "✓" if domain.get("catch_all", False) else "✗"
+        for alias in aliases:
+            deleted_at = format_datetime(alias.get("deletion_timestamp"))
 
-            table_data.append(
-                [
-                    domain["id"],
-                    domain["domain_name"],
-                    verified_status,
-                    catch_all_status,
-                    domain.get("nb_alias", 0),
-                ]
-            )
+            table_data.append([alias["alias"], deleted_at])
+
+        print(render_table(table_data, ["Alias", "Deleted At"]))
+
+    except requests.exceptions.RequestException as e:
+        print_api_error(
+            "Error getting domain trash", e, file=error_stream(output_format)
+        )
+
+
+def get_mailboxes(config, refresh=False):
+    """
+    Get the account's mailboxes, or an empty list after printing an error
+
+    Args:
+        config: Configuration dictionary
+        refresh: Bypass the response cache
+    """
+    client = get_client(config)
+
+    try:
+        response = client.get("/api/v2/mailboxes", refresh=refresh)
+        response.raise_for_status()
+
+        mailboxes = response.json()["mailboxes"]
+
+        if not mailboxes:
+            print("No mailboxes found.")
+            return []
+
+        return mailboxes
+
+    except requests.exceptions.RequestException as e:
+        print_api_error("Error getting mailboxes", e)
+        return []
+
+
+def select_mailboxes(config):
+    """Prompts the user to choose their mailbox(es) for alias generation."""
+    import questionary as q
+
+    mailboxes = get_mailboxes(config)
+    if not mailboxes:
+        print("Unable to retrieve mailboxes. Please try again later.")
+        return []
+
+    mailbox_ids = {}
+
+    for mailbox in mailboxes:
+        mailbox_ids[mailbox["email"]] = mailbox["id"]
+
+    if not mailbox_ids:
+        print("No mailboxes available.")
+        return []
+
+    while True:
+        selected_mailboxes = q.checkbox(
+            "Select mailbox(es)", choices=[mailbox for mailbox in mailbox_ids.keys()]
+        ).ask()
+
+        if len(selected_mailboxes) != 0:
+            break
+
+        print("Please select at least one mailbox")
+
+    selected_mailbox_ids = []
+    for box in selected_mailboxes:
+        selected_mailbox_ids.append(mailbox_ids[box])
+    return selected_mailbox_ids
+
+
+MAILBOX_FIELDS = ["id", "email", "default", "verified", "nb_alias", "creation_date"]
+
+
+def list_mailboxes(config, cached=False, output_format="table"):
+    """List all mailboxes"""
+    if cached:
+        store = open_synced_store(config)
+        if store is None:
+            return
+
+        mailboxes = store.mailboxes()
+        store.close()
+    else:
+        mailboxes = get_mailboxes(config, refresh=True)
+        if not mailboxes:
+            return
+
+    if output_format != "table":
+        write_records(
+            mailboxes,
+            output_format,
+            MAILBOX_FIELDS,
+            lambda mailbox: [mailbox.get(field) for field in MAILBOX_FIELDS],
+        )
+        return
+
+    if not mailboxes:
+        print("No mailboxes found.")
+        return
+
+    table_data = []
+    for mailbox in mailboxes:
+        default_status = "✓" if mailbox.get("default", False) else ""
+        table_data.append(
+            [
+                mailbox["id"],
+                mailbox["email"],
+                default_status,
+                format_datetime(mailbox.get("creation_date", "N/A")),
+            ]
+        )
+
+    print(
+        render_table(
+            table_data,
+            ["ID", "Email", "Default", "Creation Date"],
+        )
+    )
+
+
+def sync_account(config, full=False, workers=DEFAULT_WORKERS):
+    """
+    Mirror aliases, mailboxes and custom domains into the local store
+
+    Alias pages are walked pinned aliases first, then newest activity first.
+    Once the store has been fully synced, paging stops at the first page whose
+    unpinned aliases are all stored with unchanged activity, so a refresh only
+    downloads what moved.
+
+    Args:
+        config: Configuration dictionary
+        full: Walk every alias page and drop aliases deleted upstream
+        workers: Number of alias pages fetched concurrently
+    """
+    client = get_client(config, workers)
+    store = open_store(config)
+    incremental = store.synced and not full
+
+    try:
+        pages_fetched = 0
+        seen_ids = []
+        removed = 0
+
+        for aliases in fetch_pages(
+            lambda page: fetch_alias_page(client, page),
+            workers=workers,
+            adaptive=adaptive_limit(client, workers),
+        ):
+            pages_fetched += 1
+            current = incremental and store.page_is_current(aliases)
+
+            # Pinned aliases on the last page may still have changed
+            store.upsert_aliases(aliases)
+            seen_ids.extend(alias["id"] for alias in aliases)
+
+            if current:
+                break
+        else:
+            # Every page was walked, so anything not seen was deleted
+            removed = store.prune_aliases(seen_ids)
+            store.set_meta("last_full_sync", datetime.now().isoformat())
+
+        response = client.get("/api/v2/mailboxes", refresh=True)
+        response.raise_for_status()
+        mailboxes = response.json()["mailboxes"]
+        store.replace_mailboxes(mailboxes)
+
+        response = client.get("/api/custom_domains", refresh=True)
+        response.raise_for_status()
+        domains = response.json()["custom_domains"]
+        store.replace_custom_domains(domains)
+
+        store.set_meta("last_sync", datetime.now().isoformat())
 
         print(
-            tabulate(
-                table_data,
-                headers=["ID", "Domain", "Verified", "Catch-All", "# Aliases"],
-                tablefmt="grid",
-            )
+            f"✓ Synced {store.count_aliases()} aliases"
+            f" ({pages_fetched} pages fetched, {removed} removed),"
+            f" {len(mailboxes)} mailboxes, {len(domains)} custom domains"
         )
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error listing domains: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
+    except requests.exceptions.RequestException as e:
+        print_api_error("Error syncing account", e)
+
+    finally:
+        store.close()
+
+
+# Alias pages written to an export archive between two checkpoints
+EXPORT_BATCH_PAGES = 5
+
+
+def fetch_domain_trash(client, domain_id):
+    """Fetch the deleted aliases of a custom domain, raising on request errors"""
+    response = client.get(f"/api/custom_domains/{domain_id}/trash")
+    response.raise_for_status()
+    return response.json().get("aliases", [])
+
+
+def fetch_export_contacts(client, alias_id):
+    """Fetch every contact of an alias for export, or none if it was just deleted"""
+    try:
+        return fetch_all_contacts(client, alias_id)
+    except requests.exceptions.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return []
+        raise
+
+
+def export_account(config, path, workers=DEFAULT_WORKERS):
+    """
+    Export the whole account to a compressed, resumable archive
+
+    Mailboxes, custom domains and their trash are written first, then aliases
+    with their contacts, a few pages at a time. Alias pages are prefetched and
+    each page's contacts fetched concurrently. Only one batch of pages is held
+    in memory, whatever the size of the account. After each batch a checkpoint
+    is saved, so running the same command again after an interruption
+    resumes from the last batch.
+
+    The API orders aliases by latest activity, so pages shift when aliases
+    see activity between two runs. The ids of the aliases already exported
+    are therefore recorded next to the archive rather than a page number, and
+    a resumed export walks every page again, skipping those aliases.
+
+    Args:
+        config: Configuration dictionary
+        path: Archive path
+        workers: Number of concurrent API requests
+    """
+    path = Path(path)
+    account = account_key(get_headers(config)["Authentication"])
+
+    state = ArchiveWriter.resume(path)
+    if state is not None and state.get("account") != account:
+        print(f"Error: {path} is an unfinished export of another account.")
+        return
+    if state is None and path.exists():
+        print(f"Error: {path} already exists.")
+        return
+    if state is not None:
+        print(f"Resuming export after {state.get('aliases', 0)} aliases")
+
+    client = get_client(config, workers)
+    adaptive = adaptive_limit(client, workers)
+    writer = ArchiveWriter(path, state or {"account": account})
+
+    try:
+        if not writer.state.get("batches"):
+            records = [
+                {
+                    "type": "header",
+                    "version": ARCHIVE_VERSION,
+                    "created": datetime.now().isoformat(),
+                }
+            ]
+
+            response = client.get("/api/v2/mailboxes", refresh=True)
+            response.raise_for_status()
+            for mailbox in response.json()["mailboxes"]:
+                records.append({"type": "mailbox", "data": mailbox})
+
+            response = client.get("/api/custom_domains", refresh=True)
+            response.raise_for_status()
+            domains = response.json()["custom_domains"]
+            for domain in domains:
+                records.append({"type": "custom_domain", "data": domain})
+
+            for domain, trash, error in run_concurrently(
+                lambda domain: fetch_domain_trash(client, domain["id"]),
+                domains,
+                workers=workers,
+                adaptive=adaptive,
+            ):
+                if error is not None:
+                    raise error
+                for alias in trash:
+                    records.append(
+                        {
+                            "type": "domain_trash",
+                            "domain_id": domain["id"],
+                            "data": alias,
+                        }
+                    )
+
+            writer.write_batch(records, aliases=0, contacts=0)
+
+        records = []
+        contacts_in_batch = 0
+        page = 0
+        # Aliases of the batch being built, not yet known to the writer
+        batch_ids = set()
+
+        for aliases in fetch_pages(
+            lambda page_id: fetch_alias_page(client, page_id),
+            workers=workers,
+            adaptive=adaptive,
+        ):
+            page += 1
+            # Exported by an earlier batch, or seen twice as pages shifted
+            new_aliases = [
+                alias
+                for alias in aliases
+                if alias["id"] not in batch_ids and not writer.is_exported(alias["id"])
+            ]
+            for alias in new_aliases:
+                records.append({"type": "alias", "data": alias})
+                batch_ids.add(alias["id"])
+
+            for alias, contacts, error in run_concurrently(
+                lambda alias: fetch_export_contacts(client, alias["id"]),
+                new_aliases,
+                workers=workers,
+                adaptive=adaptive,
+            ):
+                if error is not None:
+                    raise error
+                for contact in contacts:
+                    records.append(
+                        {
+                            "type": "contact",
+                            "alias_id": alias["id"],
+                            "alias": alias["email"],
+                            "data": contact,
+                        }
+                    )
+                contacts_in_batch += len(contacts)
+
+            last_page = len(aliases) < PAGE_SIZE
+            if records and (page % EXPORT_BATCH_PAGES == 0 or last_page):
+                writer.write_batch(
+                    records,
+                    alias_ids=batch_ids,
+                    aliases=writer.state["aliases"] + len(batch_ids),
+                    contacts=writer.state["contacts"] + contacts_in_batch,
+                )
+                records = []
+                contacts_in_batch = 0
+                batch_ids = set()
+
+    except requests.exceptions.RequestException as e:
+        writer.close()
+        print_api_error("Error exporting account", e)
+        print("Run the same command again to resume the export.")
+        return
+
+    except BaseException:
+        writer.close()
+        raise
+
+    writer.finish()
+    print(
+        f"✓ Exported {writer.state['aliases']} aliases"
+        f" and {writer.state['contacts']} contacts to {path}"
+    )
+
+
+def import_journal_path(config, path):
+    """Journal of an import of this archive into the configured account"""
+    account = account_key(get_headers(config)["Authentication"])
+    archive = hashlib.sha256(str(Path(path).resolve()).encode()).hexdigest()
+    return get_config_dir() / "imports" / f"{account[:16]}-{archive[:16]}.journal"
+
+
+def restore_contact(client, alias_id, contact):
+    """
+    Create an archived contact on an alias unless it already exists
+
+    A newly created contact is blocked again if it was blocked. Returns True
+    if the contact was created. Raises on request errors.
+    """
+    response = client.post(
+        f"/api/aliases/{alias_id}/contacts", json={"contact": contact["contact"]}
+    )
+    response.raise_for_status()
+    created = response.json()
+
+    if created["existed"]:
+        return False
+
+    if contact.get("block_forward") and not created.get("block_forward"):
+        response = client.post(f"/api/contacts/{created['id']}/toggle")
+        response.raise_for_status()
+
+    return True
+
+
+def import_archive(config, path, workers=DEFAULT_WORKERS, rate=None):
+    """
+    Recreate the aliases and contacts of an export archive in this account
 
+    Aliases whose email already exists in the account are not created again,
+    and contacts are created through an endpoint that reports those that
+    already exist, so an import can safely be repeated. Aliases are created
+    with their name, note, mailboxes (matched by email) and enabled state.
+    Every restored alias is recorded in a journal, which lets an interrupted
+    import skip the aliases it already restored. Custom domains and mailboxes
+    are not created: aliases need their suffix to be available here.
 
-def domain_info(config, domain_id):
-    """Show detailed information about a custom domain"""
-    headers = get_headers(config)
+    Args:
+        config: Configuration dictionary
+        path: Archive path
+        workers: Number of aliases restored concurrently
+        rate: Maximum number of API requests per second
+    """
+    path = Path(path)
+    archived_mailboxes = {}
 
     try:
-        response = requests.get(
-            f"{BASE_URL}/api/custom_domains", headers=headers, timeout=10
-        )
-        response.raise_for_status()
+        for record in read_archive(path):
+            if record["type"] == "header" and record["version"] > ARCHIVE_VERSION:
+                print(f"Error: {path} was written by a newer version of this tool.")
+                return
+            if record["type"] == "mailbox":
+                archived_mailboxes[record["data"]["id"]] = record["data"]["email"]
+            if record["type"] == "alias":
+                break
+    except (OSError, EOFError, ValueError) as e:
+        print(f"Error reading archive: {e}")
+        return
 
-        domains = response.json()["custom_domains"]
-        domain = next((d for d in domains if str(d["id"]) == domain_id), None)
+    client = get_client(config, workers)
 
-        if not domain:
-            print(f"Domain with ID {domain_id} not found.")
+    try:
+        options = get_alias_options(config)
+        if not options:
             return
 
-        print(f"Domain: {domain['domain_name']}")
-        print(f"ID: {domain['id']}")
-        print(f"Name: {domain.get('name', 'N/A')}")
-        print(f"Creation date: {format_datetime(domain.get('creation_date', 'N/A'))}")
-        print(f"Verified: {'Yes' if domain.get('is_verified', False) else 'No'}")
-        print(
-            f"Catch-all: {'Enabled' if domain.get('catch_all', False) else 'Disabled'}"
-        )
-        print(
-            f"Random prefix generation: {'Enabled' if domain.get('random_prefix_generation', False) else 'Disabled'}"
-        )
-        print(f"Number of aliases: {domain.get('nb_alias', 0)}")
+        response = client.get("/api/v2/mailboxes")
+        response.raise_for_status()
+        mailbox_ids = {
+            mailbox["email"].lower(): mailbox["id"]
+            for mailbox in response.json()["mailboxes"]
+        }
 
-        if "mailboxes" in domain and domain["mailboxes"]:
-            print("\nLinked mailboxes:")
-            for mailbox in domain["mailboxes"]:
-                print(f"  - {mailbox['email']} (ID: {mailbox['id']})")
-        else:
-            print("\nNo mailboxes linked to this domain.")
+        existing = {}
+        for aliases in fetch_pages(
+            lambda page: fetch_alias_page(client, page), workers=workers
+        ):
+            existing.update((alias["email"].lower(), alias["id"]) for alias in aliases)
 
     except requests.exceptions.RequestException as e:
-        print(f"Error getting domain info: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
-
+        print_api_error("Error importing archive", e)
+        return
 
-def update_domain(
-    config, domain_id, catch_all=None, random_prefix=None, name=None, mailboxes=None
-):
-    """Update a custom domain's settings"""
-    headers = get_headers(config)
+    # Shared by the workers: refreshed once when the signatures expire
+    signing = {"suffixes": signed_suffixes(options)}
+    signing_lock = threading.Lock()
+
+    def restore(entry):
+        alias, contacts = entry
+        email = alias["email"].lower()
+        result = {"created": False, "contacts": 0, "contacts_existed": 0}
+
+        alias_id = existing.get(email)
+        if alias_id is None:
+            suffixes = signing["suffixes"]
+            split = split_alias_email(email, suffixes)
+            if split is None:
+                return None
+            prefix, suffix = split
+
+            data = {"alias_prefix": prefix, "signed_suffix": suffixes[suffix]}
+            ids = [
+                mailbox_ids[mailbox["email"].lower()]
+                for mailbox in alias.get("mailboxes") or []
+                if mailbox["email"].lower() in mailbox_ids
+            ]
+            if ids:
+                data["mailbox_ids"] = ids
+            if alias.get("note"):
+                data["note"] = alias["note"]
+            if alias.get("name"):
+                data["name"] = alias["name"]
+
+            response = client.post("/api/v3/alias/custom/new", json=data)
+
+            if response.status_code == 412:
+                with signing_lock:
+                    if signing["suffixes"] is suffixes:
+                        options = get_alias_options(config, refresh=True)
+                        if options:
+                            signing["suffixes"] = signed_suffixes(options)
+                data["signed_suffix"] = signing["suffixes"].get(suffix)
+                response = client.post("/api/v3/alias/custom/new", json=data)
+
+            if response.status_code == 409:
+                # Created since the account was listed, e.g. by a concurrent run
+                alias_id = lookup_alias_id(client, email)
+            if alias_id is None:
+                response.raise_for_status()
+                alias_id = response.json()["id"]
+                result["created"] = True
+
+                if alias.get("enabled") is False:
+                    set_alias_enabled(client, alias_id, False, current=True)
 
-    data = {}
-    if catch_all is not None:
-        data["catch_all"] = catch_all.lower() == "true"
-    if random_prefix is not None:
-        data["random_prefix_generation"] = random_prefix.lower() == "true"
-    if name is not None:
-        data["name"] = name
-    if mailboxes is not None:
-        try:
-            data["mailbox_ids"] = [int(id.strip()) for id in mailboxes.split(",")]
-        except ValueError:
-            print("Error: Mailbox IDs must be comma-separated integers.")
-            return
+        for contact in contacts:
+            if restore_contact(client, alias_id, contact):
+                result["contacts"] += 1
+            else:
+                result["contacts_existed"] += 1
+
+        result["id"] = alias_id
+        return result
+
+    journal = ImportJournal(import_journal_path(config, path))
+    if journal.done:
+        print(f"Resuming import: {len(journal.done)} aliases already restored")
+
+    entries = (
+        entry
+        for entry in read_aliases(read_archive(path))
+        if entry[0]["email"].lower() not in journal.done
+    )
+    created = existed = contacts = contacts_existed = 0
+    skipped = failed = 0
 
-    if not data:
-        print(
-            "No changes specified. Use --catch-all, --random-prefix, --name, or --mailboxes."
-        )
+    try:
+        for (alias, _), result, error in run_concurrently(
+            restore,
+            entries,
+            workers=workers,
+            rate=rate,
+            adaptive=adaptive_limit(client, workers),
+        ):
+            if isinstance(error, requests.exceptions.RequestException):
+                print_api_error(
+                    f"Error importing {alias['email']}", error, file=sys.stderr
+                )
+                failed += 1
+            elif error is not None:
+                raise error
+            elif result is None:
+                print(
+                    f"Skipping {alias['email']}: its suffix is not available",
+                    file=sys.stderr,
+                )
+                skipped += 1
+            else:
+                journal.record(alias["email"].lower(), id=result["id"])
+                created += result["created"]
+                existed += not result["created"]
+                contacts += result["contacts"]
+                contacts_existed += result["contacts_existed"]
+
+    except (OSError, EOFError, ValueError) as e:
+        journal.close()
+        print(f"Error reading archive: {e}")
         return
 
-    try:
-        response = requests.patch(
-            f"{BASE_URL}/api/custom_domains/{domain_id}",
-            headers=headers,
-            json=data,
-            timeout=10,
-        )
-        response.raise_for_status()
+    except BaseException:
+        journal.close()
+        raise
 
-        print(f"✓ Domain updated successfully")
-        domain_info(config, domain_id)
+    print(
+        f"✓ Imported {created} aliases ({existed} already existed)"
+        f" and {contacts} contacts ({contacts_existed} already existed)"
+    )
+    if failed or skipped:
+        journal.close()
+        print(f"{failed + skipped} aliases could not be imported.")
+        print("Run the same command again to retry them.")
+    else:
+        journal.finish()
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error updating domain: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
 
+def plan_state(config, path, workers=DEFAULT_WORKERS):
+    """
+    Compare a state file with the live account
 
-def domain_trash(config, domain_id):
-    """Show deleted aliases for a custom domain"""
-    headers = get_headers(config)
+    Returns the list of changes converging the account, or None after
+    printing an error.
 
+    Args:
+        config: Configuration dictionary
+        path: State file
+        workers: Number of concurrent API requests
+    """
     try:
-        response = requests.get(
-            f"{BASE_URL}/api/custom_domains/{domain_id}/trash",
-            headers=headers,
-            timeout=10,
-        )
-        response.raise_for_status()
+        state = load_state(path)
+    except (OSError, ValueError) as e:
+        print(f"Error reading {path}: {e}")
+        return None
 
-        trash_data = response.json()
-        aliases = trash_data.get("aliases", [])
+    client = get_client(config, workers)
 
-        if not aliases:
-            print("No deleted aliases found for this domain.")
-            return
+    try:
+        aliases = []
+        for page in fetch_pages(
+            lambda page_id: fetch_alias_page(client, page_id), workers=workers
+        ):
+            aliases.extend(page)
 
-        table_data = []
-        for alias in aliases:
-            deleted_at = format_datetime(alias.get("deletion_timestamp"))
+        response = client.get("/api/v2/mailboxes", refresh=True)
+        response.raise_for_status()
+        mailboxes = response.json()["mailboxes"]
 
-            table_data.append([alias["alias"], deleted_at])
+        response = client.get("/api/custom_domains", refresh=True)
+        response.raise_for_status()
+        domains = response.json()["custom_domains"]
 
-        print(tabulate(table_data, headers=["Alias", "Deleted At"], tablefmt="grid"))
+        # Only the aliases whose contacts are managed need them listed
+        by_email = {alias["email"].lower(): alias for alias in aliases}
+        managed = [
+            by_email[email]
+            for email, settings in state["aliases"].items()
+            if "contacts" in settings and email in by_email
+        ]
+        contacts = {}
+        for alias, alias_contacts, error in run_concurrently(
+            lambda alias: fetch_all_contacts(client, alias["id"]),
+            managed,
+            workers=workers,
+        ):
+            if error is not None:
+                raise error
+            contacts[alias["id"]] = [contact["contact"] for contact in alias_contacts]
+
+        suffixes = []
+        if any(email not in by_email for email in state["aliases"]):
+            options = get_alias_options(config)
+            if not options:
+                return None
+            suffixes = list(signed_suffixes(options))
 
     except requests.exceptions.RequestException as e:
-        print(f"Error getting domain trash: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
+        print_api_error("Error reading account", e)
+        return None
 
+    try:
+        return plan_changes(state, aliases, domains, mailboxes, contacts, suffixes)
+    except ValueError as e:
+        print(f"Error in {path}: {e}")
+        return None
 
-def get_mailboxes(config):
-    headers = get_headers(config)
 
-    try:
-        response = requests.get(
-            f"{BASE_URL}/api/v2/mailboxes", headers=headers, timeout=10
-        )
-        response.raise_for_status()
+def print_plan(changes):
+    """Print the changes of a plan and a summary"""
+    if not changes:
+        print("No changes. The account matches the state file.")
+        return
 
-        mailboxes = response.json()["mailboxes"]
+    for change in changes:
+        print("\n".join(format_change(change)))
 
-        if not mailboxes:
-            print("No mailboxes found.")
-            return []
+    created = sum(1 for change in changes if change.get("create"))
+    print(
+        f"\nPlan: {created} to create, {len(changes) - created} to change,"
+        f" {sum(count_calls(change) for change in changes)} API calls"
+    )
 
-        return mailboxes
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error getting mailboxes: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Status code: {e.response.status_code}")
-            try:
-                error_data = e.response.json()
-                print(f"Error message: {error_data.get('error')}")
-            except:
-                print(f"Error message: {e.response.text}")
-        return []
+def show_plan(config, path, workers=DEFAULT_WORKERS):
+    """Print the changes `apply` would make for a state file"""
+    changes = plan_state(config, path, workers=workers)
+    if changes is not None:
+        print_plan(changes)
 
 
-def select_mailboxes(config):
-    """Prompts the user to choose their mailbox(es) for alias generation."""
-    mailboxes = get_mailboxes(config)
-    if not mailboxes:
-        print("Unable to retrieve mailboxes. Please try again later.")
-        return []
+def apply_change(client, change, suffixes):
+    """
+    Make the API calls of one planned change, raising on request errors
 
-    mailbox_ids = {}
+    Args:
+        client: API client
+        change: Change returned by plan_changes
+        suffixes: Signed suffix of each available suffix, for new aliases
+    """
+    if change["kind"] == "domain":
+        response = client.patch(
+            f"/api/custom_domains/{change['id']}", json=change["update"]
+        )
+        response.raise_for_status()
+        return
 
-    for mailbox in mailboxes:
-        mailbox_ids[mailbox["email"]] = mailbox["id"]
+    alias_id = change["id"]
+    if change["create"] is not None:
+        data = dict(change["create"])
+        data["signed_suffix"] = suffixes[data.pop("suffix")]
+        response = client.post("/api/v3/alias/custom/new", json=data)
+        response.raise_for_status()
+        alias_id = response.json()["id"]
 
-    if not mailbox_ids:
-        print("No mailboxes available.")
-        return []
+    if change["update"]:
+        response = client.patch(f"/api/aliases/{alias_id}", json=change["update"])
+        response.raise_for_status()
 
-    while True:
-        selected_mailboxes = q.checkbox(
-            "Select mailbox(es)", choices=[mailbox for mailbox in mailbox_ids.keys()]
-        ).ask()
+    if change["enabled"] is not None:
+        set_alias_enabled(
+            client, alias_id, change["enabled"], current=not change["enabled"]
+        )
 
-        if len(selected_mailboxes) != 0:
-            break
+    for contact in change["contacts"]:
+        response = client.post(
+            f"/api/aliases/{alias_id}/contacts", json={"contact": contact}
+        )
+        response.raise_for_status()
 
-        print("Please select at least one mailbox")
 
-    selected_mailbox_ids = []
-    for box in selected_mailboxes:
-        selected_mailbox_ids.append(mailbox_ids[box])
-    return selected_mailbox_ids
+def apply_state(config, path, yes=False, workers=DEFAULT_WORKERS, rate=None):
+    """
+    Converge the account to a state file
 
+    The plan is computed and shown first, then applied with one task per
+    alias or domain running concurrently; the calls of a single alias are made
+    in order, so an alias exists before its contacts are added.
 
-def list_mailboxes(config):
-    """List all mailboxes"""
-    mailboxes = get_mailboxes(config)
-    if not mailboxes:
+    Args:
+        config: Configuration dictionary
+        path: State file
+        yes: Do not ask for confirmation
+        workers: Number of aliases and domains updated concurrently
+        rate: Maximum number of API requests per second
+    """
+    changes = plan_state(config, path, workers=workers)
+    if changes is None:
         return
 
-    table_data = []
-    for mailbox in mailboxes:
-        default_status = "✓" if mailbox.get("default", False) else ""
-        table_data.append(
-            [
-                mailbox["id"],
-                mailbox["email"],
-                default_status,
-                format_datetime(mailbox.get("creation_date", "N/A")),
-            ]
-        )
+    print_plan(changes)
+    if not changes:
+        return
 
-    print(
-        tabulate(
-            table_data,
-            headers=["ID", "Email", "Default", "Creation Date"],
-            tablefmt="grid",
-        )
-    )
+    if not yes:
+        confirm = input("Apply these changes? (y/n): ")
+        if confirm.lower() != "y":
+            print("Apply cancelled.")
+            return
+
+    suffixes = {}
+    if any(change.get("create") for change in changes):
+        # Signed suffixes expire, so sign them right before creating aliases
+        options = get_alias_options(config, refresh=True)
+        if not options:
+            return
+        suffixes = signed_suffixes(options)
+
+    client = get_client(config, workers)
+    applied = 0
+
+    for change, _, error in run_concurrently(
+        lambda change: apply_change(client, change, suffixes),
+        changes,
+        workers=workers,
+        rate=rate,
+        adaptive=adaptive_limit(client, workers),
+    ):
+        if error is None:
+            print(f"✓ {change['kind'].capitalize()} {change['name']} updated")
+            applied += 1
+        elif isinstance(error, requests.exceptions.RequestException):
+            print_api_error(
+                f"Error applying {change['kind']} {change['name']}",
+                error,
+                file=sys.stderr,
+            )
+        else:
+            raise error
+
+    print(f"Applied {applied} of {len(changes)} changes")
 
 
 def set_api_key(config, key):
@@ -968,18 +2785,183 @@ def view_config(config):
     else:
         print("API Key: Not set")
 
+    rate_limit = get_rate_limit(config)
+    if rate_limit:
+        print(
+            f"Rate limit: {rate_limit:g} requests per second, shared by all processes"
+        )
+    else:
+        print("Rate limit: None")
+
     print(f"Config file location: {get_config_file()}")
     print("Environment variables:")
     print("  SIMPLELOGIN_API_KEY: " + ("Set" if env_api_key else "Not set"))
+    print(
+        "  SIMPLELOGIN_RATE_LIMIT: "
+        + (os.environ.get("SIMPLELOGIN_RATE_LIMIT", "Not set"))
+    )
     print("  SIMPLELOGIN_CONFIG: " + (os.environ.get("SIMPLELOGIN_CONFIG", "Not set")))
     print("  XDG_CONFIG_HOME: " + (os.environ.get("XDG_CONFIG_HOME", "Not set")))
 
 
+def report_timings(tracer, summary=True, trace_file=None):
+    """
+    Print where the command spent its time and/or write a Chrome trace
+
+    The summary goes to stderr, out of the way of machine-readable output.
+    """
+    from tabulate import tabulate
+
+    total = time.perf_counter() - tracer.origin
+
+    if summary:
+        for headers, rows in tracer.summary():
+            if rows:
+                print(tabulate(rows, headers=headers), file=sys.stderr)
+                print(file=sys.stderr)
+        print(f"Total: {total * 1000:.0f} ms", file=sys.stderr)
+
+    if trace_file:
+        tracer.write_chrome_trace(trace_file)
+        print(f"Trace written to {trace_file}", file=sys.stderr)
+
+
+# Imported by the daemon before serving, so no command has to
+DAEMON_PRELOAD = ["requests", "yaml", "tabulate", "simplelogin.engine"]
+
+
+def run_daemon(stop=False, status=False):
+    """
+    Serve commands from a resident process, or stop it or show its status
+
+    The daemon runs in the foreground until stopped, interrupted or sent
+    SIGTERM. See simplelogin.daemon.
+    """
+    path = str(get_config_dir() / SOCKET_NAME)
+
+    if stop or status:
+        answer = control("stop" if stop else "status", path)
+        if answer is None:
+            print("No daemon is running.")
+        elif stop:
+            print("Daemon stopped.")
+        else:
+            print(
+                f"Daemon running (pid {answer['pid']}) for"
+                f" {answer['uptime'] / 60:.0f} min, {answer['commands']} commands"
+                f" served."
+            )
+        return
+
+    daemon = Daemon(path, lambda argv: run_command(parse_args(argv)))
+    try:
+        daemon.bind()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return
+
+    for module in DAEMON_PRELOAD:
+        importlib.import_module(module)
+    parse_args(["config", "view"])
+
+    import signal
+
+    # Stop between commands rather than in the middle of one
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"Daemon listening on {path}", file=sys.stderr)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+# Parsed usage patterns, see parse_args()
+_usage = None
+
+
+def parse_args(argv):
+    """
+    Match arguments against the usage, exactly as docopt() does
+
+    docopt() parses the whole usage text again on every call. The parsed
+    patterns are only read while matching, so they are parsed once and kept,
+    for the daemon to match every command it runs against the same ones.
+    This relies on docopt's internals, hence the exact docopt version pinned
+    in pyproject.toml.
+    """
+    from docopt import (
+        AnyOptions,
+        Dict,
+        DocoptExit,
+        Option,
+        TokenStream,
+        extras,
+        formal_usage,
+        parse_argv,
+        parse_defaults,
+        parse_pattern,
+        printable_usage,
+    )
+
+    global _usage
+    if _usage is None:
+        usage = printable_usage(__doc__)
+        options = parse_defaults(__doc__)
+        pattern = parse_pattern(formal_usage(usage), options)
+        pattern_options = set(pattern.flat(Option))
+        for any_options in pattern.flat(AnyOptions):
+            any_options.children = list(set(options) - pattern_options)
+        _usage = (usage, options, pattern.fix())
+
+    usage, options, pattern = _usage
+    DocoptExit.usage = usage
+    argv = parse_argv(TokenStream(argv, DocoptExit), list(options), False)
+    extras(True, f"SimpleLogin CLI {__version__}", argv, __doc__)
+    matched, left, collected = pattern.match(argv)
+    if matched and left == []:
+        return Dict((a.name, a.value) for a in (pattern.flat() + collected))
+    raise DocoptExit()
+
+
 def main():
     """Main entry point for the CLI"""
-    args = docopt(__doc__, version=f"SimpleLogin CLI {__version__}")
+    global _tracer
+
+    # --timings applies to every command, so it is taken out before docopt
+    # matches the arguments against the usage patterns
+    argv = sys.argv[1:]
+    timings = "--timings" in argv
+    argv = [arg for arg in argv if arg != "--timings"]
+    trace_file = os.environ.get("SIMPLELOGIN_TRACE")
+
+    if timings or trace_file:
+        _tracer = Tracer(origin=IMPORT_START)
+        _tracer.add("phase", "import", IMPORT_START, IMPORT_END)
+
+    try:
+        with phase(_tracer, "command"):
+            run_command(parse_args(argv))
+    finally:
+        if _tracer is not None:
+            report_timings(_tracer, summary=timings, trace_file=trace_file)
+
 
-    config = load_config()
+def run_command(args):
+    """Run the command selected by the parsed arguments"""
+    output_format = args["--format"]
+    if output_format not in OUTPUT_FORMATS:
+        print(
+            f"Error: Unknown format '{output_format}'."
+            f" Use one of: {', '.join(OUTPUT_FORMATS)}."
+        )
+        return
+
+    if args["daemon"]:
+        run_daemon(stop=args["stop"], status=args["status"])
+        return
+
+    with phase(_tracer, "load config"):
+        config = load_config()
 
     if args["config"]:
         if args["set-key"]:
@@ -998,6 +2980,10 @@ def main():
                 disabled=args["--disabled"],
                 enabled=args["--enabled"],
                 query=args.get("--query"),
+                all_pages=args["--all"],
+                workers=int(args["--workers"]),
+                cached=args["--cached"],
+                output_format=output_format,
             )
             return
         elif args["create"]:
@@ -1018,22 +3004,121 @@ def main():
                     note=args["--note"],
                     name=args["--name"],
                 )
+            elif args["random"] and (args["--count"] or args["--notes-file"]):
+                create_random_aliases(
+                    config,
+                    count=int(args["--count"]) if args["--count"] else None,
+                    mode=args["--mode"],
+                    note=args["--note"],
+                    notes_file=args["--notes-file"],
+                    workers=int(args["--workers"]),
+                    rate=float(args["--rate"]) if args["--rate"] else None,
+                )
             elif args["random"]:
                 create_random_alias(config, mode=args["--mode"], note=args["--note"])
             return
+        elif args["toggle"] and args["--from-file"]:
+            toggle_aliases(
+                config,
+                args["--from-file"],
+                workers=int(args["--workers"]),
+                rate=float(args["--rate"]) if args["--rate"] else None,
+            )
+            return
         elif args["toggle"]:
             toggle_alias(config, args["<alias_id>"])
             return
+        elif (args["enable"] or args["disable"]) and args["--from-file"]:
+            enable_aliases(
+                config,
+                args["--from-file"],
+                args["enable"],
+                workers=int(args["--workers"]),
+                rate=float(args["--rate"]) if args["--rate"] else None,
+                cached=args["--cached"],
+            )
+            return
+        elif args["enable"] or args["disable"]:
+            enable_alias(
+                config, args["<alias_id>"], args["enable"], cached=args["--cached"]
+            )
+            return
+        elif args["delete"] and args["--from-file"]:
+            delete_aliases(
+                config,
+                args["--from-file"],
+                yes=args["--yes"],
+                workers=int(args["--workers"]),
+                rate=float(args["--rate"]) if args["--rate"] else None,
+            )
+            return
         elif args["delete"]:
             delete_alias(config, args["<alias_id>"])
             return
         elif args["info"]:
-            alias_info(config, args["<alias_id>"])
+            alias_info(config, args["<alias_id>"], cached=args["--cached"])
+            return
+        elif args["search"]:
+            if args["--prefix"]:
+                mode = "prefix"
+            elif args["--regex"]:
+                mode = "regex"
+            elif args["--fuzzy"]:
+                mode = "fuzzy"
+            else:
+                mode = "substring"
+            search_aliases(
+                config,
+                args["<pattern>"],
+                mode=mode,
+                limit=int(args["--limit"]) if args["--limit"] else None,
+            )
+            return
+        elif args["watch"]:
+            watch_aliases(
+                config,
+                interval=float(args["--interval"]),
+                max_interval=float(args["--max-interval"]),
+                workers=int(args["--workers"]),
+                output_format=output_format,
+            )
+            return
+        elif args["activity"]:
+            alias_activity(
+                config,
+                workers=int(args["--workers"]),
+                peek=args["--peek"],
+                output_format=output_format,
+            )
+            return
+        elif args["stats"]:
+            alias_stats(
+                config,
+                top=int(args["--top"]),
+                by=args["--by"],
+                workers=int(args["--workers"]),
+                cached=args["--cached"],
+                output_format=output_format,
+            )
             return
 
     elif args["contacts"]:
         if args["list"]:
-            list_contacts(config, args["<alias_id>"])
+            if args["--all-aliases"]:
+                list_all_contacts(
+                    config,
+                    workers=int(args["--workers"]),
+                    output_format=output_format,
+                )
+            else:
+                list_contacts(
+                    config,
+                    args["<alias_id>"],
+                    page=int(args["--page"]),
+                    all_pages=args["--all"],
+                    workers=int(args["--workers"]),
+                    output_format=output_format,
+                )
             return
         elif args["create"]:
             create_contact(config, args["<alias_id>"], args["<contact>"])
@@ -1047,10 +3132,10 @@ def main():
 
     elif args["domains"]:
         if args["list"]:
-            list_domains(config)
+            list_domains(config, cached=args["--cached"], output_format=output_format)
             return
         elif args["info"]:
-            domain_info(config, args["<domain_id>"])
+            domain_info(config, args["<domain>"])
             return
         elif args["update"]:
             update_domain(
@@ -1063,11 +3148,42 @@ def main():
             )
             return
         elif args["trash"]:
-            domain_trash(config, args["<domain_id>"])
+            domain_trash(config, args["<domain_id>"], output_format=output_format)
             return
 
     elif args["mailboxes"] and args["list"]:
-        list_mailboxes(config)
+        list_mailboxes(config, cached=args["--cached"], output_format=output_format)
+        return
+
+    elif args["sync"]:
+        sync_account(config, full=args["--full"], workers=int(args["--workers"]))
+        return
+
+    elif args["export"]:
+        export_account(config, args["<archive>"], workers=int(args["--workers"]))
+        return
+
+    elif args["import"]:
+        import_archive(
+            config,
+            args["<archive>"],
+            workers=int(args["--workers"]),
+            rate=float(args["--rate"]) if args["--rate"] else None,
+        )
+        return
+
+    elif args["plan"]:
+        show_plan(config, args["<state>"], workers=int(args["--workers"]))
+        return
+
+    elif args["apply"]:
+        apply_state(
+            config,
+            args["<state>"],
+            yes=args["--yes"],
+            workers=int(args["--workers"]),
+            rate=float(args["--rate"]) if args["--rate"] else None,
+        )
         return
 
     print("Command not recognized. Use --help to see available commands.")
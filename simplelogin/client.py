@@ -0,0 +1,289 @@
+"""
+HTTP client for the SimpleLogin API
+
+All API calls made by the CLI go through a single SimpleLoginClient, which owns
+one requests.Session. Reusing the session keeps TCP/TLS connections alive
+between calls instead of paying a fresh handshake for every request.
+
+Transient failures are retried centrally here, with exponential backoff and
+jitter, honoring Retry-After. Requests that are not idempotent are only
+replayed when the server certainly did not act on them.
+
+GET responses of rarely changing endpoints can be cached as well, see
+simplelogin.httpcache.
+
+requests is imported when the first client is created, so commands that never
+reach the API don't pay for importing it.
+"""
+
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from simplelogin.trace import attempt_timing, phase, traced_pool_classes
+
+BASE_URL = "https://app.simplelogin.io"
+DEFAULT_TIMEOUT = 10
+DEFAULT_POOL_SIZE = 16
+
+DEFAULT_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30
+# Give up instead of waiting longer than this for a Retry-After
+MAX_RETRY_DELAY = 120
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Responses meaning "slow down" rather than "something broke"
+THROTTLE_STATUSES = {429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "PATCH", "DELETE"}
+
+
+def retry_after(response):
+    """Seconds to wait according to a Retry-After header, or None"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff(attempt):
+    """Exponential backoff with full jitter for the given retry attempt"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+
+
+class SimpleLoginClient:
+    """Thin wrapper around a pooled, keep-alive requests.Session"""
+
+    def __init__(
+        self,
+        api_key,
+        base_url=BASE_URL,
+        timeout=DEFAULT_TIMEOUT,
+        pool_size=DEFAULT_POOL_SIZE,
+        retries=DEFAULT_RETRIES,
+        tracer=None,
+    ):
+        """
+        Args:
+            api_key: SimpleLogin API key sent with every request
+            base_url: API root, without a trailing slash
+            timeout: Default timeout in seconds for each request
+            pool_size: Maximum number of kept-alive connections to the API host
+            retries: Maximum number of retries for a failed request
+            tracer: simplelogin.trace.Tracer recording every attempt, if any
+        """
+        with phase(tracer, "import requests"):
+            import requests
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.tracer = tracer
+
+        # Optional congestion feedback, told about every throttled or healthy
+        # response (see simplelogin.engine.AdaptiveLimit)
+        self.congestion = None
+        # Optional limiter with an acquire() method, called before every
+        # attempt (see simplelogin.ratelimit.SharedTokenBucket)
+        self.rate_limiter = None
+        # Optional cache of GET responses (see simplelogin.httpcache.ResponseCache)
+        self.response_cache = None
+
+        self.session = requests.Session()
+        self.pool_size = 0
+        self.mount(pool_size)
+        self.session.headers.update(
+            {
+                "Authentication": api_key,
+                "Content-Type": "application/json",
+                "Connection": "keep-alive",
+            }
+        )
+
+    def mount(self, pool_size):
+        """Route requests through a new adapter keeping up to `pool_size` connections"""
+        from requests.adapters import HTTPAdapter
+
+        previous = self.session.adapters.get("https://")
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        if self.tracer is not None:
+            adapter.poolmanager.pool_classes_by_scheme = traced_pool_classes()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.pool_size = pool_size
+
+        if previous is not None:
+            previous.close()
+
+    def ensure_pool_size(self, size):
+        """
+        Grow the connection pool to keep at least `size` connections alive
+
+        Concurrent commands call this with their worker count, so that no
+        worker's connection is discarded for lack of room in the pool. It must
+        not be called while requests are in flight.
+        """
+        if size > self.pool_size:
+            self.mount(size)
+
+    def request(self, method, path, refresh=False, **kwargs):
+        """
+        Send a request to `path` (relative to the API root) and return the response
+
+        Connection errors and 429/5xx responses are retried for idempotent
+        methods. Other methods, such as toggling an alias, are only retried when
+        the connection could not be made or the server answered 429, since a
+        replay could otherwise apply them twice. The last response is returned,
+        or the last connection error raised, once retries run out.
+
+        With a response cache, cacheable GETs are answered from it while fresh
+        and revalidated once stale, unless `refresh` asks for a new response.
+        Other requests invalidate the cached responses they may change.
+        """
+        url = f"{self.base_url}{path}"
+        cache = self.response_cache
+
+        if cache is None:
+            return self.send(method, url, **kwargs)
+
+        if method.upper() != "GET":
+            try:
+                return self.send(method, url, **kwargs)
+            finally:
+                cache.invalidate(path)
+
+        if cache.ttl(path) is None:
+            return self.send(method, url, **kwargs)
+
+        params = kwargs.get("params")
+        entry = None if refresh else cache.lookup(path, params)
+        if entry is not None:
+            if cache.is_fresh(entry):
+                response = cache.response(entry, url)
+                if self.tracer is not None:
+                    now = time.perf_counter()
+                    self.tracer.http(method, path, now, now, response, cached=True)
+                return response
+            kwargs["headers"] = dict(
+                kwargs.get("headers") or {}, **cache.conditional_headers(entry)
+            )
+
+        response = self.send(method, url, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            cache.save(path, params, entry)
+            return cache.response(entry, url)
+
+        cache.store(path, params, response)
+        return response
+
+    def send(self, method, url, **kwargs):
+        """Send a request to a full URL, retrying as described in request()"""
+        import requests
+
+        kwargs.setdefault("timeout", self.timeout)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            try:
+                response = self.attempt(method, url, attempt, **kwargs)
+            except requests.exceptions.RequestException as e:
+                replayable = idempotent or isinstance(
+                    e, requests.exceptions.ConnectTimeout
+                )
+                if attempt >= self.retries or not replayable:
+                    raise
+                delay = backoff(attempt)
+            else:
+                status = response.status_code
+                if self.congestion is not None:
+                    if status in THROTTLE_STATUSES:
+                        self.congestion.on_throttle()
+                    else:
+                        self.congestion.on_success()
+
+                replayable = idempotent or status == 429
+                if (
+                    status not in RETRY_STATUSES
+                    or attempt >= self.retries
+                    or not replayable
+                ):
+                    return response
+
+                delay = retry_after(response)
+                if delay is None:
+                    delay = backoff(attempt)
+                elif delay > MAX_RETRY_DELAY:
+                    return response
+                else:
+                    # Spread out workers that were all told the same time
+                    delay += random.uniform(0, BACKOFF_BASE)
+
+            start = time.perf_counter()
+            time.sleep(delay)
+            if self.tracer is not None:
+                self.tracer.add("wait", "retry delay", start, time.perf_counter())
+            attempt += 1
+
+    def attempt(self, method, url, attempt, **kwargs):
+        """Send a request once, recording it when tracing"""
+        if self.tracer is None:
+            return self.session.request(method, url, **kwargs)
+
+        path = url[len(self.base_url) :]
+        with attempt_timing() as timing:
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except Exception as e:
+                self.tracer.http(
+                    method,
+                    path,
+                    start,
+                    time.perf_counter(),
+                    error=e,
+                    attempt=attempt,
+                    **timing,
+                )
+                raise
+
+        self.tracer.http(
+            method,
+            path,
+            start,
+            time.perf_counter(),
+            response,
+            attempt=attempt,
+            **timing,
+        )
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request("PATCH", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,342 @@
+"""
+Resident daemon serving CLI invocations over a Unix domain socket
+
+Most of the time of a quick command goes into starting up: importing the
+CLI and its dependencies, parsing the usage text, connecting to the API
+over TLS. `simplelogin daemon` pays for that once and keeps the process
+warm: modules stay imported, the usage stays parsed and the API client keeps
+its pool of open connections and its caches from one command to the next.
+
+The `simplelogin` entry point is main() below. It only imports what it needs
+to talk to the socket, and forwards the command line to the daemon when one
+is running. The daemon runs commands one at a time, with the caller's working
+directory and SIMPLELOGIN_* environment variables, and streams their output
+back. Without a daemon, or for commands that need the terminal, the command
+runs in the calling process as usual.
+
+Protocol: the client sends one JSON line {"argv", "cwd", "env", "code"} (or
+{"control": "stop" | "status"}), the daemon answers with JSON lines
+{"stdout": text}, {"stderr": text} and finally {"exit": status}, or
+{"refused": reason} when the client should run the command itself.
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+
+SOCKET_NAME = "daemon.sock"
+
+# First arguments of commands that always run in the calling process: they
+# manage the daemon or the configuration, or run until interrupted
+LOCAL_COMMANDS = {"daemon", "config"}
+LOCAL_SUBCOMMANDS = {("aliases", "watch")}
+
+# Output is sent to the client once this much is held back, or at the end
+# of a line once this many seconds passed since it was last sent
+OUTPUT_BUFFER = 64 * 1024
+OUTPUT_DELAY = 0.05
+
+# Seconds a client has to send its request once connected, so that one that
+# never does cannot hold up the commands queued behind it
+REQUEST_TIMEOUT = 5
+
+
+def config_dir():
+    """The configuration directory, as simplelogin.cli.get_config_dir finds it"""
+    xdg_config_home = os.environ.get("XDG_CONFIG_HOME")
+    if xdg_config_home:
+        return os.path.join(xdg_config_home, "simplelogin")
+    return os.path.join(os.path.expanduser("~"), ".config", "simplelogin")
+
+
+def socket_path():
+    return os.path.join(config_dir(), SOCKET_NAME)
+
+
+def code_version():
+    """Changes whenever the installed CLI does, e.g. after an upgrade"""
+    return os.stat(os.path.join(os.path.dirname(__file__), "cli.py")).st_mtime_ns
+
+
+def needs_terminal(argv):
+    """
+    Whether a command line has to run in the calling process
+
+    That is the case for commands reading stdin ("-" as a file) or asking
+    for confirmation, and for --timings and SIMPLELOGIN_TRACE, which time
+    the calling process.
+    """
+    words = [arg for arg in argv if not arg.startswith("-")]
+    if not words or words[0] in LOCAL_COMMANDS or tuple(words[:2]) in LOCAL_SUBCOMMANDS:
+        return True
+    if "--timings" in argv or os.environ.get("SIMPLELOGIN_TRACE"):
+        return True
+
+    for i, arg in enumerate(argv):
+        if arg.endswith("=-") or (arg == "-" and i and argv[i - 1].startswith("--")):
+            return True
+
+    confirmed = "--yes" in argv
+    if words[:2] == ["aliases", "delete"]:
+        # Deleting one alias always asks, a list only without --yes
+        return not confirmed or not any(a.startswith("--from-file") for a in argv)
+    if words[0] == "apply" and not confirmed:
+        return True
+    if words[:3] == ["aliases", "create", "custom"]:
+        # Mailboxes are picked interactively unless given
+        return not any(arg.startswith("--mailboxes") for arg in argv)
+    return False
+
+
+def connect(path, timeout=None):
+    """Connect to the daemon socket, or return None if no daemon listens"""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def send(stream, message):
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+
+def forward(argv, path=None):
+    """
+    Run a command line in the daemon, relaying its output
+
+    Returns the exit status, or None if the command should run locally
+    because no daemon is running, the command needs the terminal or the
+    daemon runs a different version of the CLI.
+    """
+    if os.environ.get("SIMPLELOGIN_NO_DAEMON") or needs_terminal(argv):
+        return None
+
+    sock = connect(path or socket_path())
+    if sock is None:
+        return None
+
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key.startswith("SIMPLELOGIN_")
+    }
+    with sock, sock.makefile("rwb") as stream:
+        send(
+            stream,
+            {"argv": argv, "cwd": os.getcwd(), "env": env, "code": code_version()},
+        )
+        for line in stream:
+            message = json.loads(line)
+            if "stdout" in message:
+                sys.stdout.write(message["stdout"])
+                sys.stdout.flush()
+            elif "stderr" in message:
+                sys.stderr.write(message["stderr"])
+                sys.stderr.flush()
+            elif "exit" in message:
+                return message["exit"]
+            elif "refused" in message:
+                print(f"Not using the daemon: {message['refused']}", file=sys.stderr)
+                return None
+
+    # The command may have run in part, so it is not run again
+    print("Error: The daemon closed the connection", file=sys.stderr)
+    return 1
+
+
+def control(command, path=None):
+    """Send "stop" or "status" to the daemon, returning its answer or None"""
+    sock = connect(path or socket_path(), timeout=5)
+    if sock is None:
+        return None
+    with sock, sock.makefile("rwb") as stream:
+        send(stream, {"control": command})
+        line = stream.readline()
+    return json.loads(line) if line else None
+
+
+class SocketOutput:
+    """Text stream sending what is written to the client as framed messages"""
+
+    def __init__(self, stream, name):
+        self.stream = stream
+        self.name = name
+        self.buffer = []
+        self.size = 0
+        self.sent = time.monotonic()
+        # The other stream of the command, flushed first to keep the order
+        self.peer = None
+
+    encoding = "utf-8"
+    errors = "strict"
+
+    def write(self, text):
+        if self.peer is not None and self.peer.buffer:
+            self.peer.flush()
+        self.buffer.append(text)
+        self.size += len(text)
+        if self.size >= OUTPUT_BUFFER or (
+            "\n" in text and time.monotonic() - self.sent >= OUTPUT_DELAY
+        ):
+            self.flush()
+        return len(text)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        if self.buffer:
+            text = "".join(self.buffer)
+            self.buffer = []
+            self.size = 0
+            send(self.stream, {self.name: text})
+            self.sent = time.monotonic()
+
+    def isatty(self):
+        return False
+
+    def fileno(self):
+        raise OSError("daemon output has no file descriptor")
+
+
+class Daemon:
+    """Serve command lines sent to a Unix socket, one at a time"""
+
+    def __init__(self, path, run):
+        """
+        Args:
+            path: Path of the socket
+            run: Callable running a command line (a list of arguments)
+        """
+        self.path = path
+        self.run = run
+        self.code = code_version()
+        self.started = time.time()
+        self.commands = 0
+        self.stopping = False
+
+    def bind(self):
+        """Listen on the socket, raising RuntimeError if a daemon already does"""
+        sock = connect(self.path, timeout=1)
+        if sock is not None:
+            sock.close()
+            raise RuntimeError(f"A daemon is already listening on {self.path}")
+        if os.path.exists(self.path):
+            # Left behind by a daemon that did not exit cleanly
+            os.unlink(self.path)
+
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Only the owner may connect: commands run with their API key
+        umask = os.umask(0o177)
+        try:
+            self.server.bind(self.path)
+        finally:
+            os.umask(umask)
+        self.server.listen(16)
+
+    def serve_forever(self):
+        try:
+            while not self.stopping:
+                conn, _ = self.server.accept()
+                conn.settimeout(REQUEST_TIMEOUT)
+                with conn, conn.makefile("rwb") as stream:
+                    try:
+                        self.handle(conn, stream)
+                    except (OSError, ValueError):
+                        # The client went away, sent garbage or nothing at all
+                        pass
+        finally:
+            self.server.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def handle(self, conn, stream):
+        line = stream.readline()
+        if not line:
+            return
+        request = json.loads(line)
+
+        if request.get("control") == "stop":
+            self.stopping = True
+            send(stream, {"stopped": True})
+        elif request.get("control") == "status":
+            send(stream, self.status())
+        elif request.get("code") != self.code:
+            send(
+                stream,
+                {"refused": "it runs another version of the CLI, restart it"},
+            )
+        elif not os.path.isdir(request.get("cwd", "")):
+            send(stream, {"refused": "it cannot see the working directory"})
+        else:
+            # Commands take as long as they take, and so may their output
+            conn.settimeout(None)
+            self.commands += 1
+            send(stream, {"exit": self.execute(request, stream)})
+
+    def status(self):
+        return {
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started,
+            "commands": self.commands,
+        }
+
+    def execute(self, request, stream):
+        """Run one forwarded command in the caller's context, returning its status"""
+        stdout = SocketOutput(stream, "stdout")
+        stderr = SocketOutput(stream, "stderr")
+        stdout.peer, stderr.peer = stderr, stdout
+        saved = (sys.stdin, sys.stdout, sys.stderr, os.getcwd(), dict(os.environ))
+
+        for key in [key for key in os.environ if key.startswith("SIMPLELOGIN_")]:
+            del os.environ[key]
+        os.environ.update(request.get("env") or {})
+        os.chdir(request["cwd"])
+        sys.stdin = open(os.devnull)
+        sys.stdout, sys.stderr = stdout, stderr
+
+        status = 0
+        try:
+            self.run(request["argv"])
+        except SystemExit as e:
+            if isinstance(e.code, str):
+                print(e.code, file=sys.stderr)
+                status = 1
+            else:
+                status = e.code or 0
+        except Exception:
+            import traceback
+
+            traceback.print_exc()
+            status = 1
+        finally:
+            sys.stdin.close()
+            sys.stdin, sys.stdout, sys.stderr, cwd, environ = saved
+            os.environ.clear()
+            os.environ.update(environ)
+            os.chdir(cwd)
+
+        stdout.flush()
+        stderr.flush()
+        return status
+
+
+def main():
+    """Entry point of the `simplelogin` command"""
+    status = forward(sys.argv[1:])
+    if status is not None:
+        sys.exit(status)
+
+    from simplelogin.cli import main
+
+    main()
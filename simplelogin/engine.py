@@ -0,0 +1,244 @@
+"""
+asyncio engine for fan-out API workloads
+
+An Engine schedules many API calls on an event loop and bounds how many are in
+flight at once. The HTTP client itself is blocking (requests), so each call
+runs on a thread of the engine's own executor, sized to the concurrency limit;
+the loop only decides what runs next and collects results as they complete.
+
+Commands are synchronous, so they use the engine through iterate(), which
+drives an async generator from ordinary code one item at a time.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Marks the end of the items in Engine.map_unordered
+DONE = object()
+
+
+class RateLimiter:
+    """Space calls out to at most `rate` per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_slot = 0.0
+
+    def reserve(self):
+        """Claim the next call slot and return how long to wait for it"""
+        now = time.monotonic()
+        slot = max(now, self.next_slot)
+        self.next_slot = slot + self.interval
+        return slot - now
+
+
+class AdaptiveLimit:
+    """
+    AIMD concurrency limit driven by how the API responds
+
+    Every healthy response raises the limit by 1/limit, so about one more call
+    is allowed in flight per round trip. A throttled response (429/503)
+    halves it, at most once per DECREASE_INTERVAL so that one burst of
+    rejections counts as a single signal. Responses are reported from worker
+    threads.
+    """
+
+    DECREASE_INTERVAL = 1.0
+
+    def __init__(self, ceiling, floor=1):
+        """
+        Args:
+            ceiling: Highest limit, and the one to start from
+            floor: Lowest limit
+        """
+        self.ceiling = max(floor, ceiling)
+        self.floor = floor
+        self.value = float(self.ceiling)
+        self.last_decrease = float("-inf")
+        self.lock = threading.Lock()
+
+    @property
+    def limit(self):
+        return int(self.value)
+
+    def on_success(self):
+        with self.lock:
+            self.value = min(self.ceiling, self.value + 1 / self.value)
+
+    def on_throttle(self):
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_decrease < self.DECREASE_INTERVAL:
+                return
+            self.last_decrease = now
+            self.value = max(self.floor, self.value / 2)
+
+
+class Engine:
+    """
+    Run blocking calls from asyncio with a limit on calls in flight
+
+    An engine belongs to the event loop it is first used on.
+    """
+
+    def __init__(self, limit, rate=None, adaptive=None):
+        """
+        Args:
+            limit: Maximum number of calls in flight
+            rate: Maximum number of calls started per second (unlimited if None)
+            adaptive: AdaptiveLimit lowering the number of calls in flight
+                while the API is throttling
+        """
+        self.limit = max(1, limit)
+        self.executor = ThreadPoolExecutor(max_workers=self.limit)
+        self.limiter = RateLimiter(rate) if rate else None
+        self.adaptive = adaptive
+        self.in_flight = 0
+        self.slots = asyncio.Condition()
+
+    def current_limit(self):
+        if self.adaptive is None:
+            return self.limit
+        return max(1, min(self.limit, self.adaptive.limit))
+
+    async def call(self, func, *args):
+        """Run func(*args) on the executor once a slot is free"""
+        async with self.slots:
+            await self.slots.wait_for(lambda: self.in_flight < self.current_limit())
+            self.in_flight += 1
+
+        try:
+            if self.limiter:
+                await asyncio.sleep(self.limiter.reserve())
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            async with self.slots:
+                self.in_flight -= 1
+                self.slots.notify_all()
+
+    async def map_unordered(self, func, items):
+        """
+        Call `func` on every item, yielding (item, result, error) as calls complete
+
+        error is the exception raised, if any. Items are consumed lazily, at
+        most `limit` ahead of the results, so `items` may be a stream, or an
+        async iterable such as flatten(engine.pages(...)).
+        """
+        pending = {}
+
+        if hasattr(items, "__anext__"):
+
+            async def next_item():
+                try:
+                    return await items.__anext__()
+                except StopAsyncIteration:
+                    return DONE
+
+        else:
+            items = iter(items)
+
+            async def next_item():
+                return next(items, DONE)
+
+        async def start_next():
+            item = await next_item()
+            if item is DONE:
+                return False
+            pending[asyncio.ensure_future(self.call(func, item))] = item
+            return True
+
+        try:
+            for _ in range(self.limit):
+                if not await start_next():
+                    break
+
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    item = pending.pop(task)
+                    error = task.exception()
+                    yield item, None if error else task.result(), error
+                    await start_next()
+        finally:
+            for task in pending:
+                task.cancel()
+            if hasattr(items, "aclose"):
+                await items.aclose()
+
+    async def pages(self, fetch_page, page_size, start=0):
+        """
+        Yield every page of a paginated listing, in page order
+
+        Pages are requested speculatively, `limit` ahead of the last page
+        yielded. Iteration stops after the first page holding fewer than
+        `page_size` items.
+        """
+        pending = deque()
+        next_page = start
+
+        def request_next():
+            nonlocal next_page
+            pending.append(asyncio.ensure_future(self.call(fetch_page, next_page)))
+            next_page += 1
+
+        for _ in range(self.limit):
+            request_next()
+
+        try:
+            while pending:
+                items = await pending.popleft()
+                yield items
+
+                if len(items) < page_size:
+                    break
+
+                request_next()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def close(self):
+        """Release the executor without waiting for abandoned calls"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def flatten(pages):
+    """Yield the items of each page from an async iterable of pages"""
+    async for page in pages:
+        for item in page:
+            yield item
+
+
+def iterate(agen):
+    """
+    Iterate an async generator from synchronous code
+
+    The generator runs on a private event loop that is only driven while the
+    caller waits for the next item. Calls already handed to an executor keep
+    running in between. Closing the iterator early cancels outstanding work.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                item = loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+            yield item
+    finally:
+        loop.run_until_complete(agen.aclose())
+
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            loop.run_until_complete(asyncio.wait(tasks))
+
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
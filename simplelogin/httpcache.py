@@ -0,0 +1,175 @@
+"""
+Transparent on-disk cache for GET requests to rarely changing endpoints
+
+Mailboxes, custom domains, alias options and single aliases are read far more
+often than they change, e.g. by every `aliases create custom` prompt. Their
+GET responses are cached per URL for a few minutes, in a DiskCache
+namespaced by account.
+
+Once an entry goes stale it is revalidated rather than simply refetched when
+the server gave a validator (ETag or Last-Modified): the request carries
+If-None-Match/If-Modified-Since and a 304 answer renews the cached copy.
+
+Any other request to a path invalidates the cached responses it can change,
+so a command always sees the effect of the previous one.
+"""
+
+import json
+import re
+import time
+
+# Cached endpoints and how many seconds their responses stay fresh
+CACHE_TTLS = [
+    (re.compile(r"^/api/v2/mailboxes$"), 600),
+    (re.compile(r"^/api/custom_domains$"), 300),
+    # Signed suffixes expire after ten minutes server side
+    (re.compile(r"^/api/v5/alias/options$"), 300),
+    (re.compile(r"^/api/aliases/\d+$"), 60),
+]
+
+# Changes to a path matching the pattern drop the cached GETs listed with it.
+# "{0}" stands for the first group of the match.
+INVALIDATIONS = [
+    (re.compile(r"^/api(?:/v\d+)?/mailboxes"), ["/api/v2/mailboxes"]),
+    (
+        re.compile(r"^/api/custom_domains"),
+        ["/api/custom_domains", "/api/v5/alias/options"],
+    ),
+    # Creating, updating or deleting an alias changes the alias counts of its
+    # mailboxes and custom domain
+    (
+        re.compile(r"^/api(?:/v\d+)?/alias/\w+/new"),
+        ["/api/v5/alias/options", "/api/v2/mailboxes", "/api/custom_domains"],
+    ),
+    (
+        re.compile(r"^/api/aliases/\d+$"),
+        ["/api/v2/mailboxes", "/api/custom_domains"],
+    ),
+    (re.compile(r"^/api/aliases/(\d+)"), ["/api/aliases/{0}"]),
+]
+
+# Responses with a validator are kept this long after going stale, so they
+# can still be revalidated
+STALE_RETENTION = 24 * 3600
+
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+class ResponseCache:
+    """Cache GET responses of the endpoints in CACHE_TTLS"""
+
+    def __init__(self, cache, base_url=""):
+        """
+        Args:
+            cache: DiskCache holding the responses, namespaced by account
+            base_url: API root the responses come from, part of every key so
+                that different servers never share entries
+        """
+        self.cache = cache
+        self.base_url = base_url
+
+    def ttl(self, path):
+        """Seconds a response for path stays fresh, or None if it is not cached"""
+        for pattern, ttl in CACHE_TTLS:
+            if pattern.match(path):
+                return ttl
+        return None
+
+    def key(self, path, params=None):
+        params = json.dumps(sorted((params or {}).items()))
+        return "http:" + self.base_url + path + "?" + params
+
+    def lookup(self, path, params=None):
+        """The cached entry for a GET, fresh or stale, or None"""
+        return self.cache.get(self.key(path, params))
+
+    def is_fresh(self, entry):
+        return entry["fresh_until"] > time.time()
+
+    def conditional_headers(self, entry):
+        """Headers revalidating a stale entry"""
+        headers = {}
+        if entry["headers"].get("ETag"):
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if entry["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        return headers
+
+    def store(self, path, params, response):
+        """Cache a successful GET response, unless the server forbids it"""
+        if response.status_code != 200:
+            return
+        if "no-store" in response.headers.get("Cache-Control", ""):
+            return
+
+        headers = {
+            name: response.headers[name]
+            for name in STORED_HEADERS
+            if response.headers.get(name)
+        }
+        entry = {
+            "status": response.status_code,
+            "headers": headers,
+            "body": response.text,
+        }
+        self.save(path, params, entry)
+
+    def save(self, path, params, entry):
+        """Store an entry as fresh from now"""
+        ttl = self.ttl(path)
+        entry["fresh_until"] = time.time() + ttl
+        if self.conditional_headers(entry):
+            ttl += STALE_RETENTION
+        self.cache.set(self.key(path, params), entry, ttl)
+
+    def replace_item(self, path, entry, field, item):
+        """
+        Write `item` into a cached list response, over the item with its id
+
+        A change whose response holds the updated item can then keep the list
+        cached instead of having it downloaded again. `entry` is the entry as
+        looked up before the change, which invalidated it. It is stored again
+        for the rest of its freshness, without validators since its body no
+        longer matches them.
+        """
+        remaining = entry["fresh_until"] - time.time()
+        if remaining <= 0:
+            return
+
+        body = json.loads(entry["body"])
+        items = body.get(field)
+        if not isinstance(items, list):
+            return
+        body[field] = [
+            item if existing.get("id") == item["id"] else existing for existing in items
+        ]
+
+        headers = {
+            name: value
+            for name, value in entry["headers"].items()
+            if name not in ("ETag", "Last-Modified")
+        }
+        entry = dict(entry, headers=headers, body=json.dumps(body))
+        self.cache.set(self.key(path), entry, remaining)
+
+    def invalidate(self, path):
+        """Drop the cached responses a request to path may have changed"""
+        for pattern, paths in INVALIDATIONS:
+            match = pattern.match(path)
+            if match:
+                for cached in paths:
+                    self.cache.delete(self.key(cached.format(*match.groups())))
+
+    def response(self, entry, url):
+        """Rebuild a requests.Response from a cached entry"""
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = url
+        response.from_cache = True
+        return response
@@ -0,0 +1,75 @@
+"""
+Machine-readable output for list commands
+
+The grid tables need every row up front to size their columns. These writers
+emit each record as soon as it arrives instead, so listing a whole account runs
+in constant memory and downstream tools see the first rows while later pages
+are still being fetched.
+"""
+
+import csv
+import json
+import sys
+
+OUTPUT_FORMATS = ("table", "json", "jsonl", "csv", "tsv")
+
+
+def csv_value(value):
+    """Format a field for a CSV/TSV cell"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def write_records(records, output_format, headers, row, out=None):
+    """
+    Write records one at a time in a machine-readable format
+
+    json and jsonl write each API record unchanged. csv and tsv write a header
+    line followed by one row per record.
+
+    Args:
+        records: Iterable of API records
+        output_format: One of "json", "jsonl", "csv" or "tsv"
+        headers: Column names for csv and tsv
+        row: Callable returning the csv/tsv values of a record, in column order
+        out: Stream to write to (stdout if None)
+
+    Returns the number of records written.
+    """
+    out = out or sys.stdout
+    count = 0
+
+    if output_format in ("csv", "tsv"):
+        delimiter = "," if output_format == "csv" else "\t"
+        writer = csv.writer(out, delimiter=delimiter, lineterminator="\n")
+        writer.writerow(headers)
+        for record in records:
+            writer.writerow([csv_value(value) for value in row(record)])
+            count += 1
+
+    elif output_format == "jsonl":
+        for record in records:
+            out.write(json.dumps(record) + "\n")
+            count += 1
+
+    elif output_format == "json":
+        # A streamed array: the opening bracket goes out before any record, and
+        # the closing one even if fetching the records fails, so that the
+        # output stays parseable (errors go to stderr)
+        out.write("[")
+        try:
+            for record in records:
+                out.write(("\n" if count == 0 else ",\n") + json.dumps(record))
+                count += 1
+        finally:
+            out.write("\n]\n" if count else "]\n")
+
+    else:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    return count
@@ -0,0 +1,299 @@
+"""
+Declarative account state for `simplelogin plan` and `simplelogin apply`
+
+A state file is YAML describing how some aliases and custom domains should
+be set up:
+
+    aliases:
+      shop@example.com:
+        enabled: true
+        pinned: false
+        note: Online shopping
+        name: Shop
+        mailboxes: [me@example.com]
+        contacts: [orders@vendor.com]
+    domains:
+      example.com:
+        catch_all: true
+        random_prefix_generation: false
+        mailboxes: [me@example.com]
+
+Only the settings written down are managed: anything left out of the file,
+including whole aliases, is left as it is. Mailboxes are named by email.
+Contacts are only ever added. Aliases missing from the account are created.
+
+plan_changes() compares a state with the live account and returns the
+changes needed to converge, one per alias or domain, each holding only the
+API calls that actually change something.
+"""
+
+import json
+
+ALIAS_SETTINGS = {
+    "enabled": bool,
+    "pinned": bool,
+    "note": str,
+    "name": str,
+    "mailboxes": list,
+    "contacts": list,
+}
+
+DOMAIN_SETTINGS = {
+    "catch_all": bool,
+    "random_prefix_generation": bool,
+    "mailboxes": list,
+}
+
+
+def validate_settings(kind, key, settings, allowed):
+    """Check the settings of one alias or domain, raising ValueError"""
+    if settings is None:
+        return {}
+    if not isinstance(settings, dict):
+        raise ValueError(f"{kind} {key}: expected a mapping of settings")
+
+    for setting, value in settings.items():
+        if setting not in allowed:
+            raise ValueError(f"{kind} {key}: unknown setting '{setting}'")
+
+        expected = allowed[setting]
+        if expected is str and value is None:
+            continue
+        if not isinstance(value, expected):
+            raise ValueError(f"{kind} {key}: '{setting}' must be a {expected.__name__}")
+        if expected is list and not all(isinstance(v, str) for v in value):
+            raise ValueError(f"{kind} {key}: '{setting}' must list emails")
+
+    if settings.get("mailboxes") == []:
+        raise ValueError(f"{kind} {key}: 'mailboxes' cannot be empty")
+
+    return settings
+
+
+def load_state(path):
+    """
+    Read and validate a state file
+
+    Returns {"aliases": {email: settings}, "domains": {name: settings}} with
+    lowercased keys. Raises OSError if the file cannot be read and ValueError
+    if it is not a valid state.
+    """
+    import yaml
+
+    with open(path, "r") as f:
+        try:
+            state = yaml.safe_load(f) or {}
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML: {e}")
+
+    if not isinstance(state, dict):
+        raise ValueError("Expected a mapping with 'aliases' and/or 'domains'")
+
+    unknown = set(state) - {"aliases", "domains"}
+    if unknown:
+        raise ValueError(f"Unknown section: {', '.join(sorted(unknown))}")
+
+    sections = {}
+    for section, kind, allowed in (
+        ("aliases", "alias", ALIAS_SETTINGS),
+        ("domains", "domain", DOMAIN_SETTINGS),
+    ):
+        entries = state.get(section) or {}
+        if not isinstance(entries, dict):
+            raise ValueError(f"'{section}' must be a mapping")
+        sections[section] = {
+            str(key).lower(): validate_settings(kind, key, settings, allowed)
+            for key, settings in entries.items()
+        }
+
+    return sections
+
+
+def mailbox_emails(record):
+    """Emails of the mailboxes of a live alias or domain"""
+    return {mailbox["email"].lower() for mailbox in record.get("mailboxes") or []}
+
+
+def mailbox_ids(kind, key, emails, mailboxes):
+    """Map mailbox emails to ids, raising ValueError for unknown mailboxes"""
+    ids = []
+    for email in emails:
+        if email.lower() not in mailboxes:
+            raise ValueError(f"{kind} {key}: unknown mailbox {email}")
+        ids.append(mailboxes[email.lower()])
+    return ids
+
+
+def split_alias_email(email, suffixes):
+    """
+    Split an alias email into a prefix and one of the available suffixes
+
+    The longest suffix ending the email wins, so "@sub.example.com" is
+    preferred over "@example.com". Returns None if no suffix fits.
+    """
+    matches = [
+        suffix
+        for suffix in suffixes
+        if email.endswith(suffix) and len(email) > len(suffix)
+    ]
+    if not matches:
+        return None
+    suffix = max(matches, key=len)
+    return email[: -len(suffix)], suffix
+
+
+def plan_alias(email, settings, alias, mailboxes, contacts, suffixes):
+    """The change converging one alias, or None if it is up to date"""
+    change = {
+        "kind": "alias",
+        "name": email,
+        "id": alias["id"] if alias else None,
+        "create": None,
+        "update": {},
+        "enabled": None,
+        "contacts": [],
+        "diff": [],
+    }
+
+    if alias is None:
+        split = split_alias_email(email, suffixes)
+        if split is None:
+            raise ValueError(f"alias {email}: no available suffix matches it")
+        prefix, suffix = split
+
+        change["create"] = {"alias_prefix": prefix, "suffix": suffix}
+        for setting in ("note", "name"):
+            if settings.get(setting):
+                change["create"][setting] = settings[setting]
+        if "mailboxes" in settings:
+            change["create"]["mailbox_ids"] = mailbox_ids(
+                "alias", email, settings["mailboxes"], mailboxes
+            )
+        if settings.get("pinned"):
+            change["update"]["pinned"] = True
+        if settings.get("enabled") is False:
+            change["enabled"] = False
+        change["contacts"] = list(settings.get("contacts", []))
+        change["diff"] = [(setting, None, value) for setting, value in settings.items()]
+        return change
+
+    for setting in ("note", "name"):
+        if setting in settings and (alias.get(setting) or None) != (
+            settings[setting] or None
+        ):
+            change["update"][setting] = settings[setting]
+            change["diff"].append((setting, alias.get(setting), settings[setting]))
+
+    if "pinned" in settings and alias.get("pinned") != settings["pinned"]:
+        change["update"]["pinned"] = settings["pinned"]
+        change["diff"].append(("pinned", alias.get("pinned"), settings["pinned"]))
+
+    if "mailboxes" in settings:
+        ids = mailbox_ids("alias", email, settings["mailboxes"], mailboxes)
+        current = mailbox_emails(alias)
+        if current != {m.lower() for m in settings["mailboxes"]}:
+            change["update"]["mailbox_ids"] = ids
+            change["diff"].append(("mailboxes", sorted(current), settings["mailboxes"]))
+
+    if "enabled" in settings and alias["enabled"] != settings["enabled"]:
+        change["enabled"] = settings["enabled"]
+        change["diff"].append(("enabled", alias["enabled"], settings["enabled"]))
+
+    existing = {contact.lower() for contact in contacts.get(alias["id"], [])}
+    change["contacts"] = [
+        contact
+        for contact in settings.get("contacts", [])
+        if contact.lower() not in existing
+    ]
+    if change["contacts"]:
+        change["diff"].append(("contacts", None, change["contacts"]))
+
+    return change if change["diff"] else None
+
+
+def plan_domain(name, settings, domain, mailboxes):
+    """The change converging one custom domain, or None if it is up to date"""
+    change = {"kind": "domain", "name": name, "id": domain["id"], "update": {}}
+    diff = []
+
+    for setting in ("catch_all", "random_prefix_generation"):
+        if setting in settings and domain.get(setting) != settings[setting]:
+            change["update"][setting] = settings[setting]
+            diff.append((setting, domain.get(setting), settings[setting]))
+
+    if "mailboxes" in settings:
+        ids = mailbox_ids("domain", name, settings["mailboxes"], mailboxes)
+        current = mailbox_emails(domain)
+        if current != {m.lower() for m in settings["mailboxes"]}:
+            change["update"]["mailbox_ids"] = ids
+            diff.append(("mailboxes", sorted(current), settings["mailboxes"]))
+
+    change["diff"] = diff
+    return change if diff else None
+
+
+def plan_changes(state, aliases, domains, mailboxes, contacts, suffixes=()):
+    """
+    List the changes converging the live account to a state
+
+    Args:
+        state: Desired state, as returned by load_state
+        aliases: Live aliases of the account, as returned by the API
+        domains: Live custom domains
+        mailboxes: Live mailboxes
+        contacts: Contact emails of existing aliases, by alias id, for the
+            aliases whose state lists contacts
+        suffixes: Suffixes available for new aliases
+
+    Raises ValueError if the state names an unknown mailbox or custom domain,
+    or an alias that cannot be created.
+    """
+    aliases = {alias["email"].lower(): alias for alias in aliases}
+    domains = {domain["domain_name"].lower(): domain for domain in domains}
+    mailboxes = {mailbox["email"].lower(): mailbox["id"] for mailbox in mailboxes}
+    changes = []
+
+    for name, settings in state["domains"].items():
+        if name not in domains:
+            raise ValueError(f"domain {name}: no such custom domain")
+        change = plan_domain(name, settings, domains[name], mailboxes)
+        if change:
+            changes.append(change)
+
+    for email, settings in state["aliases"].items():
+        change = plan_alias(
+            email, settings, aliases.get(email), mailboxes, contacts, suffixes
+        )
+        if change:
+            changes.append(change)
+
+    return changes
+
+
+def count_calls(change):
+    """Number of API calls applying a change takes"""
+    if change["kind"] == "domain":
+        return 1
+    return (
+        (change["create"] is not None)
+        + bool(change["update"])
+        + (change["enabled"] is not None)
+        + len(change["contacts"])
+    )
+
+
+def format_change(change):
+    """Describe a change as lines of text, terraform style"""
+    created = change["kind"] == "alias" and change["create"] is not None
+    lines = [f"{'+' if created else '~'} {change['kind']} {change['name']}"]
+
+    for setting, old, new in change["diff"]:
+        if setting == "contacts":
+            for contact in new:
+                lines.append(f"    + contact {contact}")
+        elif created:
+            lines.append(f"    {setting}: {json.dumps(new)}")
+        else:
+            lines.append(f"    {setting}: {json.dumps(old)} -> {json.dumps(new)}")
+
+    return lines
@@ -0,0 +1,106 @@
+"""
+Client-side rate limiting shared between processes
+
+Several CLI processes running at once (from cron, CI, or a shell loop) each
+see only their own requests. A SharedTokenBucket keeps its state in a small
+file instead, updated under an exclusive file lock, so every process using
+the same file draws from one bucket and together they stay under the limit.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: the bucket is only shared within one process
+    fcntl = None
+
+RATE_UNITS = {
+    "s": 1,
+    "sec": 1,
+    "second": 1,
+    "m": 60,
+    "min": 60,
+    "minute": 60,
+    "h": 3600,
+    "hour": 3600,
+}
+
+
+def parse_rate(value):
+    """
+    Parse a rate such as 5, "2.5", "100/min" or "1000/hour" into requests per second
+
+    Raises ValueError for anything else.
+    """
+    count, _, unit = str(value).strip().partition("/")
+    unit = unit.strip().lower() or "s"
+    if unit not in RATE_UNITS:
+        raise ValueError(f"Unknown rate unit: {unit}")
+
+    rate = float(count) / RATE_UNITS[unit]
+    if rate <= 0:
+        raise ValueError("Rate must be positive")
+    return rate
+
+
+class SharedTokenBucket:
+    """Token bucket whose state lives in a lock-protected file"""
+
+    def __init__(self, path, rate, burst=None):
+        """
+        Args:
+            path: State file, shared by every process that should share the limit
+            rate: Tokens added per second
+            burst: Bucket size, i.e. how many requests may go out back to back
+                (one second's worth, and at least one, if None)
+        """
+        self.path = path
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def locked_state(self):
+        """Open the state file holding an exclusive lock on it"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self.lock, os.fdopen(fd, "r+") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield f
+
+    def try_acquire(self):
+        """Take a token if one is available, or return how long until one is"""
+        with self.locked_state() as f:
+            try:
+                state = json.loads(f.read())
+            except ValueError:
+                state = {}
+
+            now = time.time()
+            tokens = state.get("tokens", self.burst)
+            elapsed = max(0.0, now - state.get("updated", now))
+            tokens = min(self.burst, tokens + elapsed * self.rate)
+
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps({"tokens": tokens, "updated": now}))
+
+        return wait
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            time.sleep(wait)
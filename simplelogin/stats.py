@@ -0,0 +1,155 @@
+"""
+Account-wide alias statistics for `simplelogin aliases stats`
+
+AliasStats consumes aliases one at a time, as the pages arrive, and keeps
+only aggregates: totals, how the forward and block counts are distributed,
+per-group counters and the top aliases by forwards and by blocks. The top
+aliases are kept in bounded min-heaps of `top` entries, so memory stays the
+same whether the account has a hundred aliases or a hundred thousand.
+"""
+
+import heapq
+
+COUNTERS = ["nb_forward", "nb_reply", "nb_block"]
+
+# Distribution buckets as (label, lowest count), in ascending order
+BUCKETS = [("0", 0), ("1-9", 1), ("10-99", 10), ("100-999", 100), ("1000+", 1000)]
+
+GROUPINGS = ("mailbox", "domain")
+
+DEFAULT_TOP = 10
+
+
+def bucket(count):
+    """Index in BUCKETS of the bucket holding `count`"""
+    index = 0
+    for i, (_, lowest) in enumerate(BUCKETS):
+        if count >= lowest:
+            index = i
+    return index
+
+
+def alias_groups(alias, by):
+    """Names of the groups an alias counts towards"""
+    if by == "domain":
+        return [alias["email"].rsplit("@", 1)[-1].lower()]
+    return [mailbox["email"] for mailbox in alias.get("mailboxes") or []] or ["-"]
+
+
+class TopN:
+    """The `size` largest entries seen, by (count, lowest id)"""
+
+    def __init__(self, size):
+        self.size = size
+        self.heap = []
+
+    def add(self, count, alias):
+        if self.size <= 0 or count <= 0:
+            return
+        # Ties go to the lower id, so the smallest heap entry has the higher id
+        entry = (count, -alias["id"], alias["email"], alias["enabled"])
+        if len(self.heap) < self.size:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+
+    def items(self):
+        """(count, alias id, email, enabled) tuples, largest first"""
+        return [
+            (count, -negated_id, email, enabled)
+            for count, negated_id, email, enabled in sorted(self.heap, reverse=True)
+        ]
+
+
+class AliasStats:
+    """Streaming aggregates over the aliases of an account"""
+
+    def __init__(self, top=DEFAULT_TOP, by=None):
+        """
+        Args:
+            top: Number of aliases kept in each top list
+            by: Also aggregate per "mailbox" or per "domain", or None
+        """
+        if by is not None and by not in GROUPINGS:
+            raise ValueError(f"Cannot group by {by}, use mailbox or domain")
+
+        self.by = by
+        self.aliases = 0
+        self.enabled = 0
+        self.pinned = 0
+        self.totals = dict.fromkeys(COUNTERS, 0)
+        self.distribution = {
+            counter: [0] * len(BUCKETS) for counter in ("nb_forward", "nb_block")
+        }
+        self.top_forwards = TopN(top)
+        self.top_blocks = TopN(top)
+        self.groups = {}
+
+    def add(self, alias):
+        """Count one alias, as returned by /api/v2/aliases"""
+        counts = {counter: alias.get(counter) or 0 for counter in COUNTERS}
+
+        self.aliases += 1
+        self.enabled += bool(alias["enabled"])
+        self.pinned += bool(alias.get("pinned"))
+        for counter, count in counts.items():
+            self.totals[counter] += count
+        for counter, buckets in self.distribution.items():
+            buckets[bucket(counts[counter])] += 1
+
+        self.top_forwards.add(counts["nb_forward"], alias)
+        self.top_blocks.add(counts["nb_block"], alias)
+
+        if self.by:
+            for name in alias_groups(alias, self.by):
+                group = self.groups.get(name)
+                if group is None:
+                    group = self.groups[name] = dict.fromkeys(
+                        ["aliases", "enabled"] + COUNTERS, 0
+                    )
+                group["aliases"] += 1
+                group["enabled"] += bool(alias["enabled"])
+                for counter, count in counts.items():
+                    group[counter] += count
+
+    def update(self, aliases):
+        for alias in aliases:
+            self.add(alias)
+        return self
+
+    def to_dict(self):
+        """The statistics as plain data, e.g. for JSON output"""
+
+        def top(entries):
+            return [
+                {"id": alias_id, "email": email, "enabled": enabled, "count": count}
+                for count, alias_id, email, enabled in entries.items()
+            ]
+
+        stats = {
+            "aliases": self.aliases,
+            "enabled": self.enabled,
+            "disabled": self.aliases - self.enabled,
+            "pinned": self.pinned,
+            "forwards": self.totals["nb_forward"],
+            "replies": self.totals["nb_reply"],
+            "blocks": self.totals["nb_block"],
+            "distribution": {
+                counter: dict(zip((label for label, _ in BUCKETS), buckets))
+                for counter, buckets in self.distribution.items()
+            },
+            "top_forwards": top(self.top_forwards),
+            "top_blocks": top(self.top_blocks),
+        }
+        if self.by:
+            stats["by_" + self.by] = self.sorted_groups()
+        return stats
+
+    def sorted_groups(self):
+        """Per-group counters, most forwarded group first"""
+        return [
+            dict(group, name=name)
+            for name, group in sorted(
+                self.groups.items(), key=lambda item: (-item[1]["nb_forward"], item[0])
+            )
+        ]
@@ -0,0 +1,455 @@
+"""
+Local SQLite mirror of a SimpleLogin account
+
+`simplelogin sync` copies aliases, mailboxes and custom domains into this store
+so read-only commands can answer from disk with --cached. Each record is kept
+as the raw API JSON next to a few indexed columns used for filtering.
+
+Aliases are also indexed for offline search. The email, name, note and mailbox
+emails of each alias go into an FTS5 table using the trigram tokenizer, which
+answers substring queries from the index. SQLite builds without it (before
+3.34) fall back to a plain table that is scanned instead.
+
+The store also remembers how far `aliases activity` has read the activity of
+each alias (see simplelogin.activity).
+"""
+
+import hashlib
+import itertools
+import json
+import re
+import sqlite3
+
+STORE_FILENAME = "account.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS aliases (
+    id INTEGER PRIMARY KEY,
+    email TEXT NOT NULL,
+    name TEXT,
+    note TEXT,
+    enabled INTEGER NOT NULL,
+    pinned INTEGER NOT NULL,
+    activity TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS aliases_email ON aliases (email);
+CREATE TABLE IF NOT EXISTS mailboxes (
+    id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS custom_domains (
+    id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS activity_marks (
+    alias_id INTEGER PRIMARY KEY,
+    activity TEXT,
+    mark TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Search text, one row per alias with rowid = alias id
+SEARCH_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS alias_search"
+    " USING fts5(text, tokenize='trigram', detail='none')"
+)
+SEARCH_SCHEMA_FALLBACK = (
+    "CREATE TABLE IF NOT EXISTS alias_search (rowid INTEGER PRIMARY KEY, text TEXT)"
+)
+
+# Number of best-ranked candidates re-scored by a fuzzy search
+FUZZY_CANDIDATES = 500
+
+
+def activity_key(alias):
+    """Value that changes whenever an alias sees new activity"""
+    latest = alias.get("latest_activity") or {}
+    timestamp = latest.get("timestamp")
+    return None if timestamp is None else str(timestamp)
+
+
+def search_fields(alias):
+    """Lowercased searchable values of an alias: email, name, note and mailboxes"""
+    fields = [alias.get("email"), alias.get("name"), alias.get("note")]
+    fields.extend(mailbox.get("email") for mailbox in alias.get("mailboxes") or [])
+    return [field.lower() for field in fields if field]
+
+
+def trigrams(text):
+    """Set of the three-character substrings of `text`"""
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def account_key(api_key):
+    """Identify an account without storing its API key"""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+class AccountStore:
+    """SQLite-backed copy of the aliases, mailboxes and domains of one account"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(str(path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._create_search_table()
+
+    def close(self):
+        self.conn.close()
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row["value"] if row else default
+
+    def set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    def bind_account(self, api_key):
+        """
+        Tie the store to the account behind `api_key`
+
+        If the store holds data from a different account it is wiped first.
+        """
+        key = account_key(api_key)
+        if self.get_meta("account") not in (None, key):
+            self.clear()
+        self.set_meta("account", key)
+
+    def clear(self):
+        with self.conn:
+            for table in (
+                "aliases",
+                "alias_search",
+                "mailboxes",
+                "custom_domains",
+                "activity_marks",
+                "meta",
+            ):
+                self.conn.execute(f"DELETE FROM {table}")
+
+    @property
+    def synced(self):
+        """Whether a full alias sync has completed at least once"""
+        return self.get_meta("last_full_sync") is not None
+
+    # Aliases
+
+    def page_is_current(self, aliases):
+        """
+        Whether every unpinned alias of an API page is stored with the same activity
+
+        The API lists pinned aliases first whatever their activity, so they say
+        nothing about whether later pages changed. A page holding only pinned
+        aliases is never current.
+        """
+        aliases = [alias for alias in aliases if not alias.get("pinned")]
+        if not aliases:
+            return False
+
+        ids = [alias["id"] for alias in aliases]
+        rows = self.conn.execute(
+            f"SELECT id, activity FROM aliases WHERE id IN ({','.join('?' * len(ids))})",
+            ids,
+        ).fetchall()
+        stored = {row["id"]: row["activity"] for row in rows}
+
+        return all(
+            alias["id"] in stored and stored[alias["id"]] == activity_key(alias)
+            for alias in aliases
+        )
+
+    def upsert_aliases(self, aliases):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO aliases"
+                " (id, email, name, note, enabled, pinned, activity, data)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        alias["id"],
+                        alias["email"],
+                        alias.get("name"),
+                        alias.get("note"),
+                        int(bool(alias.get("enabled"))),
+                        int(bool(alias.get("pinned"))),
+                        activity_key(alias),
+                        json.dumps(alias),
+                    )
+                    for alias in aliases
+                ],
+            )
+            self._index_aliases(aliases)
+
+    def prune_aliases(self, keep_ids):
+        """Delete every stored alias whose id is not in `keep_ids`"""
+        keep_ids = set(keep_ids)
+        stored = [row["id"] for row in self.conn.execute("SELECT id FROM aliases")]
+        removed = [(alias_id,) for alias_id in stored if alias_id not in keep_ids]
+
+        with self.conn:
+            self.conn.executemany("DELETE FROM aliases WHERE id = ?", removed)
+            self.conn.executemany("DELETE FROM alias_search WHERE rowid = ?", removed)
+        return len(removed)
+
+    def update_alias(self, alias_id, **fields):
+        """Apply changed fields to a stored alias, if it is stored"""
+        alias = self.get_alias(alias_id)
+        if alias is None:
+            return
+        alias.update(fields)
+        self.upsert_aliases([alias])
+
+    def delete_alias(self, alias_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM aliases WHERE id = ?", (int(alias_id),))
+            self.conn.execute(
+                "DELETE FROM alias_search WHERE rowid = ?", (int(alias_id),)
+            )
+
+    def get_alias(self, alias_id):
+        row = self.conn.execute(
+            "SELECT data FROM aliases WHERE id = ?", (int(alias_id),)
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def find_alias_by_email(self, email):
+        row = self.conn.execute(
+            "SELECT data FROM aliases WHERE email = ? COLLATE NOCASE", (email,)
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def list_aliases(
+        self,
+        pinned=False,
+        disabled=False,
+        enabled=False,
+        query=None,
+        limit=None,
+        offset=0,
+    ):
+        """
+        Stored aliases, most recently active first
+
+        Filters mirror the /api/v2/aliases parameters: only one of pinned,
+        disabled and enabled applies. `query` matches a substring of the
+        email, name or note.
+        """
+        conditions = []
+        params = []
+        if pinned:
+            conditions.append("pinned = 1")
+        elif disabled:
+            conditions.append("enabled = 0")
+        elif enabled:
+            conditions.append("enabled = 1")
+
+        if query:
+            conditions.append("(email LIKE ? OR name LIKE ? OR note LIKE ?)")
+            params.extend([f"%{query}%"] * 3)
+
+        sql = "SELECT data FROM aliases"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY activity IS NULL, activity DESC, id DESC"
+
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+
+        return [json.loads(row["data"]) for row in self.conn.execute(sql, params)]
+
+    def iter_aliases(self):
+        """Stream every stored alias, in no particular order"""
+        for row in self.conn.execute("SELECT data FROM aliases"):
+            yield json.loads(row["data"])
+
+    def count_aliases(self):
+        return self.conn.execute("SELECT COUNT(*) FROM aliases").fetchone()[0]
+
+    # Search
+
+    def _create_search_table(self):
+        try:
+            self.conn.execute(SEARCH_SCHEMA)
+            self.indexed_search = True
+        except sqlite3.OperationalError:
+            self.conn.execute(SEARCH_SCHEMA_FALLBACK)
+            self.indexed_search = False
+
+    def _index_aliases(self, aliases):
+        """Replace the search rows of `aliases` (inside the caller's transaction)"""
+        self.conn.executemany(
+            "DELETE FROM alias_search WHERE rowid = ?",
+            [(alias["id"],) for alias in aliases],
+        )
+        self.conn.executemany(
+            "INSERT INTO alias_search (rowid, text) VALUES (?, ?)",
+            [(alias["id"], "\n".join(search_fields(alias))) for alias in aliases],
+        )
+
+    def _search_rows(self, where="", params=(), order=None, limit=None):
+        """(alias JSON, search text) pairs matching a condition on the search table"""
+        sql = (
+            "SELECT a.data, alias_search.text FROM alias_search"
+            " JOIN aliases a ON a.id = alias_search.rowid"
+        )
+        if where:
+            sql += f" WHERE {where}"
+        # Newest aliases first: FTS5 walks rowids in order without sorting
+        sql += " ORDER BY " + (order or "alias_search.rowid DESC")
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+
+        for row in self.conn.execute(sql, params):
+            yield row["data"], row["text"]
+
+    def search_aliases(self, pattern, mode="substring", limit=None):
+        """
+        Search stored aliases by email, name, note and mailbox email
+
+        Args:
+            pattern: Text to look for (case-insensitive)
+            mode: One of "substring", "prefix", "regex" or "fuzzy"
+            limit: Maximum number of aliases returned
+
+        Results come newest alias first. Prefix queries match the start of any
+        of the searched fields. Regex queries scan aliases until `limit` is
+        reached. Fuzzy queries rank aliases by the share of the pattern's
+        trigrams they contain, best match first.
+        """
+        needle = pattern.lower()
+        # An ESCAPE clause would stop FTS5 from using the trigram index, so
+        # wildcards in the pattern are left in: they only widen the candidate
+        # set, which is checked against the pattern below.
+        like = f"%{needle}%"
+
+        if mode == "substring":
+            matches = (
+                data
+                for data, text in self._search_rows("alias_search.text LIKE ?", (like,))
+                if needle in text
+            )
+        elif mode == "prefix":
+            matches = (
+                data
+                for data, text in self._search_rows("alias_search.text LIKE ?", (like,))
+                if any(field.startswith(needle) for field in text.split("\n"))
+            )
+        elif mode == "regex":
+            regex = re.compile(pattern, re.IGNORECASE)
+            matches = (
+                data
+                for data, text in self._search_rows()
+                if any(regex.search(field) for field in text.split("\n"))
+            )
+        elif mode == "fuzzy":
+            return self._fuzzy_search(needle, limit)
+        else:
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        return [json.loads(data) for data in itertools.islice(matches, limit)]
+
+    def _fuzzy_search(self, needle, limit=None, threshold=0.5):
+        grams = trigrams(needle)
+        if not grams:
+            return []
+
+        if self.indexed_search:
+            # Any alias sharing a trigram, best ranked first
+            query = " OR ".join('"%s"' % gram.replace('"', '""') for gram in grams)
+            rows = self._search_rows(
+                "alias_search MATCH ?",
+                (query,),
+                order="alias_search.rank",
+                limit=FUZZY_CANDIDATES,
+            )
+        else:
+            rows = self._search_rows()
+
+        scored = []
+        for data, text in rows:
+            score = sum(gram in text for gram in grams) / len(grams)
+            if score >= threshold:
+                scored.append((score, data))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [json.loads(data) for _, data in scored[:limit]]
+
+    # Activity feed
+
+    def activity_marks(self):
+        """
+        Where `aliases activity` stopped reading each alias
+
+        Returns {alias id: (activity key, high-water mark)}, see
+        simplelogin.activity.
+        """
+        rows = self.conn.execute("SELECT alias_id, activity, mark FROM activity_marks")
+        return {
+            row["alias_id"]: (row["activity"], json.loads(row["mark"] or "null"))
+            for row in rows
+        }
+
+    def save_activity_marks(self, marks):
+        """Store (alias id, activity key, high-water mark) tuples"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO activity_marks (alias_id, activity, mark)"
+                " VALUES (?, ?, ?)",
+                [
+                    (alias_id, activity, json.dumps(mark))
+                    for alias_id, activity, mark in marks
+                ],
+            )
+
+    def prune_activity_marks(self, keep_ids):
+        """Forget the marks of aliases whose id is not in `keep_ids`"""
+        keep_ids = set(keep_ids)
+        stored = [
+            row["alias_id"]
+            for row in self.conn.execute("SELECT alias_id FROM activity_marks")
+        ]
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM activity_marks WHERE alias_id = ?",
+                [(alias_id,) for alias_id in stored if alias_id not in keep_ids],
+            )
+
+    # Mailboxes and custom domains
+
+    def _replace_all(self, table, records):
+        with self.conn:
+            self.conn.execute(f"DELETE FROM {table}")
+            self.conn.executemany(
+                f"INSERT INTO {table} (id, data) VALUES (?, ?)",
+                [(record["id"], json.dumps(record)) for record in records],
+            )
+
+    def _load_all(self, table):
+        rows = self.conn.execute(f"SELECT data FROM {table} ORDER BY id")
+        return [json.loads(row["data"]) for row in rows]
+
+    def replace_mailboxes(self, mailboxes):
+        self._replace_all("mailboxes", mailboxes)
+
+    def mailboxes(self):
+        return self._load_all("mailboxes")
+
+    def replace_custom_domains(self, domains):
+        self._replace_all("custom_domains", domains)
+
+    def custom_domains(self):
+        return self._load_all("custom_domains")
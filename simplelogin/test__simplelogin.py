@@ -5,12 +5,21 @@ import io
 # import sys
 # import os
 # import json
+import json
+import subprocess
+import sys
 import yaml
 from pathlib import Path
 import tempfile
 
 # Import the module directly
 from simplelogin import cli
+from simplelogin.archive import (
+    ArchiveWriter,
+    checkpoint_path,
+    exported_ids_path,
+    read_archive,
+)
 
 
 class SimpleLoginCLITests(unittest.TestCase):
@@ -125,25 +134,21 @@ class SimpleLoginCLITests(unittest.TestCase):
         formatted = cli.format_datetime("invalid")
         self.assertEqual(formatted, "invalid")
 
-    @patch("simplelogin.cli.requests.get")
-    @patch("simplelogin.cli.get_headers")
+    @patch("simplelogin.cli.get_client")
     @patch("sys.stdout", new_callable=io.StringIO)
-    def test_list_aliases(self, mock_stdout, mock_get_headers, mock_get):
-        mock_get_headers.return_value = {"Authentication": "test_api_key"}
+    def test_list_aliases(self, mock_stdout, mock_get_client):
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = self.mock_alias_list_response
-        mock_get.return_value = mock_response
+        mock_get_client.return_value.get.return_value = mock_response
 
         cli.list_aliases(self.test_config, page=0)
 
         # Verify API call
-        mock_get.assert_called_once_with(
-            f"{cli.BASE_URL}/api/v2/aliases",
-            headers={"Authentication": "test_api_key"},
+        mock_get_client.return_value.get.assert_called_once_with(
+            "/api/v2/aliases",
             params={"page_id": 0},
             json=None,
-            timeout=10,
         )
 
         # Check output contains expected data
@@ -151,41 +156,192 @@ class SimpleLoginCLITests(unittest.TestCase):
         self.assertIn("test@example.com", output)
         self.assertIn("Test Alias", output)
 
-    @patch("simplelogin.cli.requests.get")
-    @patch("simplelogin.cli.get_headers")
-    def test_get_alias_options(self, mock_get_headers, mock_get):
-        mock_get_headers.return_value = {"Authentication": "test_api_key"}
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_list_aliases_all_pages(self, mock_stdout, mock_get_client):
+        alias = self.mock_alias_list_response["aliases"][0]
+        pages = {
+            0: [dict(alias, id=i, email=f"a{i}@example.com") for i in range(20)],
+            1: [dict(alias, id=20, email="a20@example.com")],
+        }
+
+        def get(path, params, json):
+            response = MagicMock()
+            response.json.return_value = {"aliases": pages.get(params["page_id"], [])}
+            return response
+
+        mock_get_client.return_value.get.side_effect = get
+
+        cli.list_aliases(self.test_config, all_pages=True, pinned=True, workers=2)
+
+        requested = [
+            call.kwargs["params"]
+            for call in mock_get_client.return_value.get.call_args_list
+        ]
+        self.assertIn({"page_id": 0, "pinned": True}, requested)
+        self.assertIn({"page_id": 1, "pinned": True}, requested)
+
+        output = mock_stdout.getvalue()
+        self.assertLess(output.index("a19@example.com"), output.index("a20@"))
+        self.assertNotIn("Use --page", output)
+
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_list_aliases_formats(self, mock_stdout, mock_get_client):
+        alias = self.mock_alias_list_response["aliases"][0]
+        pages = {
+            0: [dict(alias, id=i, email=f"a{i}@example.com") for i in range(20)],
+            1: [dict(alias, id=20, email="a20@example.com")],
+        }
+        mock_get_client.return_value.get.side_effect = self.mock_account_get(pages)
+
+        cli.list_aliases(self.test_config, all_pages=True, output_format="jsonl")
+
+        lines = mock_stdout.getvalue().splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], list(range(21)))
+
+        mock_stdout.seek(0)
+        mock_stdout.truncate()
+        cli.list_aliases(self.test_config, output_format="csv")
+
+        lines = mock_stdout.getvalue().splitlines()
+        self.assertEqual(lines[0], ",".join(cli.ALIAS_FIELDS))
+        self.assertTrue(lines[1].startswith("0,a0@example.com,"))
+        self.assertEqual(len(lines), 21)
+        self.assertNotIn("Use --page", mock_stdout.getvalue())
+
+    def make_contact(self, contact_id):
+        return {
+            "id": contact_id,
+            "contact": f"c{contact_id}@vendor.com",
+            "reverse_alias": f"ra{contact_id}@simplelogin.co",
+            "last_email_sent_date": None,
+            "block_forward": False,
+        }
+
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_list_contacts_all_pages(self, mock_stdout, mock_get_client):
+        contacts = [self.make_contact(i) for i in range(25)]
+
+        def get(path, params=None):
+            response = MagicMock()
+            start = params["page_id"] * 20
+            response.json.return_value = {"contacts": contacts[start : start + 20]}
+            return response
+
+        mock_get_client.return_value.get.side_effect = get
+
+        cli.list_contacts(self.test_config, "123", all_pages=True, workers=2)
+
+        output = mock_stdout.getvalue()
+        self.assertIn("c0@vendor.com", output)
+        self.assertIn("c24@vendor.com", output)
+        self.assertNotIn("Use --page", output)
+        mock_get_client.return_value.get.assert_any_call(
+            "/api/aliases/123/contacts", params={"page_id": 1, "alias_id": "123"}
+        )
+
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stderr", new_callable=io.StringIO)
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_list_all_contacts(self, mock_stdout, mock_stderr, mock_get_client):
+        alias = self.mock_alias_list_response["aliases"][0]
+        aliases = [dict(alias, id=i, email=f"a{i}@example.com") for i in range(25)]
+        contacts = {
+            i: [self.make_contact(i * 100 + j) for j in range(i % 3)] for i in range(25)
+        }
+        contacts[0] = [self.make_contact(k) for k in range(1000, 1030)]
+
+        def get(path, params=None, json=None, refresh=False):
+            response = MagicMock()
+            if path == "/api/v2/aliases":
+                start = params["page_id"] * 20
+                response.json.return_value = {"aliases": aliases[start : start + 20]}
+                return response
+
+            alias_id = int(path.split("/")[3])
+            if alias_id == 7:
+                return self.http_error_response(404)
+            start = params["page_id"] * 20
+            response.json.return_value = {
+                "contacts": contacts[alias_id][start : start + 20]
+            }
+            return response
+
+        mock_get_client.return_value.get.side_effect = get
+
+        cli.list_all_contacts(self.test_config, workers=4, output_format="jsonl")
+
+        records = [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+        expected = sum(len(c) for i, c in contacts.items() if i != 7)
+        self.assertEqual(len(records), expected)
+        # Contacts past the first page of an alias are included
+        self.assertIn(1029, {record["id"] for record in records})
+        record = next(r for r in records if r["id"] == 2301)
+        self.assertEqual(record["alias_id"], 23)
+        self.assertEqual(record["alias"], "a23@example.com")
+        self.assertIn(
+            "Error listing contacts of a7@example.com", mock_stderr.getvalue()
+        )
+
+    @patch("simplelogin.cli.get_config_dir")
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_list_domains_json(self, mock_stdout, mock_get_client, mock_get_config_dir):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
+        mock_response = MagicMock()
+        mock_response.json.return_value = self.mock_domain_response
+        mock_get_client.return_value.get.return_value = mock_response
+
+        cli.list_domains(self.test_config, output_format="json")
+
+        self.assertEqual(
+            json.loads(mock_stdout.getvalue()),
+            self.mock_domain_response["custom_domains"],
+        )
+
+    @patch("simplelogin.cli.load_config")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_main_unknown_format(self, mock_stdout, mock_load_config):
+        test_argv = ["simplelogin-cli", "mailboxes", "list", "--format=xml"]
+        with patch("sys.argv", test_argv):
+            cli.main()
+
+        self.assertIn("Unknown format 'xml'", mock_stdout.getvalue())
+        mock_load_config.assert_not_called()
+
+    @patch("simplelogin.cli.get_config_dir")
+    @patch("simplelogin.cli.get_client")
+    def test_get_alias_options(self, mock_get_client, mock_get_config_dir):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = self.mock_alias_options
-        mock_get.return_value = mock_response
+        mock_get_client.return_value.get.return_value = mock_response
 
         result = cli.get_alias_options(self.test_config)
-
-        # Verify API call
-        mock_get.assert_called_once_with(
-            f"{cli.BASE_URL}/api/v5/alias/options",
-            headers={"Authentication": "test_api_key"},
-            params={},
-            timeout=10,
+        mock_get_client.return_value.get.assert_called_once_with(
+            "/api/v5/alias/options", params={}, refresh=False
         )
-
         self.assertEqual(result, self.mock_alias_options)
 
-    @patch("simplelogin.cli.requests.post")
+        # A refresh bypasses the response cache
+        cli.get_alias_options(self.test_config, refresh=True)
+        mock_get_client.return_value.get.assert_called_with(
+            "/api/v5/alias/options", params={}, refresh=True
+        )
+
+    @patch("simplelogin.cli.get_client")
     @patch("simplelogin.cli.get_alias_options")
-    @patch("simplelogin.cli.get_headers")
     @patch("sys.stdout", new_callable=io.StringIO)
-    def test_create_custom_alias(
-        self, mock_stdout, mock_get_headers, mock_get_options, mock_post
-    ):
-        mock_get_headers.return_value = {"Authentication": "test_api_key"}
+    def test_create_custom_alias(self, mock_stdout, mock_get_options, mock_get_client):
         mock_get_options.return_value = self.mock_alias_options
 
         mock_response = MagicMock()
         mock_response.status_code = 201
         mock_response.json.return_value = self.mock_alias_creation_response
-        mock_post.return_value = mock_response
+        mock_get_client.return_value.post.return_value = mock_response
 
         cli.create_custom_alias(
             self.test_config,
@@ -196,16 +352,14 @@ class SimpleLoginCLITests(unittest.TestCase):
         )
 
         # Verify API call
-        mock_post.assert_called_once_with(
-            f"{cli.BASE_URL}/api/v3/alias/custom/new",
-            headers={"Authentication": "test_api_key"},
+        mock_get_client.return_value.post.assert_called_once_with(
+            "/api/v3/alias/custom/new",
             json={
                 "alias_prefix": "test",
                 "signed_suffix": "signed_suffix_data",
                 "note": "Test note",
                 "name": "Test Name",
             },
-            timeout=10,
         )
 
         # Check output
@@ -213,26 +367,59 @@ class SimpleLoginCLITests(unittest.TestCase):
         self.assertIn("Custom alias created", output)
         self.assertIn("new_alias@example.com", output)
 
-    @patch("simplelogin.cli.requests.post")
-    @patch("simplelogin.cli.get_headers")
+    @patch("simplelogin.cli.get_config_dir")
+    @patch("simplelogin.cli.get_client")
     @patch("sys.stdout", new_callable=io.StringIO)
-    def test_create_random_alias(self, mock_stdout, mock_get_headers, mock_post):
-        mock_get_headers.return_value = {"Authentication": "test_api_key"}
+    def test_create_custom_alias_expired_suffix(
+        self, mock_stdout, mock_get_client, mock_get_config_dir
+    ):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
+        fresh_options = {
+            "can_create": True,
+            "suffixes": [
+                {"suffix": "@other.com", "signed_suffix": "other_signed"},
+                {"suffix": "@example.com", "signed_suffix": "fresh_signed"},
+            ],
+        }
+        mock_client = mock_get_client.return_value
+        mock_client.get.return_value.json.side_effect = [
+            self.mock_alias_options,
+            fresh_options,
+        ]
 
+        expired = MagicMock()
+        expired.status_code = 412
+        created = MagicMock()
+        created.status_code = 201
+        created.json.return_value = self.mock_alias_creation_response
+        mock_client.post.side_effect = [expired, created]
+
+        cli.create_custom_alias(
+            self.test_config, prefix="test", suffix_id=0, mailbox_ids=[789]
+        )
+
+        # The options are fetched again and the same suffix is re-signed
+        self.assertEqual(mock_client.get.call_count, 2)
+        self.assertEqual(
+            mock_client.post.call_args.kwargs["json"]["signed_suffix"], "fresh_signed"
+        )
+        self.assertIn("Custom alias created", mock_stdout.getvalue())
+
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_create_random_alias(self, mock_stdout, mock_get_client):
         mock_response = MagicMock()
         mock_response.status_code = 201
         mock_response.json.return_value = self.mock_alias_creation_response
-        mock_post.return_value = mock_response
+        mock_get_client.return_value.post.return_value = mock_response
 
         cli.create_random_alias(self.test_config, mode="word", note="Test note")
 
         # Verify API call
-        mock_post.assert_called_once_with(
-            f"{cli.BASE_URL}/api/alias/random/new",
-            headers={"Authentication": "test_api_key"},
+        mock_get_client.return_value.post.assert_called_once_with(
+            "/api/alias/random/new",
             json={"note": "Test note"},
             params={"mode": "word"},
-            timeout=10,
         )
 
         # Check output
@@ -240,12 +427,47 @@ class SimpleLoginCLITests(unittest.TestCase):
         self.assertIn("Random alias created", output)
         self.assertIn("new_alias@example.com", output)
 
-    @patch("simplelogin.cli.requests.post")
-    @patch("simplelogin.cli.requests.get")
-    @patch("simplelogin.cli.get_headers")
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stderr", new_callable=io.StringIO)
     @patch("sys.stdout", new_callable=io.StringIO)
-    def test_toggle_alias(self, mock_stdout, mock_get_headers, mock_get, mock_post):
-        mock_get_headers.return_value = {"Authentication": "test_api_key"}
+    def test_create_random_aliases(self, mock_stdout, mock_stderr, mock_get_client):
+        notes_file = Path(self.temp_dir.name) / "notes.txt"
+        notes_file.write_text("first\n\nthird\n")
+
+        def post(path, json, params):
+            response = MagicMock()
+            response.json.return_value = {
+                "id": 200 + len(mock_get_client.return_value.post.call_args_list),
+                "email": "random@example.com",
+                "note": json.get("note"),
+            }
+            return response
+
+        mock_get_client.return_value.post.side_effect = post
+
+        cli.create_random_aliases(
+            self.test_config,
+            count=4,
+            mode="word",
+            note="default",
+            notes_file=str(notes_file),
+            workers=2,
+        )
+
+        created = [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+        self.assertEqual(len(created), 4)
+        self.assertEqual(
+            sorted(alias["note"] for alias in created),
+            ["default", "default", "first", "third"],
+        )
+        for call in mock_get_client.return_value.post.call_args_list:
+            self.assertEqual(call.kwargs["params"], {"mode": "word"})
+        self.assertIn("Created 4 of 4 aliases", mock_stderr.getvalue())
+
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_toggle_alias(self, mock_stdout, mock_get_client):
+        mock_client = mock_get_client.return_value
 
         # Mock get alias info
         mock_get_response = MagicMock()
@@ -255,78 +477,167 @@ class SimpleLoginCLITests(unittest.TestCase):
             "email": "test@example.com",
             "enabled": True,
         }
-        mock_get.return_value = mock_get_response
+        mock_client.get.return_value = mock_get_response
 
         # Mock toggle
         mock_post_response = MagicMock()
         mock_post_response.status_code = 200
-        mock_post.return_value = mock_post_response
+        mock_post_response.json.return_value = {"enabled": False}
+        mock_client.post.return_value = mock_post_response
 
         cli.toggle_alias(self.test_config, "123")
 
         # Verify API calls
-        mock_get.assert_called_once_with(
-            f"{cli.BASE_URL}/api/aliases/123",
-            headers={"Authentication": "test_api_key"},
-            timeout=10,
-        )
-
-        mock_post.assert_called_once_with(
-            f"{cli.BASE_URL}/api/aliases/123/toggle",
-            headers={"Authentication": "test_api_key"},
-            timeout=10,
-        )
+        mock_client.get.assert_called_once_with("/api/aliases/123", refresh=True)
+        mock_client.post.assert_called_once_with("/api/aliases/123/toggle")
 
         # Check output
         output = mock_stdout.getvalue()
         self.assertIn("test@example.com is now disabled", output)
 
-    @patch("builtins.input", return_value="y")
-    @patch("simplelogin.cli.requests.delete")
-    @patch("simplelogin.cli.requests.get")
-    @patch("simplelogin.cli.get_headers")
+        # A stale read of the alias doesn't change the reported state
+        mock_post_response.json.return_value = {"enabled": True}
+        cli.toggle_alias(self.test_config, "123")
+        self.assertIn("test@example.com is now enabled", mock_stdout.getvalue())
+
+    def http_error_response(self, status_code):
+        response = MagicMock()
+        response.status_code = status_code
+        response.raise_for_status.side_effect = cli.requests.exceptions.HTTPError(
+            f"{status_code} error", response=response
+        )
+        return response
+
+    @patch("simplelogin.cli.get_config_dir")
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_toggle_aliases_from_file(
+        self, mock_stdout, mock_get_client, mock_get_config_dir
+    ):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
+        ids_file = Path(self.temp_dir.name) / "ids.txt"
+        ids_file.write_text("123\n# comment\n\nmissing@example.com\n124\n125\n")
+
+        def post(path):
+            if path == "/api/aliases/124/toggle":
+                return self.http_error_response(404)
+            if path == "/api/aliases/125/toggle":
+                return self.http_error_response(500)
+            response = MagicMock()
+            response.json.return_value = {"enabled": False}
+            return response
+
+        mock_client = mock_get_client.return_value
+        mock_client.post.side_effect = post
+        mock_client.get.return_value.json.return_value = {"aliases": []}
+
+        cli.toggle_aliases(self.test_config, str(ids_file), workers=2)
+
+        self.assertEqual(mock_client.post.call_count, 3)
+        output = mock_stdout.getvalue()
+        self.assertIn("disabled", output)
+        self.assertIn("1 ok, 2 not found, 1 errors", output)
+        # Results are listed in input order
+        self.assertLess(output.index("123"), output.index("missing@example.com"))
+
+    def test_set_alias_enabled(self):
+        client = MagicMock()
+        client.get.return_value.json.return_value = {"enabled": True}
+        client.post.return_value.json.return_value = {"enabled": False}
+
+        # Already enabled: one read, bypassing the response cache, no toggle
+        self.assertFalse(cli.set_alias_enabled(client, 123, True))
+        client.get.assert_called_once_with("/api/aliases/123", refresh=True)
+        client.post.assert_not_called()
+
+        # Needs disabling: read and toggle once
+        client.reset_mock()
+        self.assertTrue(cli.set_alias_enabled(client, 123, False))
+        client.post.assert_called_once_with("/api/aliases/123/toggle")
+
+        # Known state: no request at all
+        client.reset_mock()
+        self.assertFalse(cli.set_alias_enabled(client, 123, False, current=False))
+        client.get.assert_not_called()
+        client.post.assert_not_called()
+
+        # Stale known state: the toggle response reveals it, toggle back
+        client.reset_mock()
+        self.assertFalse(cli.set_alias_enabled(client, 123, True, current=False))
+        client.get.assert_not_called()
+        self.assertEqual(client.post.call_count, 2)
+
+    @patch("simplelogin.cli.get_config_dir")
+    @patch("simplelogin.cli.get_client")
     @patch("sys.stdout", new_callable=io.StringIO)
-    def test_delete_alias(
-        self, mock_stdout, mock_get_headers, mock_get, mock_delete, mock_input
+    def test_enable_alias_cached(
+        self, mock_stdout, mock_get_client, mock_get_config_dir
     ):
-        mock_get_headers.return_value = {"Authentication": "test_api_key"}
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
+        alias = dict(self.mock_alias_list_response["aliases"][0], enabled=False)
+        mock_client = mock_get_client.return_value
+        mock_client.get.side_effect = self.mock_account_get({0: [alias]})
+        cli.sync_account(self.test_config)
+
+        mock_client.reset_mock()
+        mock_client.post.return_value.json.return_value = {"enabled": True}
+        cli.enable_alias(self.test_config, "123", True, cached=True)
+        cli.enable_alias(self.test_config, "123", True, cached=True)
+
+        # The first call toggles and records the new state, the second is free
+        mock_client.get.assert_not_called()
+        mock_client.post.assert_called_once_with("/api/aliases/123/toggle")
+        output = mock_stdout.getvalue()
+        self.assertIn("test@example.com is now enabled", output)
+        self.assertIn("test@example.com is already enabled", output)
+
+    @patch("builtins.input")
+    @patch("simplelogin.cli.bulk_alias_action")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_delete_aliases_from_stdin_requires_yes(
+        self, mock_stdout, mock_bulk, mock_input
+    ):
+        cli.delete_aliases(self.test_config, "-")
+
+        mock_input.assert_not_called()
+        mock_bulk.assert_not_called()
+        self.assertIn("--yes", mock_stdout.getvalue())
+
+        cli.delete_aliases(self.test_config, "-", yes=True)
+        mock_bulk.assert_called_once_with(
+            self.test_config, "-", "delete", workers=cli.DEFAULT_WORKERS, rate=None
+        )
+
+    @patch("builtins.input", return_value="y")
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_delete_alias(self, mock_stdout, mock_get_client, mock_input):
+        mock_client = mock_get_client.return_value
 
         # Mock get alias info
         mock_get_response = MagicMock()
         mock_get_response.status_code = 200
         mock_get_response.json.return_value = {"id": 123, "email": "test@example.com"}
-        mock_get.return_value = mock_get_response
+        mock_client.get.return_value = mock_get_response
 
         # Mock delete
         mock_delete_response = MagicMock()
         mock_delete_response.status_code = 200
-        mock_delete.return_value = mock_delete_response
+        mock_client.delete.return_value = mock_delete_response
 
         cli.delete_alias(self.test_config, "123")
 
         # Verify API calls
-        mock_get.assert_called_once_with(
-            f"{cli.BASE_URL}/api/aliases/123",
-            headers={"Authentication": "test_api_key"},
-            timeout=10,
-        )
-
-        mock_delete.assert_called_once_with(
-            f"{cli.BASE_URL}/api/aliases/123",
-            headers={"Authentication": "test_api_key"},
-            timeout=10,
-        )
+        mock_client.get.assert_called_once_with("/api/aliases/123")
+        mock_client.delete.assert_called_once_with("/api/aliases/123")
 
         # Check output
         output = mock_stdout.getvalue()
         self.assertIn("test@example.com deleted successfully", output)
 
-    @patch("simplelogin.cli.requests.get")
-    @patch("simplelogin.cli.get_headers")
+    @patch("simplelogin.cli.get_client")
     @patch("sys.stdout", new_callable=io.StringIO)
-    def test_alias_info(self, mock_stdout, mock_get_headers, mock_get):
-        mock_get_headers.return_value = {"Authentication": "test_api_key"}
-
+    def test_alias_info(self, mock_stdout, mock_get_client):
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {
@@ -340,16 +651,12 @@ class SimpleLoginCLITests(unittest.TestCase):
             "nb_reply": 5,
             "nb_block": 1,
         }
-        mock_get.return_value = mock_response
+        mock_get_client.return_value.get.return_value = mock_response
 
         cli.alias_info(self.test_config, "123")
 
         # Verify API call
-        mock_get.assert_called_once_with(
-            f"{cli.BASE_URL}/api/aliases/123",
-            headers={"Authentication": "test_api_key"},
-            timeout=10,
-        )
+        mock_get_client.return_value.get.assert_called_once_with("/api/aliases/123")
 
         # Check output
         output = mock_stdout.getvalue()
@@ -357,67 +664,67 @@ class SimpleLoginCLITests(unittest.TestCase):
         self.assertIn("Test note", output)
         self.assertIn("Forwarded emails: 10", output)
 
-    @patch("simplelogin.cli.requests.get")
-    @patch("simplelogin.cli.get_headers")
+    @patch("simplelogin.cli.get_config_dir")
+    @patch("simplelogin.cli.get_client")
     @patch("sys.stdout", new_callable=io.StringIO)
-    def test_list_domains(self, mock_stdout, mock_get_headers, mock_get):
-        mock_get_headers.return_value = {"Authentication": "test_api_key"}
-
+    def test_list_domains(self, mock_stdout, mock_get_client, mock_get_config_dir):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = self.mock_domain_response
-        mock_get.return_value = mock_response
+        mock_get_client.return_value.get.return_value = mock_response
 
         cli.list_domains(self.test_config)
 
         # Verify API call
-        mock_get.assert_called_once_with(
-            f"{cli.BASE_URL}/api/custom_domains",
-            headers={"Authentication": "test_api_key"},
-            timeout=10,
+        mock_get_client.return_value.get.assert_called_once_with(
+            "/api/custom_domains", refresh=True
         )
 
         # Check output
         output = mock_stdout.getvalue()
         self.assertIn("testdomain.com", output)
 
-    @patch("simplelogin.cli.requests.get")
-    @patch("simplelogin.cli.get_headers")
+    @patch("simplelogin.cli.get_config_dir")
+    @patch("simplelogin.cli.get_client")
     @patch("sys.stdout", new_callable=io.StringIO)
-    def test_domain_info(self, mock_stdout, mock_get_headers, mock_get):
-        mock_get_headers.return_value = {"Authentication": "test_api_key"}
-
+    def test_domain_info(self, mock_stdout, mock_get_client, mock_get_config_dir):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = self.mock_domain_response
-        mock_get.return_value = mock_response
+        mock_get_client.return_value.get.return_value = mock_response
 
         cli.domain_info(self.test_config, "456")
+        cli.domain_info(self.test_config, "TestDomain.com")
+        cli.domain_info(self.test_config, "999")
 
-        # Verify API call
-        mock_get.assert_called_once_with(
-            f"{cli.BASE_URL}/api/custom_domains",
-            headers={"Authentication": "test_api_key"},
-            timeout=10,
-        )
+        mock_get_client.return_value.get.assert_called_with("/api/custom_domains")
 
         # Check output
         output = mock_stdout.getvalue()
-        self.assertIn("testdomain.com", output)
+        self.assertEqual(output.count("Domain: testdomain.com"), 2)
         self.assertIn("Catch-all: Disabled", output)
+        self.assertIn("Domain 999 not found.", output)
 
-    @patch("simplelogin.cli.requests.patch")
-    @patch("simplelogin.cli.domain_info")  # Mock this to avoid duplicate testing
-    @patch("simplelogin.cli.get_headers")
+    @patch("simplelogin.cli.get_config_dir")
+    @patch("simplelogin.cli.get_client")
     @patch("sys.stdout", new_callable=io.StringIO)
-    def test_update_domain(
-        self, mock_stdout, mock_get_headers, mock_domain_info, mock_patch
-    ):
-        mock_get_headers.return_value = {"Authentication": "test_api_key"}
-
+    def test_update_domain(self, mock_stdout, mock_get_client, mock_get_config_dir):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
+        mock_client = mock_get_client.return_value
+        mock_client.get.return_value.json.return_value = self.mock_domain_response
+
+        updated = dict(
+            self.mock_domain_response["custom_domains"][0],
+            catch_all=True,
+            random_prefix_generation=False,
+            name="New Domain Name",
+        )
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_patch.return_value = mock_response
+        mock_response.json.return_value = {"custom_domain": updated}
+        mock_client.patch.return_value = mock_response
 
         cli.update_domain(
             self.test_config,
@@ -429,46 +736,547 @@ class SimpleLoginCLITests(unittest.TestCase):
         )
 
         # Verify API call
-        mock_patch.assert_called_once_with(
-            f"{cli.BASE_URL}/api/custom_domains/456",
-            headers={"Authentication": "test_api_key"},
+        mock_client.patch.assert_called_once_with(
+            "/api/custom_domains/456",
             json={
                 "catch_all": True,
                 "random_prefix_generation": False,
                 "name": "New Domain Name",
                 "mailbox_ids": [789, 790],
             },
-            timeout=10,
         )
 
+        # The updated domain comes with the PATCH response
+        mock_client.get.assert_not_called()
+
         # Check output
         output = mock_stdout.getvalue()
         self.assertIn("Domain updated successfully", output)
+        self.assertIn("Catch-all: Enabled", output)
+        self.assertIn("Name: New Domain Name", output)
 
-    @patch("simplelogin.cli.requests.get")
-    @patch("simplelogin.cli.get_headers")
+    @patch("simplelogin.cli.get_client")
     @patch("sys.stdout", new_callable=io.StringIO)
-    def test_list_mailboxes(self, mock_stdout, mock_get_headers, mock_get):
-        mock_get_headers.return_value = {"Authentication": "test_api_key"}
-
+    def test_list_mailboxes(self, mock_stdout, mock_get_client):
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = self.mock_mailbox_response
-        mock_get.return_value = mock_response
+        mock_get_client.return_value.get.return_value = mock_response
 
         cli.list_mailboxes(self.test_config)
 
         # Verify API call
-        mock_get.assert_called_once_with(
-            f"{cli.BASE_URL}/api/v2/mailboxes",
-            headers={"Authentication": "test_api_key"},
-            timeout=10,
+        mock_get_client.return_value.get.assert_called_once_with(
+            "/api/v2/mailboxes", refresh=True
         )
 
         # Check output
         output = mock_stdout.getvalue()
         self.assertIn("user@example.com", output)
 
+    def mock_account_get(self, pages):
+        """Build a client.get side effect serving the given alias pages"""
+
+        def get(path, params=None, json=None, refresh=False):
+            response = MagicMock()
+            if path == "/api/v2/aliases":
+                aliases = pages.get(params["page_id"], [])
+                response.json.return_value = {"aliases": aliases}
+            elif path == "/api/v2/mailboxes":
+                response.json.return_value = self.mock_mailbox_response
+            else:
+                response.json.return_value = self.mock_domain_response
+            return response
+
+        return get
+
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_alias_stats(self, mock_stdout, mock_get_client):
+        alias = self.mock_alias_list_response["aliases"][0]
+        pages = {
+            0: [
+                dict(alias, id=i, email=f"a{i}@example.com", nb_forward=i, nb_block=0)
+                for i in range(20)
+            ],
+            1: [dict(alias, id=20, email="a20@example.com", nb_forward=0, nb_block=7)],
+        }
+        mock_get_client.return_value.get.side_effect = self.mock_account_get(pages)
+
+        cli.alias_stats(self.test_config, top=2, by="mailbox", output_format="json")
+
+        stats = json.loads(mock_stdout.getvalue())
+        self.assertEqual(stats["aliases"], 21)
+        self.assertEqual(stats["forwards"], sum(range(20)))
+        self.assertEqual([a["id"] for a in stats["top_forwards"]], [19, 18])
+        self.assertEqual([a["id"] for a in stats["top_blocks"]], [20])
+        self.assertEqual(stats["by_mailbox"][0]["aliases"], 21)
+
+        mock_stdout.seek(0)
+        mock_stdout.truncate()
+        cli.alias_stats(self.test_config, top=2)
+
+        output = mock_stdout.getvalue()
+        self.assertIn("Most forwarded", output)
+        self.assertIn("a19@example.com", output)
+        self.assertNotIn("a17@example.com", output)
+
+    @patch("simplelogin.cli.get_config_dir")
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_alias_activity(self, mock_stdout, mock_get_client, mock_get_config_dir):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
+        alias = self.mock_alias_list_response["aliases"][0]
+        aliases = [
+            dict(
+                alias, id=1, email="a1@example.com", latest_activity={"timestamp": 30}
+            ),
+            dict(
+                alias, id=2, email="a2@example.com", latest_activity={"timestamp": 20}
+            ),
+            dict(alias, id=3, email="a3@example.com", latest_activity=None),
+        ]
+        activities = {
+            1: [{"action": "forward", "from": "x@vendor.com", "timestamp": 30}],
+            2: [
+                {"action": "block", "from": "y@vendor.com", "timestamp": 20},
+                {"action": "forward", "from": "y@vendor.com", "timestamp": 10},
+            ],
+        }
+
+        def get(path, params=None, json=None, refresh=False):
+            response = MagicMock()
+            if path == "/api/v2/aliases":
+                page = aliases if params["page_id"] == 0 else []
+                response.json.return_value = {"aliases": page}
+            else:
+                alias_id = int(path.split("/")[3])
+                page = activities[alias_id] if params["page_id"] == 0 else []
+                response.json.return_value = {"activities": page}
+            return response
+
+        mock_client = mock_get_client.return_value
+        mock_client.get.side_effect = get
+
+        cli.alias_activity(self.test_config, workers=2, output_format="jsonl")
+        feed = [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+        self.assertEqual([a["timestamp"] for a in feed], [10, 20, 30])
+        self.assertEqual(feed[0]["alias"], "a2@example.com")
+
+        # Only the alias with new activity is read again, up to its mark
+        aliases[0]["latest_activity"] = {"timestamp": 40}
+        activities[1].insert(
+            0, {"action": "reply", "from": "x@vendor.com", "timestamp": 40}
+        )
+        mock_client.get.reset_mock()
+        mock_stdout.seek(0)
+        mock_stdout.truncate()
+
+        cli.alias_activity(self.test_config, workers=2, output_format="jsonl")
+        feed = [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+        self.assertEqual([a["action"] for a in feed], ["reply"])
+
+        read = {
+            call.args[0]
+            for call in mock_client.get.call_args_list
+            if call.args[0] != "/api/v2/aliases"
+        }
+        self.assertEqual(read, {"/api/aliases/1/activities"})
+
+        mock_stdout.seek(0)
+        mock_stdout.truncate()
+        cli.alias_activity(self.test_config)
+        self.assertIn("No new activity.", mock_stdout.getvalue())
+
+    @patch("simplelogin.cli.time.sleep")
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_watch_aliases(self, mock_stdout, mock_get_client, mock_sleep):
+        alias = self.mock_alias_list_response["aliases"][0]
+        pages = {0: [dict(alias, id=i, email=f"a{i}@example.com") for i in range(3)]}
+        mock_client = mock_get_client.return_value
+        mock_client.get.side_effect = self.mock_account_get(pages)
+
+        def poll(seconds):
+            # Between the first and second poll an alias gets disabled
+            if mock_sleep.call_count == 1:
+                pages[0][1] = dict(pages[0][1], enabled=False)
+            elif mock_sleep.call_count == 3:
+                raise KeyboardInterrupt
+
+        mock_sleep.side_effect = poll
+
+        with patch("sys.stderr", new_callable=io.StringIO):
+            cli.watch_aliases(
+                self.test_config, interval=10, max_interval=60, output_format="jsonl"
+            )
+
+        events = [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+        self.assertEqual(
+            [(e["event"], e["alias_id"]) for e in events], [("disabled", 1)]
+        )
+        # The change resets the interval, a quiet poll makes it grow again
+        self.assertEqual([c.args[0] for c in mock_sleep.call_args_list], [15, 10, 15])
+        self.assertEqual(mock_client.get.call_count, 3)
+
+    @patch("simplelogin.cli.EXPORT_BATCH_PAGES", 1)
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_export_account_resumes(self, mock_stdout, mock_get_client):
+        alias = self.mock_alias_list_response["aliases"][0]
+        aliases = [dict(alias, id=i, email=f"a{i}@example.com") for i in range(50)]
+        failures = {"remaining": 1}
+
+        def get(path, params=None, json=None, refresh=False):
+            response = MagicMock()
+            if path == "/api/v2/aliases":
+                start = params["page_id"] * 20
+                response.json.return_value = {"aliases": aliases[start : start + 20]}
+            elif path == "/api/v2/mailboxes":
+                response.json.return_value = self.mock_mailbox_response
+            elif path == "/api/custom_domains":
+                response.json.return_value = self.mock_domain_response
+            elif path.endswith("/trash"):
+                response.json.return_value = {
+                    "aliases": [{"alias": "old@testdomain.com"}]
+                }
+            else:
+                alias_id = int(path.split("/")[3])
+                if alias_id == 30 and failures["remaining"]:
+                    failures["remaining"] -= 1
+                    return self.http_error_response(500)
+                response.json.return_value = {
+                    "contacts": [{"id": alias_id, "contact": "c@vendor.com"}]
+                }
+            return response
+
+        mock_get_client.return_value.get.side_effect = get
+        path = Path(self.temp_dir.name) / "account.jsonl.gz"
+
+        cli.export_account(self.test_config, path, workers=3)
+
+        self.assertIn("Run the same command again", mock_stdout.getvalue())
+        self.assertTrue(checkpoint_path(path).exists())
+
+        cli.export_account(self.test_config, path, workers=3)
+
+        self.assertIn("Resuming export after 20 aliases", mock_stdout.getvalue())
+        self.assertIn("Exported 50 aliases and 50 contacts", mock_stdout.getvalue())
+        self.assertFalse(checkpoint_path(path).exists())
+        self.assertFalse(exported_ids_path(path).exists())
+
+        records = list(read_archive(path))
+        by_type = {}
+        for record in records:
+            by_type.setdefault(record["type"], []).append(record)
+
+        self.assertEqual(len(by_type["header"]), 1)
+        self.assertEqual(len(by_type["mailbox"]), 1)
+        self.assertEqual(by_type["domain_trash"][0]["domain_id"], 456)
+        self.assertEqual(
+            sorted(r["data"]["id"] for r in by_type["alias"]), list(range(50))
+        )
+        contact = next(r for r in by_type["contact"] if r["alias_id"] == 30)
+        self.assertEqual(contact["alias"], "a30@example.com")
+
+        cli.export_account(self.test_config, path)
+        self.assertIn("already exists", mock_stdout.getvalue())
+
+    @patch("simplelogin.cli.EXPORT_BATCH_PAGES", 1)
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_export_account_resumes_after_reordering(
+        self, mock_stdout, mock_get_client
+    ):
+        alias = self.mock_alias_list_response["aliases"][0]
+        aliases = [dict(alias, id=i, email=f"a{i}@example.com") for i in range(50)]
+        failures = {"remaining": 1}
+
+        def get(path, params=None, json=None, refresh=False):
+            response = MagicMock()
+            if path == "/api/v2/aliases":
+                start = params["page_id"] * 20
+                response.json.return_value = {"aliases": aliases[start : start + 20]}
+            elif path == "/api/v2/mailboxes":
+                response.json.return_value = self.mock_mailbox_response
+            elif path == "/api/custom_domains":
+                response.json.return_value = {"custom_domains": []}
+            elif int(path.split("/")[3]) == 30 and failures["remaining"]:
+                failures["remaining"] -= 1
+                return self.http_error_response(500)
+            else:
+                response.json.return_value = {"contacts": []}
+            return response
+
+        mock_get_client.return_value.get.side_effect = get
+        path = Path(self.temp_dir.name) / "account.jsonl.gz"
+
+        cli.export_account(self.test_config, path, workers=3)
+        self.assertTrue(checkpoint_path(path).exists())
+
+        # Alias 45 sees activity and moves to the first, already exported page
+        aliases.insert(0, aliases.pop(45))
+        cli.export_account(self.test_config, path, workers=3)
+
+        self.assertIn("Exported 50 aliases", mock_stdout.getvalue())
+        exported = [
+            record["data"]["id"]
+            for record in read_archive(path)
+            if record["type"] == "alias"
+        ]
+        self.assertEqual(sorted(exported), list(range(50)))
+
+    @patch("simplelogin.cli.get_config_dir")
+    @patch("simplelogin.cli.get_alias_options")
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stderr", new_callable=io.StringIO)
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_import_archive(
+        self,
+        mock_stdout,
+        mock_stderr,
+        mock_get_client,
+        mock_get_options,
+        mock_get_config_dir,
+    ):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
+        path = Path(self.temp_dir.name) / "account.jsonl.gz"
+        writer = ArchiveWriter(path, {})
+        writer.write_batch(
+            [
+                {"type": "header", "version": 1, "created": "2023-01-01"},
+                {"type": "mailbox", "data": {"id": 1, "email": "USER@example.com"}},
+                {
+                    "type": "alias",
+                    "data": {
+                        "id": 1,
+                        "email": "shop@example.com",
+                        "note": "Shopping",
+                        "name": None,
+                        "enabled": False,
+                        "mailboxes": [{"id": 1, "email": "USER@example.com"}],
+                    },
+                },
+                {"type": "alias", "data": {"id": 2, "email": "test@example.com"}},
+                {"type": "alias", "data": {"id": 3, "email": "old.x1@aleeas.com"}},
+                {
+                    "type": "contact",
+                    "alias_id": 1,
+                    "alias": "shop@example.com",
+                    "data": {"contact": "a@vendor.com", "block_forward": True},
+                },
+                {
+                    "type": "contact",
+                    "alias_id": 2,
+                    "alias": "test@example.com",
+                    "data": {"contact": "b@vendor.com", "block_forward": False},
+                },
+            ]
+        )
+        writer.finish()
+
+        refreshed = dict(
+            self.mock_alias_options,
+            suffixes=[{"suffix": "@example.com", "signed_suffix": "fresh"}],
+        )
+        mock_get_options.side_effect = [self.mock_alias_options, refreshed]
+
+        client = mock_get_client.return_value
+        client.get.side_effect = self.mock_account_get(
+            {0: self.mock_alias_list_response["aliases"]}
+        )
+
+        def post(path, json=None):
+            response = MagicMock()
+            response.status_code = 201
+            if path == "/api/v3/alias/custom/new":
+                if json["signed_suffix"] != "fresh":
+                    response.status_code = 412
+                response.json.return_value = {"id": 124}
+            elif path.endswith("/contacts"):
+                existed = json["contact"] == "b@vendor.com"
+                response.json.return_value = {
+                    "id": 9,
+                    "existed": existed,
+                    "block_forward": False,
+                }
+            else:
+                response.json.return_value = {"enabled": False, "block_forward": True}
+            return response
+
+        client.post.side_effect = post
+
+        cli.import_archive(self.test_config, path, workers=2)
+
+        client.post.assert_any_call(
+            "/api/v3/alias/custom/new",
+            json={
+                "alias_prefix": "shop",
+                "signed_suffix": "fresh",
+                "mailbox_ids": [789],
+                "note": "Shopping",
+            },
+        )
+        client.post.assert_any_call("/api/aliases/124/toggle")
+        client.post.assert_any_call("/api/contacts/9/toggle")
+        client.post.assert_any_call(
+            "/api/aliases/123/contacts", json={"contact": "b@vendor.com"}
+        )
+        self.assertIn(
+            "Imported 1 aliases (1 already existed) and 1 contacts (1 already existed)",
+            mock_stdout.getvalue(),
+        )
+        self.assertIn("Skipping old.x1@aleeas.com", mock_stderr.getvalue())
+
+        # The journal lets a second run retry only the skipped alias
+        client.post.reset_mock()
+        mock_get_options.side_effect = None
+        mock_get_options.return_value = self.mock_alias_options
+
+        cli.import_archive(self.test_config, path, workers=2)
+
+        self.assertIn("2 aliases already restored", mock_stdout.getvalue())
+        client.post.assert_not_called()
+
+    @patch("simplelogin.cli.get_config_dir")
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_apply_state(self, mock_stdout, mock_get_client, mock_get_config_dir):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
+        state_path = Path(self.temp_dir.name) / "state.yaml"
+        state_path.write_text(
+            "aliases:\n"
+            "  test@example.com:\n"
+            "    enabled: false\n"
+            "    note: Test note\n"
+            "domains:\n"
+            "  testdomain.com:\n"
+            "    catch_all: true\n"
+            "    mailboxes: [user@example.com]\n"
+        )
+
+        client = mock_get_client.return_value
+        client.get.side_effect = self.mock_account_get(
+            {0: self.mock_alias_list_response["aliases"]}
+        )
+        client.post.return_value.json.return_value = {"enabled": False}
+
+        cli.show_plan(self.test_config, state_path)
+
+        self.assertIn("~ alias test@example.com", mock_stdout.getvalue())
+        self.assertIn("catch_all: false -> true", mock_stdout.getvalue())
+        self.assertIn(
+            "Plan: 0 to create, 2 to change, 2 API calls", mock_stdout.getvalue()
+        )
+        client.patch.assert_not_called()
+        client.post.assert_not_called()
+
+        cli.apply_state(self.test_config, state_path, yes=True)
+
+        client.patch.assert_called_once_with(
+            "/api/custom_domains/456", json={"catch_all": True}
+        )
+        client.post.assert_called_once_with("/api/aliases/123/toggle")
+        self.assertIn("Applied 2 of 2 changes", mock_stdout.getvalue())
+
+    @patch("simplelogin.cli.get_config_dir")
+    @patch("simplelogin.cli.get_client")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_sync_account(self, mock_stdout, mock_get_client, mock_get_config_dir):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
+        alias = dict(
+            self.mock_alias_list_response["aliases"][0],
+            mailboxes=[{"id": 789, "email": "user@example.com"}],
+        )
+        pages = {
+            0: [dict(alias, id=i, email=f"a{i}@example.com") for i in range(20)],
+            1: [dict(alias, id=20, email="a20@example.com")],
+        }
+        mock_client = mock_get_client.return_value
+        mock_client.get.side_effect = self.mock_account_get(pages)
+
+        cli.sync_account(self.test_config, workers=1)
+        self.assertIn("Synced 21 aliases", mock_stdout.getvalue())
+
+        # Nothing changed: the second sync stops at the first page
+        mock_client.get.reset_mock()
+        cli.sync_account(self.test_config, workers=1)
+
+        alias_calls = [
+            call
+            for call in mock_client.get.call_args_list
+            if call.args[0] == "/api/v2/aliases"
+        ]
+        self.assertEqual(len(alias_calls), 1)
+
+        mock_client.get.reset_mock()
+        cli.list_aliases(self.test_config, all_pages=True, cached=True)
+        cli.alias_info(self.test_config, "a20@example.com", cached=True)
+        cli.list_mailboxes(self.test_config, cached=True)
+        cli.list_domains(self.test_config, cached=True)
+
+        mock_client.get.assert_not_called()
+        output = mock_stdout.getvalue()
+        self.assertIn("a19@example.com", output)
+        self.assertIn("Alias: a20@example.com", output)
+        self.assertIn("user@example.com", output)
+        self.assertIn("testdomain.com", output)
+
+    @patch("simplelogin.cli.get_config_dir")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_cached_without_sync(self, mock_stdout, mock_get_config_dir):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
+
+        cli.list_aliases(self.test_config, cached=True)
+
+        self.assertIn("Run 'simplelogin sync' first", mock_stdout.getvalue())
+
+    @patch("simplelogin.cli.get_config_dir")
+    @patch("simplelogin.cli.SimpleLoginClient")
+    def test_get_client_is_shared(self, mock_client_class, mock_get_config_dir):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
+        mock_client_class.return_value.session.headers = {
+            "Authentication": "test_api_key_12345"
+        }
+        mock_client_class.return_value.base_url = cli.BASE_URL
+
+        with patch("simplelogin.cli._client", None):
+            first = cli.get_client(self.test_config)
+            second = cli.get_client(self.test_config)
+
+            self.assertIs(first, second)
+            mock_client_class.assert_called_once_with(
+                "test_api_key_12345", base_url=cli.BASE_URL, tracer=None
+            )
+
+            # Concurrent commands get a connection per worker
+            cli.get_client(self.test_config, 64)
+            first.ensure_pool_size.assert_called_once_with(64)
+
+            # A daemon serves callers pointing at different API roots
+            with patch.dict("os.environ", {"SIMPLELOGIN_API_URL": "http://sl.test"}):
+                cli.get_client(self.test_config)
+            self.assertEqual(mock_client_class.call_count, 2)
+
+    @patch("simplelogin.cli.get_config_dir")
+    @patch.dict("os.environ", {"SIMPLELOGIN_RATE_LIMIT": ""})
+    def test_get_client_rate_limit(self, mock_get_config_dir):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
+        config = dict(self.test_config, rate_limit="120/min")
+
+        with patch("simplelogin.cli._client", None):
+            client = cli.get_client(config)
+
+        self.assertEqual(client.rate_limiter.rate, 2)
+        self.assertEqual(client.rate_limiter.path.parent, Path(self.temp_dir.name))
+
+        with patch("simplelogin.cli._client", None):
+            with patch.dict("os.environ", {"SIMPLELOGIN_RATE_LIMIT": "oops"}):
+                with patch("sys.stderr", new_callable=io.StringIO):
+                    client = cli.get_client(config)
+
+        self.assertIsNone(client.rate_limiter)
+
     @patch("simplelogin.cli.save_config")
     @patch("sys.stdout", new_callable=io.StringIO)
     def test_set_api_key(self, mock_stdout, mock_save_config):
@@ -506,6 +1314,19 @@ class SimpleLoginCLITests(unittest.TestCase):
         args, kwargs = mock_list_aliases.call_args
         self.assertEqual(kwargs["page"], 1)
         self.assertTrue(kwargs["pinned"])
+        self.assertFalse(kwargs["all_pages"])
+
+    @patch("simplelogin.cli.load_config")
+    @patch("simplelogin.cli.list_aliases")
+    def test_main_list_all_aliases(self, mock_list_aliases, mock_load_config):
+        mock_load_config.return_value = self.test_config
+        test_argv = ["simplelogin-cli", "aliases", "list", "--all", "--workers=8"]
+        with patch("sys.argv", test_argv):
+            cli.main()
+
+        args, kwargs = mock_list_aliases.call_args
+        self.assertTrue(kwargs["all_pages"])
+        self.assertEqual(kwargs["workers"], 8)
 
     @patch("simplelogin.cli.load_config")
     @patch("simplelogin.cli.create_custom_alias")
@@ -542,6 +1363,112 @@ class SimpleLoginCLITests(unittest.TestCase):
 
         mock_toggle.assert_called_once_with(unittest.mock.ANY, "123")
 
+    @patch("simplelogin.cli.load_config")
+    @patch("simplelogin.cli.search_aliases")
+    def test_main_search_aliases(self, mock_search, mock_load_config):
+        mock_load_config.return_value = self.test_config
+        test_argv = ["simplelogin-cli", "aliases", "search", "vendr", "--fuzzy"]
+        with patch("sys.argv", test_argv):
+            cli.main()
+
+        mock_search.assert_called_once_with(
+            unittest.mock.ANY, "vendr", mode="fuzzy", limit=None
+        )
+
+    @patch("simplelogin.cli.load_config")
+    @patch("simplelogin.cli.enable_aliases")
+    def test_main_disable_aliases(self, mock_enable_aliases, mock_load_config):
+        mock_load_config.return_value = self.test_config
+        test_argv = ["simplelogin-cli", "aliases", "disable", "--from-file=-"]
+        with patch("sys.argv", test_argv):
+            cli.main()
+
+        mock_enable_aliases.assert_called_once_with(
+            unittest.mock.ANY, "-", False, workers=4, rate=None, cached=False
+        )
+
+    def test_parse_args_matches_docopt(self):
+        from docopt import DocoptExit, docopt
+
+        # One command line per usage pattern, then a few that must fail
+        argvs = [
+            ["aliases", "list", "--all", "--pinned", "--query=shop"],
+            ["aliases", "list", "--page", "2", "--format=json"],
+            ["aliases", "create", "custom", "shop", "7", "--mailboxes=1,2"],
+            ["aliases", "create", "random", "--mode=word", "--count=3"],
+            ["aliases", "toggle", "12", "--workers=8"],
+            ["aliases", "delete", "--from-file=ids.txt", "--yes", "--rate=2"],
+            ["aliases", "disable", "--from-file=-", "--cached"],
+            ["aliases", "info", "12", "--cached"],
+            ["aliases", "search", "shop", "--fuzzy", "--limit=5"],
+            ["aliases", "stats", "--top=3", "--by=mailbox"],
+            ["aliases", "activity", "--peek"],
+            ["aliases", "watch", "--interval=10"],
+            ["contacts", "list", "12", "--all"],
+            ["contacts", "list", "--all-aliases", "--format=csv"],
+            ["contacts", "create", "12", "a@example.com"],
+            ["contacts", "delete", "3"],
+            ["contacts", "toggle", "3"],
+            ["domains", "list", "--cached"],
+            ["domains", "info", "example.com"],
+            ["domains", "update", "1", "--catch-all=true", "--name=Shop"],
+            ["domains", "trash", "1"],
+            ["mailboxes", "list"],
+            ["sync", "--full"],
+            ["export", "backup.jsonl.gz"],
+            ["import", "backup.jsonl.gz", "--rate=1"],
+            ["plan", "state.yaml"],
+            ["apply", "state.yaml", "--yes"],
+            ["config", "set-key", "key"],
+            ["config", "view"],
+            ["daemon", "status"],
+            ["daemon"],
+            ["aliases", "list", "--page=1", "--all"],
+            ["aliases", "delete", "12", "--yes"],
+            ["aliases", "frobnicate"],
+            ["aliases", "list", "--nope"],
+            [],
+        ]
+
+        # Twice, as the daemon matches many command lines against one usage
+        for argv in argvs + argvs:
+            with self.subTest(argv=argv):
+                try:
+                    expected = docopt(cli.__doc__, argv)
+                except DocoptExit as e:
+                    with self.assertRaises(DocoptExit) as raised:
+                        cli.parse_args(argv)
+                    self.assertEqual(str(raised.exception), str(e))
+                else:
+                    self.assertEqual(cli.parse_args(argv), expected)
+
+
+class StartupTests(unittest.TestCase):
+    # Generous enough for a cold CI machine, but well under the ~300ms it took
+    # when every dependency was imported eagerly
+    IMPORT_BUDGET = 0.2
+
+    def test_import_time_budget(self):
+        code = (
+            "import sys, time\n"
+            "start = time.perf_counter()\n"
+            "import simplelogin.cli\n"
+            "print(time.perf_counter() - start)\n"
+            "heavy = ['requests', 'yaml', 'tabulate', 'questionary', 'asyncio']\n"
+            "print(','.join(m for m in heavy if m in sys.modules))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=Path(__file__).resolve().parent.parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        elapsed, heavy = result.stdout.split("\n")[:2]
+
+        self.assertEqual(heavy, "", "heavy modules imported at startup")
+        self.assertLess(float(elapsed), self.IMPORT_BUDGET)
+
 
 if __name__ == "__main__":
     unittest.main()
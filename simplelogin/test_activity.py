@@ -0,0 +1,70 @@
+import unittest
+
+from simplelogin.activity import advance_mark, collect_new, merge_feeds
+
+
+def make_activity(timestamp, sender="a@vendor.com", action="forward"):
+    return {
+        "action": action,
+        "from": sender,
+        "to": "me@example.com",
+        "timestamp": timestamp,
+    }
+
+
+def pager(activities, page_size=2):
+    """fetch_page over a newest-first list, recording the pages requested"""
+    requested = []
+
+    def fetch_page(page):
+        requested.append(page)
+        return activities[page * page_size : (page + 1) * page_size]
+
+    return fetch_page, requested
+
+
+class ActivityFeedTests(unittest.TestCase):
+    def test_first_run_reads_everything(self):
+        activities = [make_activity(t) for t in (50, 40, 30)]
+        fetch_page, requested = pager(activities)
+
+        self.assertEqual(collect_new(fetch_page, None, 2), activities)
+        self.assertEqual(requested, [0, 1])
+
+    def test_stops_at_high_water_mark(self):
+        old = [make_activity(t) for t in (40, 30, 20, 10, 5)]
+        mark = advance_mark(None, old)
+        self.assertEqual(mark["timestamp"], 40)
+
+        new = [make_activity(60), make_activity(40, sender="b@vendor.com")]
+        fetch_page, requested = pager(new + old)
+
+        # A new activity at the mark's own timestamp is still picked up
+        self.assertEqual(collect_new(fetch_page, mark, 2), new)
+        self.assertEqual(requested, [0, 1])
+
+    def test_advance_mark_keeps_activities_at_same_time(self):
+        mark = advance_mark(None, [make_activity(40)])
+        mark = advance_mark(mark, [make_activity(40, sender="b@vendor.com")])
+
+        self.assertEqual(len(mark["seen"]), 2)
+        self.assertIs(advance_mark(mark, []), mark)
+
+        fetch_page, _ = pager(
+            [make_activity(40, sender="b@vendor.com"), make_activity(40)]
+        )
+        self.assertEqual(collect_new(fetch_page, mark, 2), [])
+
+    def test_merge_feeds(self):
+        feeds = [
+            [dict(make_activity(t), alias_id=1) for t in (50, 20)],
+            [dict(make_activity(t), alias_id=2) for t in (40, 20, 10)],
+            [],
+        ]
+
+        merged = [(a["timestamp"], a["alias_id"]) for a in merge_feeds(feeds)]
+        self.assertEqual(merged, [(10, 2), (20, 1), (20, 2), (40, 2), (50, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import gzip
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from simplelogin.archive import (
+    ArchiveWriter,
+    ImportJournal,
+    checkpoint_path,
+    exported_ids_path,
+    read_aliases,
+    read_archive,
+)
+
+
+class ArchiveTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "account.jsonl.gz"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_batches_are_gzip_members(self):
+        writer = ArchiveWriter(self.path, {})
+        writer.write_batch([{"type": "alias", "data": {"id": 1}}], next_page=1)
+        writer.write_batch([{"type": "alias", "data": {"id": 2}}], next_page=2)
+
+        state = ArchiveWriter.resume(self.path)
+        self.assertEqual(state["next_page"], 2)
+        self.assertEqual(state["offset"], self.path.stat().st_size)
+
+        writer.finish()
+        self.assertFalse(checkpoint_path(self.path).exists())
+        self.assertIsNone(ArchiveWriter.resume(self.path))
+
+        with gzip.open(self.path, "rt") as f:
+            self.assertEqual([json.loads(line)["data"]["id"] for line in f], [1, 2])
+
+    def test_resume_drops_partial_batch(self):
+        writer = ArchiveWriter(self.path, {})
+        writer.write_batch([{"id": 1}], next_page=1)
+        # Interrupted halfway through writing the next batch
+        writer.file.write(b"\x1f\x8b partial")
+        writer.close()
+
+        state = ArchiveWriter.resume(self.path)
+        writer = ArchiveWriter(self.path, state)
+        writer.write_batch([{"id": 2}], next_page=2)
+        writer.finish()
+
+        self.assertEqual(list(read_archive(self.path)), [{"id": 1}, {"id": 2}])
+
+    def test_read_aliases(self):
+        def alias(alias_id):
+            return {"type": "alias", "data": {"id": alias_id}}
+
+        def contact(alias_id, name):
+            return {"type": "contact", "alias_id": alias_id, "data": name}
+
+        records = [
+            {"type": "header"},
+            alias(1),
+            alias(2),
+            contact(2, "a"),
+            contact(2, "b"),
+            alias(3),
+            contact(3, "c"),
+        ]
+
+        self.assertEqual(
+            list(read_aliases(records)),
+            [({"id": 1}, []), ({"id": 2}, ["a", "b"]), ({"id": 3}, ["c"])],
+        )
+
+    def test_checkpoint_size_stays_constant(self):
+        writer = ArchiveWriter(self.path, {})
+        sizes = []
+        for batch in range(10):
+            ids = range(batch * 100, (batch + 1) * 100)
+            writer.write_batch(
+                [{"type": "alias", "data": {"id": i}} for i in ids],
+                alias_ids=ids,
+                aliases=(batch + 1) * 100,
+            )
+            sizes.append(checkpoint_path(self.path).stat().st_size)
+
+        # Only counters and the archive offset, whose digits barely change
+        self.assertLess(max(sizes) - min(sizes), 8)
+        self.assertTrue(writer.is_exported(999))
+        self.assertFalse(writer.is_exported(1000))
+
+        writer.finish()
+        self.assertFalse(exported_ids_path(self.path).exists())
+
+    def test_resume_forgets_ids_of_dropped_batch(self):
+        writer = ArchiveWriter(self.path, {})
+        writer.write_batch([{"id": 1}], alias_ids=[1])
+        state = dict(ArchiveWriter.resume(self.path))
+        # Killed after the second batch was written, before its checkpoint
+        writer.write_batch([{"id": 2}], alias_ids=[2])
+        writer.close()
+
+        writer = ArchiveWriter(self.path, state)
+        self.assertTrue(writer.is_exported(1))
+        self.assertFalse(writer.is_exported(2))
+        writer.close()
+
+        # A new export starts from scratch
+        writer = ArchiveWriter(self.path, {})
+        self.assertFalse(writer.is_exported(1))
+        writer.close()
+
+    def test_import_journal(self):
+        path = Path(self.temp_dir.name) / "imports" / "account.journal"
+        journal = ImportJournal(path)
+        journal.record("a@example.com", id=1)
+        journal.file.write('{"email": "cut')
+        journal.close()
+
+        journal = ImportJournal(path)
+        journal.record("b@example.com", id=2)
+        journal.close()
+
+        self.assertEqual(ImportJournal(path).done, {"a@example.com", "b@example.com"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from simplelogin.cache import DiskCache
+
+
+class DiskCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temp_dir.name) / "cache"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_get_set_delete(self):
+        cache = DiskCache(self.directory)
+
+        self.assertIsNone(cache.get("key"))
+        cache.set("key", {"a": [1, 2]}, ttl=60)
+        self.assertEqual(cache.get("key"), {"a": [1, 2]})
+
+        cache.delete("key")
+        self.assertIsNone(cache.get("key"))
+        cache.delete("key")
+
+    def test_expiry(self):
+        cache = DiskCache(self.directory)
+
+        with patch("simplelogin.cache.time.time", return_value=1000.0):
+            cache.set("key", "value", ttl=60)
+        with patch("simplelogin.cache.time.time", return_value=1059.0):
+            self.assertEqual(cache.get("key"), "value")
+        with patch("simplelogin.cache.time.time", return_value=1061.0):
+            self.assertIsNone(cache.get("key"))
+
+    def test_expired_file_deleted_on_read(self):
+        cache = DiskCache(self.directory)
+
+        with patch("simplelogin.cache.time.time", return_value=1000.0):
+            cache.set("key", "value", ttl=60)
+        with patch("simplelogin.cache.time.time", return_value=1061.0):
+            self.assertIsNone(cache.get("key"))
+
+        self.assertEqual(list(self.directory.glob("*.json")), [])
+
+    @patch("simplelogin.cache.PRUNE_TO", 2)
+    @patch("simplelogin.cache.MAX_ENTRIES", 4)
+    def test_prune_on_write(self):
+        cache = DiskCache(self.directory)
+        cache.set("expired", "value", ttl=-1)
+        for i in range(4):
+            cache.set(f"key{i}", i, ttl=60)
+            os.utime(cache._path(f"key{i}"), (1000 + i, 1000 + i))
+
+        # The fifth file went over the limit: the expired file and the least
+        # recently written ones were dropped
+        self.assertEqual(len(list(self.directory.glob("*.json"))), 2)
+        self.assertEqual([cache.get(f"key{i}") for i in range(4)], [None, None, 2, 3])
+
+        cache.set("key4", 4, ttl=60)
+        self.assertEqual(len(list(self.directory.glob("*.json"))), 3)
+
+    def test_namespaces_are_isolated(self):
+        DiskCache(self.directory, "account-a").set("key", "a", ttl=60)
+
+        self.assertIsNone(DiskCache(self.directory, "account-b").get("key"))
+        self.assertEqual(DiskCache(self.directory, "account-a").get("key"), "a")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,287 @@
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from pathlib import Path
+
+from simplelogin import client
+from simplelogin.cache import DiskCache
+from simplelogin.client import SimpleLoginClient
+from simplelogin.httpcache import ResponseCache
+
+
+class SimpleLoginClientTests(unittest.TestCase):
+    def setUp(self):
+        self.client = SimpleLoginClient("test_api_key", base_url="https://sl.test/")
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_default_headers(self):
+        headers = self.client.session.headers
+        self.assertEqual(headers["Authentication"], "test_api_key")
+        self.assertEqual(headers["Content-Type"], "application/json")
+        self.assertEqual(headers["Connection"], "keep-alive")
+
+    def test_connection_pool(self):
+        adapter = self.client.session.get_adapter("https://sl.test/api/v2/aliases")
+        self.assertEqual(adapter._pool_maxsize, client.DEFAULT_POOL_SIZE)
+
+    def test_ensure_pool_size(self):
+        self.client.ensure_pool_size(64)
+        adapter = self.client.session.get_adapter("https://sl.test/api/v2/aliases")
+        self.assertEqual(adapter._pool_maxsize, 64)
+
+        # The pool never shrinks
+        self.client.ensure_pool_size(4)
+        self.assertIs(
+            self.client.session.get_adapter("https://sl.test/api/v2/aliases"), adapter
+        )
+
+    def test_request_uses_session(self):
+        self.client.session.request = MagicMock()
+
+        self.client.get("/api/v2/aliases", params={"page_id": 0})
+        self.client.post("/api/aliases/1/toggle", timeout=3)
+
+        self.client.session.request.assert_any_call(
+            "GET",
+            "https://sl.test/api/v2/aliases",
+            params={"page_id": 0},
+            timeout=client.DEFAULT_TIMEOUT,
+        )
+        self.client.session.request.assert_any_call(
+            "POST", "https://sl.test/api/aliases/1/toggle", timeout=3
+        )
+
+
+def make_response(status_code, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+@patch("simplelogin.client.time.sleep")
+class RetryTests(unittest.TestCase):
+    def setUp(self):
+        self.client = SimpleLoginClient("test_api_key", retries=3)
+        self.client.session.request = MagicMock()
+        self.client.congestion = MagicMock()
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_idempotent_request_retried(self, mock_sleep):
+        self.client.session.request.side_effect = [
+            make_response(503),
+            make_response(502),
+            make_response(200),
+        ]
+
+        response = self.client.get("/api/v2/aliases")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_sleep.call_count, 2)
+        # Backoff with full jitter stays under the exponential bound
+        self.assertLessEqual(mock_sleep.call_args_list[1].args[0], 1.0)
+        self.assertEqual(self.client.congestion.on_throttle.call_count, 1)
+        self.assertEqual(self.client.congestion.on_success.call_count, 2)
+
+    def test_gives_up_after_retries(self, mock_sleep):
+        self.client.session.request.return_value = make_response(500)
+
+        response = self.client.get("/api/v2/aliases")
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(self.client.session.request.call_count, 4)
+
+    def test_post_not_replayed_after_server_error(self, mock_sleep):
+        self.client.session.request.return_value = make_response(502)
+
+        response = self.client.post("/api/aliases/1/toggle")
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(self.client.session.request.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    def test_post_replayed_after_429_with_retry_after(self, mock_sleep):
+        self.client.session.request.side_effect = [
+            make_response(429, {"Retry-After": "3"}),
+            make_response(201),
+        ]
+
+        response = self.client.post("/api/alias/random/new")
+
+        self.assertEqual(response.status_code, 201)
+        delay = mock_sleep.call_args.args[0]
+        self.assertGreaterEqual(delay, 3)
+        self.assertLess(delay, 3 + client.BACKOFF_BASE)
+
+    def test_retry_after_date_and_limit(self, mock_sleep):
+        later = datetime.now(timezone.utc) + timedelta(seconds=30)
+        response = make_response(429, {"Retry-After": format_datetime(later)})
+        self.assertAlmostEqual(client.retry_after(response), 30, delta=2)
+
+        self.client.session.request.return_value = make_response(
+            429, {"Retry-After": "3600"}
+        )
+        response = self.client.get("/api/v2/aliases")
+
+        self.assertEqual(response.status_code, 429)
+        mock_sleep.assert_not_called()
+
+    def test_connection_errors(self, mock_sleep):
+        self.client.session.request.side_effect = [
+            requests.exceptions.ConnectionError("reset"),
+            make_response(200),
+        ]
+        self.assertEqual(self.client.delete("/api/aliases/1").status_code, 200)
+
+        self.client.session.request.side_effect = requests.exceptions.ReadTimeout()
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            self.client.post("/api/aliases/1/toggle")
+        self.assertEqual(self.client.session.request.call_count, 3)
+
+
+def make_json_response(body, headers=None):
+    response = make_response(200, headers)
+    response.text = body
+    return response
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.client = SimpleLoginClient("test_api_key", base_url="https://sl.test")
+        self.client.session.request = MagicMock()
+        self.client.response_cache = ResponseCache(
+            DiskCache(Path(self.temp_dir.name), "account"), self.client.base_url
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.temp_dir.cleanup()
+
+    def test_fresh_response_served_from_cache(self):
+        self.client.session.request.return_value = make_json_response(
+            '{"mailboxes": []}'
+        )
+
+        self.client.get("/api/v2/mailboxes")
+        second = self.client.get("/api/v2/mailboxes")
+
+        self.assertEqual(second.json(), {"mailboxes": []})
+        self.assertTrue(second.from_cache)
+        self.assertEqual(self.client.session.request.call_count, 1)
+
+        # Not a cached endpoint, and an explicit refresh
+        self.client.get("/api/v2/aliases", params={"page_id": 0})
+        self.client.get("/api/v2/mailboxes", refresh=True)
+        self.assertEqual(self.client.session.request.call_count, 3)
+
+    def test_api_roots_are_isolated(self):
+        other = SimpleLoginClient("test_api_key", base_url="http://localhost:8000")
+        self.addCleanup(other.close)
+        other.session.request = MagicMock(
+            return_value=make_json_response('{"mailboxes": [2]}')
+        )
+        other.response_cache = ResponseCache(
+            self.client.response_cache.cache, other.base_url
+        )
+        self.client.session.request.return_value = make_json_response(
+            '{"mailboxes": [1]}'
+        )
+
+        self.client.get("/api/v2/mailboxes")
+        other.get("/api/v2/mailboxes")
+
+        # Each root is served its own cached response
+        self.assertEqual(
+            self.client.get("/api/v2/mailboxes").json(), {"mailboxes": [1]}
+        )
+        self.assertEqual(other.get("/api/v2/mailboxes").json(), {"mailboxes": [2]})
+        self.assertEqual(self.client.session.request.call_count, 1)
+        self.assertEqual(other.session.request.call_count, 1)
+
+    def test_mutation_invalidates(self):
+        self.client.session.request.return_value = make_json_response('{"id": 1}')
+
+        self.client.get("/api/aliases/1")
+        self.client.get("/api/aliases/2")
+        self.client.post("/api/aliases/1/toggle")
+        self.client.get("/api/aliases/1")
+        self.client.get("/api/aliases/2")
+
+        urls = [call.args[1] for call in self.client.session.request.call_args_list]
+        self.assertEqual(urls.count("https://sl.test/api/aliases/1"), 2)
+        self.assertEqual(urls.count("https://sl.test/api/aliases/2"), 1)
+
+    def test_alias_changes_invalidate_counts(self):
+        self.client.session.request.return_value = make_json_response("{}")
+
+        def fetches_after(method, path):
+            self.client.get("/api/v2/mailboxes")
+            self.client.get("/api/custom_domains")
+            self.client.session.request.reset_mock()
+
+            self.client.request(method, path)
+            self.client.get("/api/v2/mailboxes")
+            self.client.get("/api/custom_domains")
+            return self.client.session.request.call_count - 1
+
+        # Creating and deleting aliases change the counts, toggling does not
+        self.assertEqual(fetches_after("POST", "/api/alias/random/new"), 2)
+        self.assertEqual(fetches_after("POST", "/api/v3/alias/custom/new"), 2)
+        self.assertEqual(fetches_after("DELETE", "/api/aliases/1"), 2)
+        self.assertEqual(fetches_after("POST", "/api/aliases/1/toggle"), 0)
+
+    def test_replace_item_keeps_list_cached(self):
+        self.client.session.request.return_value = make_json_response(
+            '{"custom_domains": [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]}',
+            {"ETag": '"v1"'},
+        )
+        self.client.get("/api/custom_domains")
+
+        cache = self.client.response_cache
+        entry = cache.lookup("/api/custom_domains")
+        self.client.patch("/api/custom_domains/2", json={"name": "c"})
+        cache.replace_item(
+            "/api/custom_domains", entry, "custom_domains", {"id": 2, "name": "c"}
+        )
+
+        response = self.client.get("/api/custom_domains")
+        self.assertTrue(response.from_cache)
+        self.assertEqual(
+            response.json()["custom_domains"],
+            [{"id": 1, "name": "a"}, {"id": 2, "name": "c"}],
+        )
+        self.assertNotIn("ETag", response.headers)
+        self.assertEqual(self.client.session.request.call_count, 2)
+
+    def test_stale_response_revalidated(self):
+        self.client.session.request.return_value = make_json_response(
+            '{"custom_domains": []}', {"ETag": '"v1"'}
+        )
+        self.client.get("/api/custom_domains")
+
+        self.client.session.request.return_value = make_response(304)
+        with patch("simplelogin.httpcache.time.time", return_value=time.time() + 600):
+            response = self.client.get("/api/custom_domains")
+
+        self.assertEqual(response.json(), {"custom_domains": []})
+        self.client.session.request.assert_called_with(
+            "GET",
+            "https://sl.test/api/custom_domains",
+            headers={"If-None-Match": '"v1"'},
+            timeout=client.DEFAULT_TIMEOUT,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from simplelogin import cli, daemon
+from simplelogin.daemon import Daemon, code_version, control, forward, needs_terminal
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix domain sockets")
+class DaemonTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        # Removed after the daemons started by the test are stopped
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, "daemon.sock")
+
+    def start(self, run):
+        server = Daemon(self.path, run)
+        server.bind()
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(control, "stop", self.path)
+        return server
+
+    def request(self, message):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.path)
+        with sock, sock.makefile("rwb") as stream:
+            stream.write(json.dumps(message).encode() + b"\n")
+            stream.flush()
+            return [json.loads(line) for line in stream]
+
+    def test_needs_terminal(self):
+        for argv in (
+            [],
+            ["--help"],
+            ["config", "view"],
+            ["daemon", "stop"],
+            ["aliases", "watch"],
+            ["aliases", "toggle", "--from-file=-"],
+            ["aliases", "toggle", "--from-file", "-"],
+            ["aliases", "delete", "12"],
+            ["aliases", "delete", "--from-file=ids.txt"],
+            ["apply", "state.yaml"],
+            ["aliases", "create", "custom", "shop", "0"],
+            ["aliases", "list", "--timings"],
+        ):
+            self.assertTrue(needs_terminal(argv), argv)
+
+        for argv in (
+            ["aliases", "list", "--all"],
+            ["aliases", "delete", "--from-file=ids.txt", "--yes"],
+            ["apply", "state.yaml", "--yes"],
+            ["aliases", "create", "custom", "shop", "0", "--mailboxes=1"],
+        ):
+            self.assertFalse(needs_terminal(argv), argv)
+
+    def test_runs_command_in_callers_context(self):
+        seen = {}
+
+        def run(argv):
+            seen["cwd"] = os.getcwd()
+            seen["env"] = os.environ.get("SIMPLELOGIN_API_URL")
+            print("listing", *argv)
+            print("warning", file=sys.stderr)
+            sys.exit(3)
+
+        server = self.start(run)
+        cwd = os.getcwd()
+
+        replies = self.request(
+            {
+                "argv": ["aliases", "list"],
+                "cwd": self.temp_dir.name,
+                "env": {"SIMPLELOGIN_API_URL": "http://sl.test"},
+                "code": code_version(),
+            }
+        )
+
+        self.assertEqual(
+            replies,
+            [
+                {"stdout": "listing aliases list\n"},
+                {"stderr": "warning\n"},
+                {"exit": 3},
+            ],
+        )
+        self.assertEqual(seen["cwd"], os.path.realpath(self.temp_dir.name))
+        self.assertEqual(seen["env"], "http://sl.test")
+        self.assertEqual(os.getcwd(), cwd)
+        self.assertNotIn("http://sl.test", os.environ.values())
+        self.assertEqual(server.commands, 1)
+
+    @patch("simplelogin.cli._client", None)
+    @patch("simplelogin.cli.get_config_dir")
+    def test_commands_get_their_own_rate_limit(self, mock_get_config_dir):
+        mock_get_config_dir.return_value = Path(self.temp_dir.name)
+        clients = []
+
+        def run(argv):
+            client = cli.get_client({"api_key": "key"})
+            clients.append(client)
+            limiter = client.rate_limiter
+            print(limiter.rate if limiter else None)
+
+        self.start(run)
+
+        def rate(limit):
+            env = {"SIMPLELOGIN_RATE_LIMIT": limit} if limit else {}
+            replies = self.request(
+                {
+                    "argv": ["aliases", "list"],
+                    "cwd": "/",
+                    "env": env,
+                    "code": code_version(),
+                }
+            )
+            return replies[0]["stdout"].strip()
+
+        self.assertEqual(rate("0.5"), "0.5")
+        self.assertEqual(rate("120/min"), "2.0")
+        self.assertEqual(rate(None), "None")
+        # One client, keeping its connections, with the limit of each command
+        self.assertIs(clients[0], clients[2])
+
+    @patch("simplelogin.daemon.REQUEST_TIMEOUT", 0.2)
+    def test_silent_client_times_out(self):
+        self.start(lambda argv: print("done"))
+
+        silent = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(silent.close)
+        silent.connect(self.path)
+
+        replies = self.request({"argv": ["sync"], "cwd": "/", "code": code_version()})
+        self.assertEqual(replies, [{"stdout": "done\n"}, {"exit": 0}])
+        # Dropped by the daemon rather than kept waiting
+        self.assertEqual(silent.recv(1), b"")
+
+    def test_refuses_other_version(self):
+        self.start(lambda argv: self.fail("should not run"))
+
+        replies = self.request({"argv": ["sync"], "cwd": "/", "code": 0})
+        self.assertIn("refused", replies[0])
+
+    def test_second_daemon_refused_and_socket_removed(self):
+        self.start(lambda argv: None)
+
+        with self.assertRaises(RuntimeError):
+            Daemon(self.path, lambda argv: None).bind()
+
+        self.assertEqual(control("status", self.path)["commands"], 0)
+        self.assertEqual(control("stop", self.path), {"stopped": True})
+        for _ in range(50):
+            if not os.path.exists(self.path):
+                break
+            threading.Event().wait(0.1)
+        self.assertFalse(os.path.exists(self.path))
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix domain sockets")
+class ForwardTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        # Removed after the test servers are done
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, "daemon.sock")
+
+    def serve_once(self, replies):
+        """Answer one request with canned replies, returning the request"""
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        server.listen(1)
+        received = {}
+
+        def answer():
+            conn, _ = server.accept()
+            with conn, conn.makefile("rwb") as stream:
+                received.update(json.loads(stream.readline()))
+                for reply in replies:
+                    stream.write(json.dumps(reply).encode() + b"\n")
+            server.close()
+
+        thread = threading.Thread(target=answer)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        return received
+
+    @patch.dict("os.environ", {"SIMPLELOGIN_API_KEY": "key"})
+    @patch("sys.stderr", new_callable=io.StringIO)
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_forward_relays_output(self, mock_stdout, mock_stderr):
+        received = self.serve_once(
+            [{"stdout": "out\n"}, {"stderr": "err\n"}, {"exit": 2}]
+        )
+
+        self.assertEqual(forward(["aliases", "list"], self.path), 2)
+        self.assertEqual(mock_stdout.getvalue(), "out\n")
+        self.assertEqual(mock_stderr.getvalue(), "err\n")
+        self.assertEqual(received["argv"], ["aliases", "list"])
+        self.assertEqual(received["env"]["SIMPLELOGIN_API_KEY"], "key")
+
+    @patch("sys.stderr", new_callable=io.StringIO)
+    def test_forward_falls_back(self, mock_stderr):
+        # No daemon
+        self.assertIsNone(forward(["aliases", "list"], self.path))
+
+        self.serve_once([{"refused": "it runs another version of the CLI"}])
+        self.assertIsNone(forward(["aliases", "list"], self.path))
+        self.assertIn("another version", mock_stderr.getvalue())
+
+    @patch.object(daemon, "forward", return_value=None)
+    @patch("simplelogin.cli.main")
+    def test_main_runs_locally_without_daemon(self, mock_main, mock_forward):
+        with patch("sys.argv", ["simplelogin", "sync"]):
+            daemon.main()
+
+        mock_forward.assert_called_once_with(["sync"])
+        mock_main.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
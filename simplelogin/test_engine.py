@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from simplelogin.engine import AdaptiveLimit, Engine, iterate
+
+
+class EngineTests(unittest.TestCase):
+    def test_hundreds_in_flight(self):
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def func(item):
+            with lock:
+                active.append(item)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(item)
+            return item
+
+        engine = Engine(200)
+        start = time.monotonic()
+        results = list(iterate(engine.map_unordered(func, range(400))))
+        elapsed = time.monotonic() - start
+        engine.close()
+
+        self.assertEqual(sorted(result for _, result, _ in results), list(range(400)))
+        self.assertLessEqual(max(peak), 200)
+        self.assertGreater(max(peak), 100)
+        # Serially this would take 20 seconds
+        self.assertLess(elapsed, 2)
+
+    def test_async_use(self):
+        async def all_pages():
+            engine = Engine(3)
+            pages = []
+            async for page in engine.pages(lambda p: [p] * (2 if p < 4 else 1), 2):
+                pages.append(page)
+            engine.close()
+            return pages
+
+        self.assertEqual(
+            asyncio.run(all_pages()), [[0, 0], [1, 1], [2, 2], [3, 3], [4]]
+        )
+
+    def test_closing_early_cancels_pending_calls(self):
+        calls = []
+
+        def func(item):
+            calls.append(item)
+            time.sleep(0.01)
+            return item
+
+        engine = Engine(2)
+        results = iterate(engine.map_unordered(func, range(1000)))
+        next(results)
+        results.close()
+        engine.close()
+
+        self.assertLess(len(calls), 10)
+
+
+class AdaptiveLimitTests(unittest.TestCase):
+    def test_aimd(self):
+        limit = AdaptiveLimit(16)
+
+        with patch("simplelogin.engine.time.monotonic", return_value=100.0):
+            limit.on_throttle()
+            # Rejections from the same burst only count once
+            limit.on_throttle()
+        self.assertEqual(limit.limit, 8)
+
+        with patch("simplelogin.engine.time.monotonic", return_value=102.0):
+            limit.on_throttle()
+        self.assertEqual(limit.limit, 4)
+
+        # About one more slot per round trip of successes
+        for _ in range(5):
+            limit.on_success()
+        self.assertEqual(limit.limit, 5)
+
+        for _ in range(1000):
+            limit.on_success()
+        self.assertEqual(limit.limit, 16)
+
+    def test_engine_follows_limit(self):
+        limit = AdaptiveLimit(8)
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def func(item):
+            with lock:
+                active.append(item)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.remove(item)
+
+        limit.value = 2
+        engine = Engine(8, adaptive=limit)
+        list(iterate(engine.map_unordered(func, range(20))))
+        engine.close()
+
+        self.assertLessEqual(max(peak), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import io
+import json
+import unittest
+
+from simplelogin.output import write_records
+
+HEADERS = ["id", "email", "enabled"]
+
+
+def row(record):
+    return [record["id"], record["email"], record.get("enabled")]
+
+
+class WriteRecordsTests(unittest.TestCase):
+    def setUp(self):
+        self.records = [
+            {"id": 1, "email": "a@example.com", "enabled": True},
+            {"id": 2, "email": "b,\t@example.com", "enabled": None},
+        ]
+
+    def write(self, output_format, records=None):
+        out = io.StringIO()
+        count = write_records(
+            self.records if records is None else records,
+            output_format,
+            HEADERS,
+            row,
+            out,
+        )
+        return out.getvalue(), count
+
+    def test_json(self):
+        output, count = self.write("json")
+
+        self.assertEqual(json.loads(output), self.records)
+        self.assertEqual(count, 2)
+        self.assertEqual(self.write("json", [])[0], "[]\n")
+
+    def test_json_closed_on_error(self):
+        out = io.StringIO()
+
+        def records():
+            yield self.records[0]
+            raise ConnectionError("API unreachable")
+
+        with self.assertRaises(ConnectionError):
+            write_records(records(), "json", HEADERS, row, out)
+
+        self.assertEqual(json.loads(out.getvalue()), self.records[:1])
+
+    def test_jsonl(self):
+        output, _ = self.write("jsonl")
+
+        lines = output.splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.records)
+
+    def test_csv_and_tsv(self):
+        output, _ = self.write("csv")
+        self.assertEqual(
+            output,
+            'id,email,enabled\n1,a@example.com,true\n2,"b,\t@example.com",\n',
+        )
+
+        output, _ = self.write("tsv")
+        self.assertEqual(
+            output,
+            'id\temail\tenabled\n1\ta@example.com\ttrue\n2\t"b,\t@example.com"\t\n',
+        )
+
+    def test_writes_each_record_before_reading_the_next(self):
+        out = io.StringIO()
+
+        def records():
+            yield self.records[0]
+            # The first record is already written while the next is fetched
+            self.assertIn("a@example.com", out.getvalue())
+            yield self.records[1]
+
+        write_records(records(), "jsonl", HEADERS, row, out)
+
+
+if __name__ == "__main__":
+    unittest.main()
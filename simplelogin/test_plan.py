@@ -0,0 +1,146 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from simplelogin.plan import count_calls, format_change, load_state, plan_changes
+
+MAILBOXES = [
+    {"id": 1, "email": "me@example.com"},
+    {"id": 2, "email": "work@example.com"},
+]
+
+ALIASES = [
+    {
+        "id": 10,
+        "email": "shop@example.com",
+        "enabled": True,
+        "pinned": False,
+        "note": None,
+        "name": "Shop",
+        "mailboxes": [{"id": 1, "email": "me@example.com"}],
+    }
+]
+
+DOMAINS = [
+    {
+        "id": 5,
+        "domain_name": "example.com",
+        "catch_all": False,
+        "random_prefix_generation": False,
+        "mailboxes": [{"id": 1, "email": "me@example.com"}],
+    }
+]
+
+
+class PlanTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "state.yaml"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def load(self, text):
+        self.path.write_text(text)
+        return load_state(self.path)
+
+    def test_load_state_validates(self):
+        state = self.load("aliases:\n  Shop@Example.com:\n    enabled: false\n")
+        self.assertEqual(
+            state, {"aliases": {"shop@example.com": {"enabled": False}}, "domains": {}}
+        )
+
+        for text in (
+            "aliases: [a]",
+            "aliasses: {}",
+            "aliases:\n  a@b.c:\n    colour: red\n",
+            "aliases:\n  a@b.c:\n    enabled: 'no'\n",
+            "domains:\n  b.c:\n    mailboxes: []\n",
+            "aliases: {",
+        ):
+            with self.assertRaises(ValueError):
+                self.load(text)
+
+    def test_up_to_date(self):
+        state = self.load(
+            "aliases:\n"
+            "  shop@example.com:\n"
+            "    enabled: true\n"
+            "    name: Shop\n"
+            "    note: ''\n"
+            "    mailboxes: [ME@example.com]\n"
+            "    contacts: [a@vendor.com]\n"
+            "domains:\n"
+            "  example.com:\n"
+            "    catch_all: false\n"
+        )
+
+        changes = plan_changes(
+            state, ALIASES, DOMAINS, MAILBOXES, {10: ["A@vendor.com"]}
+        )
+        self.assertEqual(changes, [])
+
+    def test_minimal_changes(self):
+        state = self.load(
+            "aliases:\n"
+            "  shop@example.com:\n"
+            "    enabled: false\n"
+            "    name: Shop\n"
+            "    note: Orders\n"
+            "    contacts: [a@vendor.com, b@vendor.com]\n"
+            "  new@example.com:\n"
+            "    pinned: true\n"
+            "    mailboxes: [work@example.com]\n"
+            "domains:\n"
+            "  example.com:\n"
+            "    catch_all: true\n"
+            "    mailboxes: [me@example.com]\n"
+        )
+
+        domain, alias, new = plan_changes(
+            state,
+            ALIASES,
+            DOMAINS,
+            MAILBOXES,
+            {10: ["a@vendor.com"]},
+            suffixes=["@example.com", ".x1@simplelogin.com"],
+        )
+
+        self.assertEqual(domain["update"], {"catch_all": True})
+        self.assertEqual(count_calls(domain), 1)
+
+        self.assertEqual(alias["update"], {"note": "Orders"})
+        self.assertEqual(alias["enabled"], False)
+        self.assertEqual(alias["contacts"], ["b@vendor.com"])
+        self.assertEqual(count_calls(alias), 3)
+        self.assertEqual(
+            format_change(alias),
+            [
+                "~ alias shop@example.com",
+                '    note: null -> "Orders"',
+                "    enabled: true -> false",
+                "    + contact b@vendor.com",
+            ],
+        )
+
+        self.assertEqual(
+            new["create"],
+            {"alias_prefix": "new", "suffix": "@example.com", "mailbox_ids": [2]},
+        )
+        self.assertEqual(new["update"], {"pinned": True})
+        self.assertEqual(format_change(new)[0], "+ alias new@example.com")
+
+    def test_unknown_references(self):
+        for text in (
+            "aliases:\n  shop@example.com:\n    mailboxes: [other@example.com]\n",
+            "aliases:\n  new@elsewhere.com: {}\n",
+            "domains:\n  other.com:\n    catch_all: true\n",
+        ):
+            with self.assertRaises(ValueError):
+                plan_changes(
+                    self.load(text), ALIASES, DOMAINS, MAILBOXES, {}, ["@example.com"]
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
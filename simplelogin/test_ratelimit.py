@@ -0,0 +1,77 @@
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from simplelogin.ratelimit import SharedTokenBucket, parse_rate
+
+
+class ParseRateTests(unittest.TestCase):
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate(5), 5)
+        self.assertEqual(parse_rate("2.5"), 2.5)
+        self.assertEqual(parse_rate("120/min"), 2)
+        self.assertEqual(parse_rate("3600 / hour"), 1)
+
+        for value in ("fast", "10/week", "0", "-1/s"):
+            with self.assertRaises(ValueError):
+                parse_rate(value)
+
+
+class SharedTokenBucketTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "ratelimit"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_burst_then_rate(self):
+        bucket = SharedTokenBucket(self.path, rate=10, burst=3)
+
+        for _ in range(3):
+            self.assertEqual(bucket.try_acquire(), 0)
+        self.assertAlmostEqual(bucket.try_acquire(), 0.1, delta=0.02)
+
+    def test_shared_between_buckets(self):
+        first = SharedTokenBucket(self.path, rate=10, burst=2)
+        second = SharedTokenBucket(self.path, rate=10, burst=2)
+
+        self.assertEqual(first.try_acquire(), 0)
+        self.assertEqual(second.try_acquire(), 0)
+        self.assertGreater(first.try_acquire(), 0)
+
+    def test_shared_between_processes(self):
+        code = (
+            "import sys, time\n"
+            "from simplelogin.ratelimit import SharedTokenBucket\n"
+            "bucket = SharedTokenBucket(sys.argv[1], rate=20, burst=1)\n"
+            "for _ in range(3):\n"
+            "    bucket.acquire()\n"
+            "    print(time.time())\n"
+        )
+        processes = [
+            subprocess.Popen(
+                [sys.executable, "-c", code, str(self.path)],
+                cwd=Path(__file__).resolve().parent.parent,
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            for _ in range(2)
+        ]
+        times = sorted(
+            float(line)
+            for process in processes
+            for line in process.communicate()[0].split()
+        )
+
+        self.assertEqual(len(times), 6)
+        # Together the processes never beat 20 requests per second
+        for earlier, later in zip(times, times[1:]):
+            self.assertGreater(later - earlier, 0.04)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+from simplelogin.stats import AliasStats, TopN, bucket
+
+
+def make_alias(alias_id, forwards=0, blocks=0, enabled=True, mailbox="me@example.com"):
+    return {
+        "id": alias_id,
+        "email": f"alias{alias_id}@{'a' if alias_id % 2 else 'b'}.example.com",
+        "enabled": enabled,
+        "pinned": False,
+        "mailboxes": [{"id": 1, "email": mailbox}],
+        "nb_forward": forwards,
+        "nb_reply": 1,
+        "nb_block": blocks,
+    }
+
+
+class AliasStatsTests(unittest.TestCase):
+    def test_bucket(self):
+        self.assertEqual(
+            [bucket(n) for n in (0, 1, 9, 10, 999, 5000)], [0, 1, 1, 2, 3, 4]
+        )
+
+    def test_top_n_is_bounded(self):
+        top = TopN(3)
+        for alias_id, count in enumerate([5, 1, 9, 0, 7, 9, 2]):
+            top.add(count, make_alias(alias_id))
+
+        self.assertEqual(len(top.heap), 3)
+        # Ties rank the lower id first, aliases without any email are left out
+        self.assertEqual(
+            [(c, i) for c, i, _, _ in top.items()], [(9, 2), (9, 5), (7, 4)]
+        )
+
+    def test_aggregates(self):
+        stats = AliasStats(top=2, by="domain").update(
+            [
+                make_alias(1, forwards=100, blocks=3),
+                make_alias(2, forwards=5, blocks=40, enabled=False),
+                make_alias(3, forwards=0),
+            ]
+        )
+
+        data = stats.to_dict()
+        self.assertEqual(data["aliases"], 3)
+        self.assertEqual(data["disabled"], 1)
+        self.assertEqual(data["forwards"], 105)
+        self.assertEqual(data["replies"], 3)
+        self.assertEqual(data["distribution"]["nb_forward"]["0"], 1)
+        self.assertEqual(data["distribution"]["nb_forward"]["100-999"], 1)
+        self.assertEqual([a["id"] for a in data["top_forwards"]], [1, 2])
+        self.assertEqual([a["id"] for a in data["top_blocks"]], [2, 1])
+
+        groups = {group["name"]: group for group in data["by_domain"]}
+        self.assertEqual(groups["a.example.com"]["aliases"], 2)
+        self.assertEqual(groups["a.example.com"]["nb_forward"], 100)
+        self.assertEqual(groups["b.example.com"]["enabled"], 0)
+
+    def test_unknown_grouping(self):
+        with self.assertRaises(ValueError):
+            AliasStats(by="contact")
+
+
+if __name__ == "__main__":
+    unittest.main()
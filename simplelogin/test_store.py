@@ -0,0 +1,188 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from simplelogin.store import AccountStore
+
+
+def make_alias(alias_id, timestamp=None, **fields):
+    alias = {
+        "id": alias_id,
+        "email": f"alias{alias_id}@example.com",
+        "name": None,
+        "note": None,
+        "enabled": True,
+        "pinned": False,
+        "latest_activity": (
+            {"action": "forward", "timestamp": timestamp} if timestamp else None
+        ),
+    }
+    alias.update(fields)
+    return alias
+
+
+class AccountStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = AccountStore(Path(self.temp_dir.name) / "account.sqlite3")
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_iter_aliases(self):
+        self.store.upsert_aliases([make_alias(1, 100), make_alias(2)])
+
+        self.assertEqual(sorted(a["id"] for a in self.store.iter_aliases()), [1, 2])
+
+    def test_activity_marks(self):
+        mark = {"timestamp": 40, "seen": ["x"]}
+        self.store.save_activity_marks([(1, "40", mark), (2, "30", None)])
+        self.store.prune_activity_marks([1])
+
+        self.assertEqual(self.store.activity_marks(), {1: ("40", mark)})
+
+    def test_page_is_current(self):
+        self.store.upsert_aliases([make_alias(1, 100), make_alias(2, 90)])
+
+        self.assertTrue(self.store.page_is_current([make_alias(1, 100)]))
+        self.assertFalse(self.store.page_is_current([make_alias(1, 101)]))
+        self.assertFalse(self.store.page_is_current([make_alias(3, 80)]))
+        self.assertFalse(self.store.page_is_current([]))
+
+    def test_page_is_current_ignores_pinned(self):
+        pinned = [make_alias(i, 100, pinned=True) for i in range(20)]
+        self.store.upsert_aliases(pinned + [make_alias(20, 90)])
+
+        # An unchanged page of pinned aliases says nothing about later pages
+        self.assertFalse(self.store.page_is_current(pinned))
+
+        # Only the unpinned aliases of a page decide
+        changed_pinned = make_alias(0, 101, pinned=True)
+        self.assertTrue(
+            self.store.page_is_current([changed_pinned, make_alias(20, 90)])
+        )
+        self.assertFalse(self.store.page_is_current([pinned[1], make_alias(20, 91)]))
+
+    def test_list_aliases_filters_and_order(self):
+        self.store.upsert_aliases(
+            [
+                make_alias(1, 100, enabled=False),
+                make_alias(2, 300, note="Vendor X"),
+                make_alias(3, 200, pinned=True),
+                make_alias(4),
+            ]
+        )
+
+        ids = [alias["id"] for alias in self.store.list_aliases()]
+        self.assertEqual(ids, [2, 3, 1, 4])
+
+        self.assertEqual([a["id"] for a in self.store.list_aliases(pinned=True)], [3])
+        self.assertEqual([a["id"] for a in self.store.list_aliases(disabled=True)], [1])
+        self.assertEqual(
+            [a["id"] for a in self.store.list_aliases(query="vendor")], [2]
+        )
+        self.assertEqual(
+            [a["id"] for a in self.store.list_aliases(limit=2, offset=1)], [3, 1]
+        )
+
+    def test_prune_aliases(self):
+        self.store.upsert_aliases([make_alias(1), make_alias(2), make_alias(3)])
+
+        removed = self.store.prune_aliases([1, 3])
+
+        self.assertEqual(removed, 1)
+        self.assertIsNone(self.store.get_alias(2))
+        self.assertEqual(self.store.find_alias_by_email("ALIAS3@example.com")["id"], 3)
+
+    def test_bind_account_clears_other_account(self):
+        self.store.bind_account("key-a")
+        self.store.upsert_aliases([make_alias(1)])
+        self.store.replace_mailboxes([{"id": 1, "email": "m@example.com"}])
+
+        self.store.bind_account("key-a")
+        self.assertEqual(self.store.count_aliases(), 1)
+
+        self.store.bind_account("key-b")
+        self.assertEqual(self.store.count_aliases(), 0)
+        self.assertEqual(self.store.mailboxes(), [])
+
+
+class AliasSearchTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = self.open_store()
+        self.store.upsert_aliases(
+            [
+                make_alias(1, email="github.x1@example.com", name="GitHub"),
+                make_alias(2, email="shop.vendorx@example.com", note="Vendor X"),
+                make_alias(
+                    3,
+                    email="news.ab12@example.com",
+                    mailboxes=[{"id": 1, "email": "work@corp.com"}],
+                ),
+                make_alias(4, email="50%off@example.com"),
+            ]
+        )
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def open_store(self):
+        return AccountStore(Path(self.temp_dir.name) / "account.sqlite3")
+
+    def search(self, pattern, mode="substring", **kwargs):
+        return [a["id"] for a in self.store.search_aliases(pattern, mode, **kwargs)]
+
+    def test_substring(self):
+        self.assertEqual(self.search("VENDOR"), [2])
+        self.assertEqual(self.search("corp.com"), [3])
+        self.assertEqual(self.search("example"), [4, 3, 2, 1])
+        self.assertEqual(self.search("example", limit=2), [4, 3])
+        self.assertEqual(self.search("gi"), [1])
+        # LIKE wildcards are matched literally
+        self.assertEqual(self.search("0%o"), [4])
+        self.assertEqual(self.search("s_ab"), [])
+
+    def test_prefix(self):
+        self.assertEqual(self.search("shop", "prefix"), [2])
+        self.assertEqual(self.search("vendor", "prefix"), [2])
+        self.assertEqual(self.search("hub", "prefix"), [])
+
+    def test_regex(self):
+        self.assertEqual(self.search(r"^news\.[a-z]+\d+@", "regex"), [3])
+        self.assertEqual(self.search(r"x$", "regex"), [2])
+
+    def test_fuzzy(self):
+        self.assertEqual(self.search("githbu", "fuzzy"), [1])
+        self.assertEqual(self.search("zzzz", "fuzzy"), [])
+
+    def test_index_follows_updates(self):
+        self.store.upsert_aliases([make_alias(1, email="renamed@example.com")])
+        self.store.prune_aliases([1, 3, 4])
+
+        self.assertEqual(self.search("github"), [])
+        self.assertEqual(self.search("vendor"), [])
+        self.assertEqual(self.search("renamed"), [1])
+
+    def test_without_fts5(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+        broken = "CREATE VIRTUAL TABLE alias_search USING no_such_module(text)"
+        with patch("simplelogin.store.SEARCH_SCHEMA", broken):
+            self.store = self.open_store()
+        self.assertFalse(self.store.indexed_search)
+
+        self.store.upsert_aliases(
+            [make_alias(1, email="github@example.com"), make_alias(2, note="Vendor")]
+        )
+        self.assertEqual(self.search("vendor"), [2])
+        self.assertEqual(self.search("githbu", "fuzzy"), [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import json
+import socket
+import unittest
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from simplelogin.client import SimpleLoginClient
+from simplelogin.trace import (
+    Tracer,
+    attempt_timing,
+    endpoint,
+    phase,
+    traced_pool_classes,
+)
+
+
+def fake_response(status=200, content=b"{}", elapsed=0.01):
+    response = MagicMock()
+    response.status_code = status
+    response.content = content
+    response.elapsed = timedelta(seconds=elapsed)
+    return response
+
+
+class TracerTests(unittest.TestCase):
+    def test_endpoint(self):
+        self.assertEqual(endpoint("/api/aliases/12/toggle"), "/api/aliases/{id}/toggle")
+        self.assertEqual(endpoint("/api/aliases/12"), "/api/aliases/{id}")
+        self.assertEqual(endpoint("/api/v2/aliases?page_id=3"), "/api/v2/aliases")
+
+    def test_phase_without_tracer(self):
+        with phase(None, "render"):
+            pass
+
+    def test_http_timings_and_summary(self):
+        tracer = Tracer(origin=0.0)
+        with tracer.phase("command"):
+            tracer.http(
+                "GET",
+                "/api/aliases/1",
+                1.0,
+                1.05,
+                fake_response(elapsed=0.04),
+                attempt=0,
+                dns=0.005,
+                connect=0.005,
+            )
+            tracer.http(
+                "GET", "/api/aliases/2", 1.1, 1.2, fake_response(503), attempt=0
+            )
+            tracer.http(
+                "GET",
+                "/api/aliases/2",
+                1.3,
+                1.4,
+                fake_response(content=b"ab"),
+                attempt=1,
+            )
+            tracer.http("GET", "/api/aliases/3", 1.5, 1.5, fake_response(), cached=True)
+            tracer.http(
+                "POST",
+                "/api/aliases/3/toggle",
+                1.6,
+                1.7,
+                error=requests.ConnectionError(),
+            )
+
+        first = tracer.events[0]
+        self.assertAlmostEqual(first["ttfb"], 0.03)
+        self.assertAlmostEqual(first["transfer"], 0.01)
+        self.assertNotIn("ttfb", tracer.events[3])
+
+        (phase_headers, phases), (headers, rows) = tracer.summary()
+        self.assertEqual(phases[0][0], "command")
+        by_name = {row[0]: dict(zip(headers, row)) for row in rows}
+
+        get = by_name["GET /api/aliases/{id}"]
+        self.assertEqual(get["Calls"], 3)
+        self.assertEqual(get["Cached"], 1)
+        self.assertEqual(get["Retries"], 1)
+        self.assertEqual(get["Errors"], 1)
+        self.assertEqual(get["Bytes"], 8)
+        self.assertEqual(by_name["POST /api/aliases/{id}/toggle"]["Errors"], 1)
+
+    def test_chrome_trace(self):
+        tracer = Tracer(origin=1.0)
+        tracer.add("phase", "command", 1.5, 2.0)
+
+        trace = json.loads(json.dumps(tracer.chrome_trace()))
+        metadata, event = trace["traceEvents"]
+        self.assertEqual(metadata["ph"], "M")
+        self.assertEqual(event["ph"], "X")
+        self.assertEqual(event["cat"], "phase")
+        self.assertAlmostEqual(event["ts"], 500000)
+        self.assertAlmostEqual(event["dur"], 500000)
+
+
+class TracedClientTests(unittest.TestCase):
+    @patch("simplelogin.client.time.sleep")
+    def test_attempts_recorded(self, mock_sleep):
+        tracer = Tracer()
+        client = SimpleLoginClient("key", base_url="https://sl.test", tracer=tracer)
+        client.session.request = MagicMock(
+            side_effect=[fake_response(503), fake_response()]
+        )
+
+        client.get("/api/v2/aliases", params={"page_id": 0})
+        client.close()
+
+        attempts = [e for e in tracer.events if e["kind"] == "http"]
+        self.assertEqual([e["status"] for e in attempts], [503, 200])
+        self.assertEqual([e["attempt"] for e in attempts], [0, 1])
+        self.assertEqual(attempts[0]["name"], "GET /api/v2/aliases")
+        self.assertTrue(any(e["kind"] == "wait" for e in tracer.events))
+        self.assertTrue(any(e["name"] == "import requests" for e in tracer.events))
+
+    def test_connection_falls_back_across_addresses(self):
+        server = socket.create_server(("127.0.0.1", 0))
+        self.addCleanup(server.close)
+        closed = socket.create_server(("127.0.0.1", 0))
+        refused = closed.getsockname()
+        closed.close()
+
+        def addresses(*args, **kwargs):
+            return [
+                (socket.AF_INET, socket.SOCK_STREAM, 6, "", refused),
+                (socket.AF_INET, socket.SOCK_STREAM, 6, "", server.getsockname()),
+            ]
+
+        connection = traced_pool_classes()["http"].ConnectionCls("sl.test", 80)
+        with patch("socket.getaddrinfo", side_effect=addresses) as mock_getaddrinfo:
+            with attempt_timing() as timing:
+                sock = connection._new_conn()
+        self.addCleanup(sock.close)
+
+        # urllib3 made the lookup itself, which was timed, and moved past the
+        # refused address
+        mock_getaddrinfo.assert_called_once()
+        self.assertEqual(sock.getpeername(), server.getsockname())
+        self.assertEqual(set(timing), {"dns", "connect"})
+
+
+if __name__ == "__main__":
+    unittest.main()
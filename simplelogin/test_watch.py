@@ -0,0 +1,126 @@
+import unittest
+from unittest.mock import patch
+
+from simplelogin import watch
+from simplelogin.watch import AliasWatcher, PollInterval, page_fingerprint
+
+
+def make_alias(alias_id, enabled=True, timestamp=None, pinned=False):
+    return {
+        "id": alias_id,
+        "email": f"alias{alias_id}@example.com",
+        "enabled": enabled,
+        "pinned": pinned,
+        "latest_activity": (
+            {"action": "forward", "timestamp": timestamp} if timestamp else None
+        ),
+    }
+
+
+class AliasWatcherTests(unittest.TestCase):
+    def test_first_walk_is_a_baseline(self):
+        watcher = AliasWatcher()
+
+        self.assertEqual(watcher.update([[make_alias(1), make_alias(2)]]), [])
+        self.assertEqual(set(watcher.aliases), {1, 2})
+        self.assertFalse(watcher.poll_page_changed([make_alias(1), make_alias(2)]))
+        self.assertTrue(watcher.poll_page_changed([make_alias(1)]))
+
+    def test_polls_past_pinned_aliases(self):
+        pinned = [make_alias(i, pinned=True) for i in range(20)]
+        watcher = AliasWatcher()
+        watcher.update([pinned, [make_alias(20, timestamp=5), make_alias(21)]])
+
+        # The first page is all pinned: activity shows up on the second one
+        self.assertEqual(watcher.poll_page, 1)
+        self.assertFalse(
+            watcher.poll_page_changed([make_alias(20, timestamp=5), make_alias(21)])
+        )
+        self.assertTrue(
+            watcher.poll_page_changed(
+                [make_alias(21, timestamp=9), make_alias(20, timestamp=5)]
+            )
+        )
+
+        watcher.update([pinned, []])
+        self.assertEqual(watcher.poll_page, 1)
+
+    def test_events(self):
+        watcher = AliasWatcher()
+        watcher.update([[make_alias(1, timestamp=10), make_alias(2)], [make_alias(3)]])
+
+        events = watcher.update(
+            [
+                [make_alias(4), make_alias(1, timestamp=20)],
+                [make_alias(2, enabled=False)],
+            ]
+        )
+
+        self.assertEqual(
+            sorted((event["event"], event["alias_id"]) for event in events),
+            [("activity", 1), ("created", 4), ("disabled", 2)],
+        )
+        activity = next(e for e in events if e["event"] == "activity")
+        self.assertEqual(activity["latest_activity"]["timestamp"], 20)
+
+        # Missing from a second walk in a row, alias 3 was deleted
+        events = watcher.update(
+            [[make_alias(4), make_alias(1, timestamp=20)], [make_alias(2, False)]]
+        )
+        self.assertEqual(
+            [(event["event"], event["alias_id"]) for event in events], [("deleted", 3)]
+        )
+        self.assertNotIn(3, watcher.aliases)
+
+    def test_alias_missed_by_one_walk_is_not_deleted(self):
+        watcher = AliasWatcher()
+        watcher.update([[make_alias(1), make_alias(2)], [make_alias(3)]])
+
+        # Alias 3 moved to the first page after it was fetched
+        self.assertEqual(watcher.update([[make_alias(1), make_alias(2)], []]), [])
+        self.assertEqual(watcher.missing, {3})
+
+        events = watcher.update([[make_alias(3, timestamp=5), make_alias(1)], []])
+        self.assertEqual(
+            [(event["event"], event["alias_id"]) for event in events],
+            [("activity", 3)],
+        )
+        self.assertEqual(watcher.missing, {2})
+
+    def test_unchanged_pages_are_not_compared(self):
+        pages = [[make_alias(i) for i in range(20)], [make_alias(20)]]
+        watcher = AliasWatcher()
+        watcher.update(pages)
+
+        changed = [pages[0], [make_alias(20, enabled=False)]]
+        with patch.object(watch, "snapshot", wraps=watch.snapshot) as mock_snapshot:
+            events = watcher.update(changed)
+
+        self.assertEqual([event["event"] for event in events], ["disabled"])
+        self.assertEqual(mock_snapshot.call_count, 1)
+        self.assertEqual(len(watcher.aliases), 21)
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            page_fingerprint([make_alias(1)]), page_fingerprint([make_alias(1)])
+        )
+        self.assertNotEqual(
+            page_fingerprint([make_alias(1)]),
+            page_fingerprint([make_alias(1, timestamp=5)]),
+        )
+
+
+class PollIntervalTests(unittest.TestCase):
+    def test_adapts_to_changes(self):
+        interval = PollInterval(10, 30, growth=2)
+
+        interval.unchanged()
+        self.assertEqual(interval.value, 20)
+        interval.unchanged()
+        self.assertEqual(interval.value, 30)
+        interval.changed()
+        self.assertEqual(interval.value, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import threading
+import time
+import unittest
+
+from simplelogin import workers
+
+
+class FetchPagesTests(unittest.TestCase):
+    def make_fetcher(self, total_items, page_size=3, delay=0.0):
+        requested = []
+        lock = threading.Lock()
+
+        def fetch_page(page):
+            with lock:
+                requested.append(page)
+            # Later pages answer first to check that order is preserved
+            time.sleep(delay * (10 - page) if page < 10 else 0)
+            start = page * page_size
+            return list(range(start, min(start + page_size, total_items)))
+
+        return fetch_page, requested
+
+    def test_pages_in_order(self):
+        fetch_page, _ = self.make_fetcher(10, delay=0.001)
+
+        pages = list(workers.fetch_pages(fetch_page, page_size=3, workers=4))
+
+        self.assertEqual(pages, [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]])
+
+    def test_stops_at_first_short_page(self):
+        fetch_page, requested = self.make_fetcher(6)
+
+        pages = list(workers.fetch_pages(fetch_page, page_size=3, workers=2))
+
+        self.assertEqual(pages, [[0, 1, 2], [3, 4, 5], []])
+        # Never more than `workers` pages past the last one yielded
+        self.assertLessEqual(max(requested), 3)
+
+    def test_errors_propagate(self):
+        def fetch_page(page):
+            if page == 1:
+                raise ValueError("boom")
+            return [page] * 3
+
+        with self.assertRaises(ValueError):
+            list(workers.fetch_pages(fetch_page, page_size=3, workers=2))
+
+
+class RunConcurrentlyTests(unittest.TestCase):
+    def test_results_and_errors(self):
+        def func(item):
+            if item == 3:
+                raise ValueError("bad item")
+            return item * 10
+
+        results = list(workers.run_concurrently(func, range(6), workers=3))
+
+        self.assertEqual(sorted(item for item, _, _ in results), list(range(6)))
+        for item, result, error in results:
+            if item == 3:
+                self.assertIsInstance(error, ValueError)
+                self.assertIsNone(result)
+            else:
+                self.assertEqual(result, item * 10)
+                self.assertIsNone(error)
+
+    def test_bounded_concurrency(self):
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def func(item):
+            with lock:
+                active.append(item)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.remove(item)
+
+        list(workers.run_concurrently(func, range(12), workers=3))
+
+        self.assertLessEqual(max(peak), 3)
+
+    def test_consumes_items_lazily(self):
+        consumed = []
+
+        def items():
+            for i in range(100):
+                consumed.append(i)
+                yield i
+
+        results = workers.run_concurrently(lambda item: item, items(), workers=2)
+        next(results)
+
+        self.assertLess(len(consumed), 10)
+
+    def test_rate_limit(self):
+        start = time.monotonic()
+        list(workers.run_concurrently(lambda item: item, range(5), rate=50))
+
+        # Five calls at 50/s need at least four 20ms intervals
+        self.assertGreaterEqual(time.monotonic() - start, 0.075)
+
+
+class MapPagesTests(unittest.TestCase):
+    def test_calls_every_item_of_every_page(self):
+        def fetch_page(page):
+            start = page * 3
+            return list(range(start, min(start + 3, 10)))
+
+        results = list(
+            workers.map_pages(lambda item: item * 10, fetch_page, page_size=3)
+        )
+
+        self.assertEqual(
+            sorted((item, result) for item, result, _ in results),
+            [(i, i * 10) for i in range(10)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
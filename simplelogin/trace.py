@@ -0,0 +1,325 @@
+"""
+Timing instrumentation behind `--timings` and SIMPLELOGIN_TRACE
+
+A Tracer records the phases of a command (imports, config loading, the
+command itself, table rendering) and every HTTP attempt made by the client,
+with the time spent resolving the host, connecting, negotiating TLS, waiting
+for the first byte and reading the body.
+
+The connection-level times come from urllib3 connections that time
+themselves while an attempt is being traced on the current thread (see
+traced_pool_classes). Without a tracer they behave like plain connections.
+
+Recorded events can be summarized as tables or written as Chrome trace
+events, to be opened in chrome://tracing or https://ui.perfetto.dev.
+"""
+
+import contextlib
+import json
+import re
+import socket
+import threading
+import time
+
+# Attempt timings of the request in progress on each thread
+_local = threading.local()
+
+ID_PATTERN = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint(path):
+    """Group paths by endpoint, e.g. /api/aliases/12/toggle -> /api/aliases/{id}/toggle"""
+    return ID_PATTERN.sub("/{id}", path.split("?")[0])
+
+
+def phase(tracer, name):
+    """Time a block as a phase of `tracer`, or do nothing without a tracer"""
+    if tracer is None:
+        return contextlib.nullcontext()
+    return tracer.phase(name)
+
+
+@contextlib.contextmanager
+def attempt_timing():
+    """Collect the connection timings of one HTTP attempt on this thread"""
+    _local.timing = timing = {}
+    try:
+        yield timing
+    finally:
+        _local.timing = None
+
+
+def current_timing():
+    return getattr(_local, "timing", None)
+
+
+class Tracer:
+    """Collect phase and HTTP events of one command"""
+
+    def __init__(self, origin=None):
+        """
+        Args:
+            origin: perf_counter time the trace starts at (now if None)
+        """
+        self.origin = time.perf_counter() if origin is None else origin
+        self.events = []
+        self.threads = {}
+        self.lock = threading.Lock()
+
+    def thread_id(self):
+        """Small, stable id of the current thread for the trace"""
+        ident = threading.get_ident()
+        with self.lock:
+            if ident not in self.threads:
+                self.threads[ident] = (
+                    len(self.threads),
+                    threading.current_thread().name,
+                )
+            return self.threads[ident][0]
+
+    def add(self, kind, name, start, end, **details):
+        """Record an event that ran from `start` to `end` (perf_counter times)"""
+        event = {
+            "kind": kind,
+            "name": name,
+            "start": start,
+            "duration": end - start,
+            "thread": self.thread_id(),
+        }
+        event.update(details)
+        with self.lock:
+            self.events.append(event)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add("phase", name, start, time.perf_counter())
+
+    def http(self, method, path, start, end, response=None, error=None, **details):
+        """
+        Record one HTTP attempt
+
+        Args:
+            method: HTTP method
+            path: Request path
+            start, end: perf_counter times around the attempt
+            response: Response received, if any
+            error: Exception raised instead, if any
+            details: Connection timings, the attempt number, whether the
+                response came from the cache
+        """
+        if response is not None:
+            details["status"] = response.status_code
+            details["bytes"] = len(response.content or b"")
+            elapsed = getattr(response, "elapsed", None)
+            if elapsed is not None and not details.get("cached"):
+                # requests measures up to the parsed headers; the rest of the
+                # attempt was spent reading the body
+                headers_at = elapsed.total_seconds()
+                connected = sum(
+                    details.get(step, 0.0) for step in ("dns", "connect", "tls")
+                )
+                details["ttfb"] = max(0.0, headers_at - connected)
+                details["transfer"] = max(0.0, end - start - headers_at)
+        if error is not None:
+            details["error"] = type(error).__name__
+
+        self.add("http", f"{method} {endpoint(path)}", start, end, **details)
+
+    def summary(self):
+        """Phase and per-endpoint HTTP tables, as (headers, rows) pairs"""
+        phases = [
+            [event["name"], f"{event['duration'] * 1000:.1f}"]
+            for event in self.events
+            if event["kind"] == "phase"
+        ]
+
+        by_endpoint = {}
+        for event in self.events:
+            if event["kind"] == "http":
+                by_endpoint.setdefault(event["name"], []).append(event)
+
+        def mean_ms(events, key):
+            values = [event.get(key, 0.0) for event in events]
+            return f"{sum(values) / len(values) * 1000:.1f}" if values else "-"
+
+        requests = []
+        for name, events in sorted(by_endpoint.items()):
+            sent = [event for event in events if not event.get("cached")]
+            durations = sorted(event["duration"] for event in sent)
+            p95 = durations[int(0.95 * (len(durations) - 1))] if durations else 0.0
+            requests.append(
+                [
+                    name,
+                    len(sent),
+                    len(events) - len(sent),
+                    sum(1 for event in sent if event.get("attempt")),
+                    sum(
+                        1
+                        for event in sent
+                        if "error" in event or event.get("status", 0) >= 400
+                    ),
+                    f"{sum(durations) * 1000:.0f}",
+                    f"{p95 * 1000:.1f}",
+                    mean_ms(sent, "dns"),
+                    mean_ms(sent, "connect"),
+                    mean_ms(sent, "tls"),
+                    mean_ms(sent, "ttfb"),
+                    mean_ms(sent, "transfer"),
+                    sum(event.get("bytes", 0) for event in events),
+                ]
+            )
+
+        return [
+            (["Phase", "ms"], phases),
+            (
+                [
+                    "Endpoint",
+                    "Calls",
+                    "Cached",
+                    "Retries",
+                    "Errors",
+                    "Total ms",
+                    "p95 ms",
+                    "DNS",
+                    "Connect",
+                    "TLS",
+                    "TTFB",
+                    "Transfer",
+                    "Bytes",
+                ],
+                requests,
+            ),
+        ]
+
+    def chrome_trace(self):
+        """The events in Chrome trace-event format"""
+        trace = [
+            {
+                "ph": "M",
+                "name": "thread_name",
+                "pid": 1,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in self.threads.values()
+        ]
+        for event in self.events:
+            args = {
+                key: value
+                for key, value in event.items()
+                if key not in ("kind", "name", "start", "duration", "thread")
+            }
+            trace.append(
+                {
+                    "ph": "X",
+                    "cat": event["kind"],
+                    "name": event["name"],
+                    "pid": 1,
+                    "tid": event["thread"],
+                    "ts": (event["start"] - self.origin) * 1e6,
+                    "dur": event["duration"] * 1e6,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+class TimedSocketModule:
+    """
+    Stand-in for the socket module that times host lookups
+
+    urllib3 resolves hosts with socket.getaddrinfo() when it opens a
+    connection. Installed as the socket module of urllib3.util.connection,
+    this records the lookup as "dns" in the timing of the attempt traced on
+    the current thread, and otherwise behaves exactly like the socket module.
+    """
+
+    def __getattr__(self, name):
+        return getattr(socket, name)
+
+    def getaddrinfo(self, *args, **kwargs):
+        timing = current_timing()
+        if timing is None:
+            return socket.getaddrinfo(*args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return socket.getaddrinfo(*args, **kwargs)
+        finally:
+            timing["dns"] = time.perf_counter() - start
+
+
+_pool_classes = None
+
+
+def traced_pool_classes():
+    """
+    urllib3 connection pool classes whose connections time themselves
+
+    While an attempt is traced on the current thread, new connections record
+    "dns", "connect" and, for HTTPS, "tls" seconds in its timing. urllib3
+    still resolves and connects on its own, trying every address found; only
+    its host lookups are timed (see TimedSocketModule).
+    """
+    global _pool_classes
+    if _pool_classes is not None:
+        return _pool_classes
+
+    import urllib3.util.connection
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    urllib3.util.connection.socket = TimedSocketModule()
+
+    class TimedConnectionMixin:
+        def _new_conn(self):
+            timing = current_timing()
+            if timing is None:
+                return super()._new_conn()
+
+            start = time.perf_counter()
+            try:
+                return super()._new_conn()
+            finally:
+                timing["connect"] = max(
+                    0.0, time.perf_counter() - start - timing.get("dns", 0.0)
+                )
+
+        def connect(self):
+            timing = current_timing()
+            start = time.perf_counter()
+            super().connect()
+            if timing is not None and isinstance(self, HTTPSConnection):
+                timing["tls"] = max(
+                    0.0,
+                    time.perf_counter()
+                    - start
+                    - timing.get("dns", 0.0)
+                    - timing.get("connect", 0.0),
+                )
+
+    class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+        pass
+
+    class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+        pass
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    _pool_classes = {
+        "http": TimedHTTPConnectionPool,
+        "https": TimedHTTPSConnectionPool,
+    }
+    return _pool_classes
@@ -0,0 +1,172 @@
+"""
+Change detection for `simplelogin aliases watch`
+
+The API has no change feed, so watching an account means polling
+/api/v2/aliases. AliasWatcher turns successive walks of the alias pages into
+events: an alias was created, deleted, enabled, disabled or received new
+activity. Each page is reduced to a fingerprint of the fields that matter,
+so pages that did not change since the previous walk are recognized without
+comparing their aliases one by one.
+
+A walk fetches its pages at slightly different times, so an alias that moves
+up the listing during a walk can be missed by it. An alias is therefore only
+reported deleted once two consecutive walks did not see it.
+
+Between walks only one page is polled. The API lists pinned aliases first,
+then the most recently active ones, so new activity shows up on the first
+page holding an unpinned alias. Activity of pinned aliases on earlier pages,
+and toggles and deletions further down, are caught by the next full walk.
+
+PollInterval spaces the polls out: it starts at the minimum, grows while
+nothing changes and drops back to the minimum as soon as something does.
+"""
+
+import hashlib
+import json
+
+from simplelogin.store import activity_key
+
+EVENT_TYPES = ("created", "deleted", "enabled", "disabled", "activity")
+
+
+def snapshot(alias):
+    """The fields of an alias whose changes are reported"""
+    return {
+        "email": alias["email"],
+        "enabled": bool(alias["enabled"]),
+        "activity": activity_key(alias),
+    }
+
+
+def page_fingerprint(aliases):
+    """Digest of the watched fields of a page of aliases"""
+    data = json.dumps(
+        [
+            [alias["id"], bool(alias["enabled"]), activity_key(alias)]
+            for alias in aliases
+        ]
+    )
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+class AliasWatcher:
+    """Compare walks of the alias pages and report what changed"""
+
+    def __init__(self):
+        # (fingerprint, alias ids) of each page of the last walk
+        self.pages = []
+        self.aliases = {}
+        # Ids of aliases the last walk did not see, deleted if the next one
+        # doesn't either. They are kept in `aliases` meanwhile.
+        self.missing = set()
+        # Page polled between walks: the first one holding an unpinned alias
+        self.poll_page = 0
+        self.walked = False
+
+    def poll_page_changed(self, aliases):
+        """Whether a poll of `poll_page` differs from the last walk"""
+        return (
+            self.poll_page >= len(self.pages)
+            or page_fingerprint(aliases) != self.pages[self.poll_page][0]
+        )
+
+    def update(self, pages):
+        """
+        Take a complete walk of the alias pages
+
+        The first walk only records the account. Later walks return the
+        events since the previous one, as dicts with "event", "alias_id",
+        "alias" and, for activity, "latest_activity". Deletions are reported
+        by the second walk in a row missing the alias.
+        """
+        events = []
+        walked = []
+        seen = {}
+        poll_page = None
+
+        for index, aliases in enumerate(pages):
+            fingerprint = page_fingerprint(aliases)
+            ids = [alias["id"] for alias in aliases]
+            walked.append((fingerprint, ids))
+
+            if poll_page is None and not all(alias.get("pinned") for alias in aliases):
+                poll_page = index
+
+            if index < len(self.pages) and self.pages[index][0] == fingerprint:
+                # Same aliases in the same state, nothing to compare
+                for alias_id in ids:
+                    seen[alias_id] = self.aliases[alias_id]
+                continue
+
+            for alias in aliases:
+                current = seen[alias["id"]] = snapshot(alias)
+                if self.walked:
+                    events.extend(self.compare(alias, current))
+
+        missing = set()
+        for alias_id in self.aliases.keys() - seen.keys():
+            if alias_id in self.missing:
+                events.append(
+                    {
+                        "event": "deleted",
+                        "alias_id": alias_id,
+                        "alias": self.aliases[alias_id]["email"],
+                    }
+                )
+            else:
+                missing.add(alias_id)
+                seen[alias_id] = self.aliases[alias_id]
+
+        self.pages = walked
+        self.aliases = seen
+        self.missing = missing
+        # Without unpinned aliases, the first one will show up on the last page
+        if poll_page is None:
+            poll_page = max(0, len(walked) - 1)
+        self.poll_page = poll_page
+        self.walked = True
+        return events
+
+    def compare(self, alias, current):
+        """Events between the previous and current state of one alias"""
+        event = {"alias_id": alias["id"], "alias": alias["email"]}
+        previous = self.aliases.get(alias["id"])
+        if previous is None:
+            return [dict(event, event="created")]
+
+        events = []
+        if previous["enabled"] != current["enabled"]:
+            events.append(
+                dict(event, event="enabled" if current["enabled"] else "disabled")
+            )
+        if previous["activity"] != current["activity"]:
+            events.append(
+                dict(
+                    event,
+                    event="activity",
+                    latest_activity=alias.get("latest_activity"),
+                )
+            )
+        return events
+
+
+class PollInterval:
+    """Seconds to wait before the next poll, adapting to how often things change"""
+
+    def __init__(self, minimum, maximum, growth=1.5):
+        """
+        Args:
+            minimum: Interval while changes keep coming
+            maximum: Longest interval on a quiet account
+            growth: Factor the interval grows by after a poll without changes
+        """
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.growth = growth
+        self.value = minimum
+
+    def changed(self):
+        self.value = self.minimum
+
+    def unchanged(self):
+        self.value = min(self.maximum, self.value * self.growth)
@@ -0,0 +1,97 @@
+"""
+Concurrency helpers for account-wide operations
+
+The SimpleLogin API pages most listings in fixed-size pages, so walking a whole
+account, or mutating many aliases, one request at a time is dominated by
+round-trip latency. These helpers keep a bounded number of requests in flight
+instead. They are the synchronous face of the asyncio engine in
+simplelogin.engine, for use from ordinary command code. The engine, and with
+it asyncio, is only imported once a command actually fans out.
+"""
+
+# Number of items the API returns for a full page
+PAGE_SIZE = 20
+DEFAULT_WORKERS = 4
+
+
+def fetch_pages(
+    fetch_page, page_size=PAGE_SIZE, workers=DEFAULT_WORKERS, start=0, adaptive=None
+):
+    """
+    Yield every page of a paginated listing, in page order
+
+    Pages start, start + 1, ... are requested speculatively, keeping up to
+    `workers` requests in flight. Iteration stops after the first page holding
+    fewer than `page_size` items; pages requested past it are discarded.
+
+    Args:
+        fetch_page: Callable taking a page number and returning a list of items
+        page_size: Number of items in a full page
+        workers: Maximum number of pages fetched concurrently
+        start: First page number to fetch
+        adaptive: AdaptiveLimit lowering concurrency while the API throttles
+    """
+    from simplelogin.engine import Engine, iterate
+
+    engine = Engine(workers, adaptive=adaptive)
+    try:
+        yield from iterate(engine.pages(fetch_page, page_size, start))
+    finally:
+        engine.close()
+
+
+def run_concurrently(func, items, workers=DEFAULT_WORKERS, rate=None, adaptive=None):
+    """
+    Call `func` on every item with a bounded number of calls in flight
+
+    Results are yielded as calls complete, not in input order, as
+    (item, result, error) tuples where error is the exception raised, if any.
+    Items are consumed lazily, so `items` may be a stream such as stdin.
+
+    Args:
+        func: Callable taking one item
+        items: Iterable of items
+        workers: Maximum number of concurrent calls
+        rate: Maximum number of calls started per second (unlimited if None)
+        adaptive: AdaptiveLimit lowering concurrency while the API throttles
+    """
+    from simplelogin.engine import Engine, iterate
+
+    engine = Engine(workers, rate, adaptive)
+    try:
+        yield from iterate(engine.map_unordered(func, items))
+    finally:
+        engine.close()
+
+
+def map_pages(
+    func,
+    fetch_page,
+    page_size=PAGE_SIZE,
+    workers=DEFAULT_WORKERS,
+    rate=None,
+    adaptive=None,
+):
+    """
+    Call `func` on every item of a paginated listing while it is being paged
+
+    Page requests and calls share the same `workers` slots, and calls start as
+    soon as the page holding their item arrives. Results are yielded as
+    (item, result, error) tuples, as for run_concurrently.
+
+    Args:
+        func: Callable taking one item
+        fetch_page: Callable taking a page number and returning a list of items
+        page_size: Number of items in a full page
+        workers: Maximum number of concurrent requests
+        rate: Maximum number of calls started per second (unlimited if None)
+        adaptive: AdaptiveLimit lowering concurrency while the API throttles
+    """
+    from simplelogin.engine import Engine, flatten, iterate
+
+    engine = Engine(workers, rate, adaptive)
+    try:
+        items = flatten(engine.pages(fetch_page, page_size))
+        yield from iterate(engine.map_unordered(func, items))
+    finally:
+        engine.close()